@@ -155,12 +155,12 @@ class ChangeApplicator:
         self.console.print("  [cyan]→[/cyan] Configuring containers...")
         results = self.proxmox.setup_container_mounts(dataset_name, dataset_config, pool_name)
         
-        # Process results (vmid, success, message)
+        # Process results (vmid, ok, reason); vmid is None if unresolved
         success_count = 0
         created_count = 0
         
         for vmid, success, message in results:
-            if success and vmid > 0:
+            if success and vmid:
                 # Check if this was a creation or just a mount
                 is_creation = "created" in message.lower()
                 
@@ -90,9 +90,9 @@ class ProxmoxDiscovery:
             return []
         
         templates = []
-        for line in output.strip().split('\n')[1:]:  # Skip header
-            if not line.strip():
-                continue
+        lines = iter(output.splitlines())
+        next(lines, None)  # Skip header
+        for line in lines:
             parts = line.split()
             if len(parts) >= 2:
                 templates.append({
@@ -113,15 +113,16 @@ class ProxmoxDiscovery:
             return []
         
         containers = []
-        for line in output.strip().split('\n')[1:]:  # Skip header
-            if not line.strip():
-                continue
+        lines = iter(output.splitlines())
+        next(lines, None)  # Skip header
+        for line in lines:
+            # Columns: VMID Status [Lock] Name; Lock is blank unless held
             parts = line.split()
             if len(parts) >= 3:
                 containers.append({
                     'vmid': parts[0],
                     'status': parts[1],
-                    'name': parts[2]
+                    'name': parts[-1]
                 })
         
         return containers
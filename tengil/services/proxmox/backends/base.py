@@ -1,6 +1,29 @@
 """Abstract base class for container backends."""
+import functools
+import shlex
+import subprocess
 from abc import ABC, abstractmethod
-from typing import Dict, Optional
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+from tengil.core.logger import get_logger
+from tengil.services.proxmox.lxc_config import lxc_config_path
+
+logger = get_logger(__name__)
+
+# Barrier emitted by emit_script after a run of backgrounded pulls
+_WAIT_PULLS = 'for pid in "${pids[@]}"; do wait "$pid"; done; pids=()'
+
+# pct device flags for GPU passthrough: /dev/dri (Intel, AMD and any
+# unrecognised type) unless the type is nvidia
+_DRI_DEV_FLAGS: Tuple[str, ...] = (
+    '--dev0', '/dev/dri/card0,mode=0666',
+    '--dev1', '/dev/dri/renderD128,mode=0666',
+)
+_NVIDIA_DEV_FLAGS: Tuple[str, ...] = (
+    '--dev0', '/dev/nvidia0,mode=0666',
+    '--dev1', '/dev/nvidiactl,mode=0666',
+    '--dev2', '/dev/nvidia-uvm,mode=0666',
+)
 
 
 class ContainerBackend(ABC):
@@ -13,6 +36,48 @@ class ContainerBackend(ABC):
             mock: If True, simulate operations without making real changes
         """
         self.mock = mock
+        # When set, commands are recorded here instead of executed (see emit_script)
+        self.plan: Optional[List[List[str]]] = None
+
+    @staticmethod
+    @functools.lru_cache(maxsize=64)
+    def _features_str(items: FrozenSet[Tuple[str, int]]) -> str:
+        """Render a ``--features`` value (memoized, specs reuse a few feature sets).
+
+        Args:
+            items: Frozen set of (feature, 0/1) pairs
+
+        Returns:
+            Comma-separated feature string, e.g. 'keyctl=1,nesting=1'
+        """
+        return ','.join(f'{k}={v}' for k, v in sorted(items))
+
+    @staticmethod
+    @functools.lru_cache(maxsize=64)
+    def _net0_str(
+        bridge: str,
+        ip: str,
+        gateway: Optional[str] = None,
+        firewall: Optional[int] = None
+    ) -> str:
+        """Render a ``--net0`` value (memoized per bridge/ip combination).
+
+        Args:
+            bridge: Host bridge (e.g. 'vmbr0')
+            ip: 'dhcp' or static address in CIDR notation
+            gateway: Gateway for static addresses (optional)
+            firewall: 0/1 firewall flag, omitted when None
+
+        Returns:
+            Network string, e.g. 'name=eth0,bridge=vmbr0,ip=dhcp'
+        """
+        parts = ['name=eth0', f'bridge={bridge}']
+        if firewall is not None:
+            parts.append(f'firewall={firewall}')
+        parts.append(f'ip={ip}')
+        if ip != 'dhcp' and gateway:
+            parts.append(f'gw={gateway}')
+        return ','.join(parts)
 
     @abstractmethod
     def create_container(
@@ -73,27 +138,123 @@ class ContainerBackend(ABC):
         """
         pass
 
-    @abstractmethod
-    def container_exists(self, vmid: int) -> bool:
+    def container_exists(self, vmid: int, strict: bool = False) -> bool:
         """Check if container exists.
         
         Args:
             vmid: Container ID
+            strict: Ask ``pct status`` instead of checking for the config file
             
         Returns:
             True if container exists, False otherwise
         """
-        pass
+        if self.mock:
+            return False
+
+        if not strict:
+            # pct is a Perl script; a stat on the config answers the same question
+            return lxc_config_path(vmid).exists()
+
+        # A missing container is the common answer; read the exit code
+        # rather than raising and catching CalledProcessError
+        result = subprocess.run(
+            ['pct', 'status', str(vmid)],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            check=False
+        )
+        return result.returncode == 0
 
-    @abstractmethod
     def configure_gpu(self, vmid: int, gpu_type: Optional[str] = None) -> bool:
         """Configure GPU passthrough for container.
         
         Args:
             vmid: Container ID
-            gpu_type: GPU type hint (intel, nvidia, amd)
+            gpu_type: GPU type hint; nvidia, else /dev/dri (intel, amd, ...)
             
         Returns:
             True if successful, False otherwise
         """
-        pass
+        flags = self._gpu_flags(gpu_type)
+        return self._run(['pct', 'set', str(vmid), *flags], f"Error configuring GPU for {vmid}")
+
+    @staticmethod
+    def _gpu_flags(gpu_type: Optional[str] = None) -> Tuple[str, ...]:
+        """Return pct device flags for a GPU type (/dev/dri unless nvidia)."""
+        if str(gpu_type or '').lower() == 'nvidia':
+            return _NVIDIA_DEV_FLAGS
+        return _DRI_DEV_FLAGS
+
+    @staticmethod
+    def _mount_flags(mount: Dict, slot: int) -> Optional[Tuple[str, str]]:
+        """Return the ``--mpN`` flag pair for a mount spec, or None if invalid."""
+        source = mount.get('source')
+        target = mount.get('target')
+        if not source or not target:
+            return None
+        ro_flag = ',ro=1' if mount.get('readonly', False) else ''
+        return f'--mp{slot}', f'{source},mp={target}{ro_flag}'
+
+    def _run(self, cmd: List[str], error: str) -> bool:
+        """Run a command whose output is only needed on failure.
+        
+        Args:
+            cmd: Command argv
+            error: Message printed (with stderr) if the command fails
+            
+        Returns:
+            True if successful (or mocked), False otherwise
+        """
+        if self.mock:
+            logger.info(f"MOCK: Would run: {shlex.join(cmd)}")
+            return True
+
+        if self._planned(cmd):
+            return True
+
+        try:
+            subprocess.run(
+                cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, check=True
+            )
+            return True
+        except subprocess.CalledProcessError as e:
+            logger.error(f"{error}: {e.stderr}")
+            return False
+
+    def _planned(self, cmd: List[str]) -> bool:
+        """Record cmd in the plan instead of running it.
+        
+        Returns:
+            True if planning is active and the command was recorded
+        """
+        if self.plan is None:
+            return False
+        self.plan.append(list(cmd))
+        return True
+
+    def emit_script(self) -> str:
+        """Render the recorded plan as a single auditable bash script.
+        
+        Image pulls are independent of each other and run in the background;
+        they are awaited before the first pct command, which then run in order
+        (pct serializes on the container config lock anyway).
+        
+        Returns:
+            Bash script text
+        """
+        lines = ['#!/usr/bin/env bash', 'set -e', '']
+        pending = False
+        for argv in self.plan or []:
+            rendered = shlex.join(argv)
+            if argv[0] == 'skopeo':
+                lines.append(f'{rendered} &')
+                lines.append('pids+=($!)')
+                pending = True
+                continue
+            if pending:
+                lines.append(_WAIT_PULLS)
+                pending = False
+            lines.append(rendered)
+        if pending:
+            lines.append(_WAIT_PULLS)
+        return '\n'.join(lines) + '\n'
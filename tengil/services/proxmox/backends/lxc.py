@@ -1,12 +1,14 @@
 """LXC container backend (traditional templates)."""
+import shlex
 import subprocess
 from typing import Dict, Optional
 
-from rich.console import Console
+from tengil.core.logger import get_logger
+from tengil.services.proxmox.lxc_config import lxc_config_path
 
 from .base import ContainerBackend
 
-console = Console()
+logger = get_logger(__name__)
 
 
 class LXCBackend(ContainerBackend):
@@ -43,107 +45,92 @@ class LXCBackend(ContainerBackend):
         # Get template
         template = spec.get('template')
         if not template:
-            console.print("[red]✗[/red] No template specified")
+            logger.error("No template specified")
             return None
         
         # Get or allocate VMID
         vmid = spec.get('vmid') or self._get_next_vmid()
         
-        # Build pct create command
-        cmd = ['pct', 'create', str(vmid), template]
-        
-        # Add basic options
         hostname = spec.get('hostname') or spec.get('name')
-        if hostname:
-            cmd.extend(['--hostname', hostname])
-        
+
         # Resources
-        cores = spec.get('cores') or spec.get('resources', {}).get('cores', 2)
-        memory = spec.get('memory') or spec.get('resources', {}).get('memory', 2048)
-        disk = spec.get('disk') or spec.get('resources', {}).get('disk', 8)
-        
-        cmd.extend([
-            '--cores', str(cores),
-            '--memory', str(memory),
-            '--rootfs', f'{storage}:{disk}'
-        ])
-        
-        # Network
+        resources = spec.get('resources', {})
+        cores = spec.get('cores') or resources.get('cores', 2)
+        memory = spec.get('memory') or resources.get('memory', 2048)
+        disk = spec.get('disk') or resources.get('disk', 8)
+
         network = spec.get('network', {})
-        bridge = network.get('bridge', 'vmbr0')
-        ip = network.get('ip', 'dhcp')
-        cmd.extend(['--net0', f'name=eth0,bridge={bridge},ip={ip}'])
-        
-        # Unprivileged
-        if spec.get('unprivileged', True):
-            cmd.append('--unprivileged')
-            cmd.append('1')
+        net0 = self._net0_str(network.get('bridge', 'vmbr0'), network.get('ip', 'dhcp'))
 
-        # Environment variables
         env = spec.get('env', {})
-        for key, value in env.items():
-            cmd.extend(['--env', f'{key}={value}'])
-
-        # Features
         features = spec.get('features', {})
-        feature_str = ','.join(f'{k}={int(v)}' for k, v in features.items())
-        if feature_str:
-            cmd.extend(['--features', feature_str])
-        
-        # Pool
-        if pool:
-            cmd.extend(['--pool', pool])
+        feature_str = self._features_str(frozenset((k, int(v)) for k, v in features.items()))
+
+        # Build pct create command
+        cmd = ['pct', 'create', str(vmid), template]
+        cmd += ['--hostname', hostname] if hostname else []
+        cmd += [
+            '--cores', str(cores),
+            '--memory', str(memory),
+            '--rootfs', f'{storage}:{disk}',
+            '--net0', net0,
+        ]
+        cmd += ['--unprivileged', '1'] if spec.get('unprivileged', True) else []
+        cmd += [arg for key, value in env.items() for arg in ('--env', f'{key}={value}')]
+        cmd += ['--features', feature_str] if feature_str else []
+        cmd += ['--pool', pool] if pool else []
         
         # Execute
         if self.mock:
-            console.print(f"[dim][MOCK] Would run: {' '.join(cmd)}[/dim]")
+            logger.info(f"MOCK: Would run: {shlex.join(cmd)}")
             return vmid
         
         try:
-            with console.status(f"[cyan]Creating container {vmid}...[/cyan]", spinner="dots"):
+            if not self._planned(cmd):
+                logger.info(f"Creating container {vmid}...")
                 _ = subprocess.run(
                     cmd,
-                    capture_output=True,
+                    stdout=subprocess.DEVNULL,
+                    stderr=subprocess.PIPE,
                     text=True,
                     check=True
                 )
             
-            # Configure GPU if specified
+            # GPU devices and mounts go in one pct set (one config lock/write)
+            set_flags = []
             if spec.get('gpu', {}).get('passthrough') or features.get('gpu'):
-                with console.status(f"[cyan]Configuring GPU for {vmid}...[/cyan]", spinner="dots"):
-                    self.configure_gpu(vmid)
-            
-            # Add mounts
-            mounts = spec.get('mounts', [])
-            for mount in mounts:
-                self._add_mount(vmid, mount)
+                set_flags.extend(self._gpu_flags())
+
+            # New container: mount slots start at mp0
+            for slot, mount in enumerate(spec.get('mounts', [])):
+                mount_flags = self._mount_flags(mount, slot)
+                if mount_flags:
+                    set_flags.extend(mount_flags)
+
+            if set_flags:
+                self._run(
+                    ['pct', 'set', str(vmid), *set_flags],
+                    f"Error configuring devices/mounts for {vmid}"
+                )
             
-            console.print(f"[green]✓[/green] Created container {vmid}")
+            logger.info(f"✓ Created container {vmid}")
             return vmid
             
         except subprocess.CalledProcessError as e:
             # pct create sometimes emits non-zero even when the container exists (e.g. ZFS mount race)
-            console.print("[yellow]![/yellow] pct create returned error, verifying result...")
+            logger.warning("pct create returned error, verifying result...")
             if self._container_exists(vmid):
-                console.print(f"[yellow]✓[/yellow] Container {vmid} appears created despite error")
+                logger.warning(f"Container {vmid} appears created despite error")
                 return vmid
 
-            console.print(f"[red]✗[/red] Error creating container: {e.stderr}")
+            logger.error(f"Error creating container: {e.stderr}")
             return None
 
     def _container_exists(self, vmid: int) -> bool:
         """Best-effort check if a container now exists."""
         if self.mock:
             return True
-        try:
-            result = subprocess.run(
-                ["pct", "status", str(vmid)],
-                capture_output=True,
-                text=True,
-            )
-            return result.returncode == 0
-        except Exception:
-            return False
+        return lxc_config_path(vmid).exists()
 
     def update_env(self, vmid: int, env: Dict[str, str]) -> bool:
         """Apply environment variables to an existing container."""
@@ -156,125 +143,38 @@ class LXCBackend(ContainerBackend):
 
         cmd = ['pct', 'set', str(vmid)] + args
 
-        if self.mock:
-            console.print(f"[dim][MOCK] Would run: {' '.join(cmd)}[/dim]")
-            return True
-
-        try:
-            subprocess.run(cmd, capture_output=True, text=True, check=True)
-            console.print(f"[green]✓[/green] Updated env for container {vmid}")
-            return True
-        except subprocess.CalledProcessError as e:
-            console.print(f"[red]✗[/red] Error updating env for container {vmid}: {e.stderr}")
+        if not self._run(cmd, f"Error updating env for container {vmid}"):
             return False
+        if not self.mock:
+            logger.info(f"✓ Updated env for container {vmid}")
+        return True
 
     def start_container(self, vmid: int) -> bool:
         """Start LXC container."""
         cmd = ['pct', 'start', str(vmid)]
-        
-        if self.mock:
-            console.print(f"[dim][MOCK] Would run: {' '.join(cmd)}[/dim]")
-            return True
-        
-        try:
-            subprocess.run(cmd, capture_output=True, text=True, check=True)
-            return True
-        except subprocess.CalledProcessError as e:
-            console.print(f"[red]✗[/red] Error starting container {vmid}: {e.stderr}")
-            return False
+        return self._run(cmd, f"Error starting container {vmid}")
 
     def stop_container(self, vmid: int, timeout: int = 30) -> bool:
         """Stop LXC container."""
         cmd = ['pct', 'stop', str(vmid), '--timeout', str(timeout)]
-        
-        if self.mock:
-            console.print(f"[dim][MOCK] Would run: {' '.join(cmd)}[/dim]")
-            return True
-        
-        try:
-            subprocess.run(cmd, capture_output=True, text=True, check=True)
-            return True
-        except subprocess.CalledProcessError as e:
-            console.print(f"[red]✗[/red] Error stopping container {vmid}: {e.stderr}")
-            return False
+        return self._run(cmd, f"Error stopping container {vmid}")
 
     def destroy_container(self, vmid: int, purge: bool = False) -> bool:
         """Destroy LXC container."""
         cmd = ['pct', 'destroy', str(vmid)]
         if purge:
             cmd.append('--purge')
-        
-        if self.mock:
-            console.print(f"[dim][MOCK] Would run: {' '.join(cmd)}[/dim]")
-            return True
-        
-        try:
-            subprocess.run(cmd, capture_output=True, text=True, check=True)
-            return True
-        except subprocess.CalledProcessError as e:
-            console.print(f"[red]✗[/red] Error destroying container {vmid}: {e.stderr}")
-            return False
-
-    def container_exists(self, vmid: int) -> bool:
-        """Check if container exists."""
-        cmd = ['pct', 'status', str(vmid)]
-        
-        if self.mock:
-            return False
-        
-        try:
-            subprocess.run(cmd, capture_output=True, text=True, check=True)
-            return True
-        except subprocess.CalledProcessError:
-            return False
-
-    def configure_gpu(self, vmid: int, gpu_type: Optional[str] = None) -> bool:
-        """Configure GPU passthrough."""
-        devices = [
-            ('--dev0', '/dev/dri/card0,mode=0666'),
-            ('--dev1', '/dev/dri/renderD128,mode=0666')
-        ]
-        
-        cmd = ['pct', 'set', str(vmid)]
-        for flag, device in devices:
-            cmd.extend([flag, device])
-        
-        if self.mock:
-            console.print(f"[dim][MOCK] Would run: {' '.join(cmd)}[/dim]")
-            return True
-        
-        try:
-            subprocess.run(cmd, capture_output=True, text=True, check=True)
-            return True
-        except subprocess.CalledProcessError as e:
-            console.print(f"[red]✗[/red] Error configuring GPU for {vmid}: {e.stderr}")
-            return False
+        return self._run(cmd, f"Error destroying container {vmid}")
 
     def _add_mount(self, vmid: int, mount: Dict) -> bool:
         """Add mount point to container."""
-        source = mount.get('source')
-        target = mount.get('target')
-        readonly = mount.get('readonly', False)
-        
-        if not source or not target:
-            return False
-        
-        mp_id = 0  # Simplified
-        ro_flag = ',ro=1' if readonly else ''
-        mount_spec = f'{source},mp={target}{ro_flag}'
-        
-        cmd = ['pct', 'set', str(vmid), f'--mp{mp_id}', mount_spec]
-        
-        if self.mock:
-            console.print(f"[dim][MOCK] Would run: {' '.join(cmd)}[/dim]")
-            return True
-        
-        try:
-            subprocess.run(cmd, capture_output=True, text=True, check=True)
-            return True
-        except subprocess.CalledProcessError:
+        mount_flags = self._mount_flags(mount, 0)  # Simplified
+        if mount_flags is None:
             return False
 
+        cmd = ['pct', 'set', str(vmid), *mount_flags]
+        return self._run(cmd, f"Error adding mount {mount}")
+
     def _get_next_vmid(self) -> int:
         """Get next available VMID."""
         return 100  # Simplified
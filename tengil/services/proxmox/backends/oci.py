@@ -1,13 +1,29 @@
 """OCI container backend using skopeo + Proxmox OCI support."""
+import os
+import shlex
 import subprocess
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
 from pathlib import Path
-from typing import Dict, Optional
+from typing import Dict, List, Optional, Set, Tuple
 
-from rich.console import Console
+from tengil.core.logger import get_logger
+from tengil.services.proxmox.lxc_config import mount_slots, read_lxc_config
 
 from .base import ContainerBackend
 
-console = Console()
+logger = get_logger(__name__)
+
+# Upper bound on concurrent skopeo copies issued by pull_images
+MAX_PARALLEL_PULLS = 8
+
+# Seconds a template directory listing is trusted before re-reading it
+TEMPLATE_INDEX_TTL = 10.0
+
+# Seconds a verified digest file vouches for its archive across runs before
+# the registry is asked again (0 always asks)
+DIGEST_RECHECK_INTERVAL = 3600.0
 
 
 class OCIBackend(ContainerBackend):
@@ -23,6 +39,14 @@ class OCIBackend(ContainerBackend):
         super().__init__(mock)
         self.node = node
         self.template_dir = Path('/var/lib/vz/template/cache')
+        self._pull_executor: Optional[ThreadPoolExecutor] = None
+        # skopeo sources already pulled/verified by this backend instance
+        self._session_pulls: Dict[str, str] = {}
+        # Pulls currently running, keyed by skopeo source
+        self._inflight: Dict[str, Future] = {}
+        self._inflight_lock = threading.Lock()
+        self._template_names: Optional[Set[str]] = None
+        self._template_index_at = 0.0
 
     def pull_image(
         self,
@@ -40,6 +64,45 @@ class OCIBackend(ContainerBackend):
         Returns:
             Template reference (e.g., 'local:vztmpl/jellyfin-latest.tar') or None if failed
         """
+        return self._pull_image(image, tag, registry)
+
+    def pull_images(
+        self,
+        requests: List[Tuple[str, str, Optional[str]]]
+    ) -> Dict[str, Optional[str]]:
+        """Pull several OCI images concurrently.
+        
+        skopeo copies are network-bound, so independent pulls overlap on a
+        shared thread pool instead of running back to back.
+        
+        Args:
+            requests: List of (image, tag, registry) tuples
+            
+        Returns:
+            Dict mapping 'image:tag' to its template reference (None if failed)
+        """
+        if not requests:
+            return {}
+
+        if self._pull_executor is None:
+            self._pull_executor = ThreadPoolExecutor(max_workers=MAX_PARALLEL_PULLS)
+
+        futures = {
+            self._pull_executor.submit(self._pull_image, image, tag, registry): f'{image}:{tag}'
+            for image, tag, registry in requests
+        }
+        results: Dict[str, Optional[str]] = {}
+        for future in as_completed(futures):
+            results[futures[future]] = future.result()
+        return results
+
+    def _pull_image(
+        self,
+        image: str,
+        tag: str,
+        registry: Optional[str]
+    ) -> Optional[str]:
+        """Pull one image, sharing the result with concurrent requests for it."""
         # Check if image already contains a registry (has domain-like prefix)
         if '/' in image and '.' in image.split('/')[0]:
             # Image already has registry (e.g., ghcr.io/owner/image)
@@ -60,23 +123,129 @@ class OCIBackend(ContainerBackend):
         cmd = ['skopeo', 'copy', source, dest]
         
         if self.mock:
-            console.print(f"[dim][MOCK] Would run: {' '.join(cmd)}[/dim]")
+            logger.info(f"MOCK: Would run: {shlex.join(cmd)}")
             return f'local:vztmpl/{filename}'
-        
+
+        if self._planned(cmd):
+            return f'local:vztmpl/{filename}'
+
+        # Concurrent requests for the same source wait on the first one's result
+        with self._inflight_lock:
+            future = self._inflight.get(source)
+            owner = future is None
+            if owner:
+                future = self._inflight[source] = Future()
+        if not owner:
+            return future.result()
+
         try:
-            with console.status(f"[cyan]Pulling {image}:{tag}...[/cyan]", spinner="dots"):
-                _ = subprocess.run(
-                    cmd,
-                    capture_output=True,
-                    text=True,
-                    check=True
-                )
-            console.print(f"[green]✓[/green] Pulled {image}:{tag}")
+            result = self._fetch_image(image, tag, source, filename, cmd)
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._inflight_lock:
+                del self._inflight[source]
+
+    def _fetch_image(
+        self,
+        image: str,
+        tag: str,
+        source: str,
+        filename: str,
+        cmd: List[str]
+    ) -> Optional[str]:
+        """Bring the archive for source up to date (the uncoalesced part of _pull_image)."""
+        # Already pulled or verified during this session: no skopeo fork at all
+        if source in self._session_pulls and filename in self._template_index():
+            return self._session_pulls[source]
+
+        # Re-pull only when the registry manifest changed since the archive was written
+        digest_path = self.template_dir / f'{filename}.digest'
+        digest = None
+        if filename in self._template_index():
+            # A recent verification (this or an earlier run) skips the registry entirely
+            if self._digest_fresh(digest_path):
+                logger.info(f"✓ {image}:{tag} verified recently, using cached archive")
+                self._session_pulls[source] = f'local:vztmpl/{filename}'
+                return f'local:vztmpl/{filename}'
+
+            digest = self._remote_digest(source)
+            if digest and digest_path.exists() and digest_path.read_text().strip() == digest:
+                logger.info(f"✓ {image}:{tag} is up to date")
+                os.utime(digest_path)  # restart the recheck interval
+                self._session_pulls[source] = f'local:vztmpl/{filename}'
+                return f'local:vztmpl/{filename}'
+        else:
+            # Record the digest of a first pull too, so the next run can skip it.
+            # Read before the copy: if the tag moves meanwhile, the stale digest
+            # only causes one extra pull later.
+            digest = self._remote_digest(source)
+
+        logger.info(f"Pulling {image}:{tag}...")
+        try:
+            _ = subprocess.run(
+                cmd,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.PIPE,
+                text=True,
+                check=True
+            )
+            self._template_names = None
+            if digest:
+                digest_path.write_text(f'{digest}\n')
+            logger.info(f"✓ Pulled {image}:{tag}")
+            self._session_pulls[source] = f'local:vztmpl/{filename}'
             return f'local:vztmpl/{filename}'
         except subprocess.CalledProcessError as e:
-            console.print(f"[red]✗[/red] Error pulling image: {e.stderr}")
+            logger.error(f"Error pulling image: {e.stderr}")
             return None
 
+    def _template_index(self) -> Set[str]:
+        """Return file names in template_dir, re-listed at most every TEMPLATE_INDEX_TTL seconds.
+        
+        One directory listing answers every "is this archive present?" check
+        in a batch instead of a stat per container.
+        """
+        now = time.monotonic()
+        if self._template_names is None or now - self._template_index_at > TEMPLATE_INDEX_TTL:
+            try:
+                self._template_names = set(os.listdir(self.template_dir))
+            except OSError:
+                self._template_names = set()
+            self._template_index_at = now
+        return self._template_names
+
+    @staticmethod
+    def _digest_fresh(digest_path: Path) -> bool:
+        """Whether digest_path was written or re-verified within DIGEST_RECHECK_INTERVAL."""
+        try:
+            return time.time() - digest_path.stat().st_mtime < DIGEST_RECHECK_INTERVAL
+        except OSError:
+            return False
+
+    def _remote_digest(self, source: str) -> Optional[str]:
+        """Fetch the manifest digest of a registry image (manifest only, no layers).
+        
+        Args:
+            source: skopeo source reference (docker://...)
+            
+        Returns:
+            Digest string (sha256:...) or None if it could not be determined
+        """
+        try:
+            result = subprocess.run(
+                ['skopeo', 'inspect', '--format', '{{.Digest}}', source],
+                capture_output=True,
+                text=True,
+                check=True
+            )
+        except subprocess.CalledProcessError:
+            return None
+        return result.stdout.strip() or None
+
     def create_container(
         self,
         spec: Dict,
@@ -103,7 +272,7 @@ class OCIBackend(ContainerBackend):
         mounts = spec.get('mounts', [])
         for mount in mounts:
             if not mount.get('source') or not mount.get('target'):
-                console.print(f"[red]✗[/red] Invalid mount spec (source/target required): {mount}")
+                logger.error(f"Invalid mount spec (source/target required): {mount}")
                 return None
 
         # Pull image if needed (unless template supplied)
@@ -114,16 +283,15 @@ class OCIBackend(ContainerBackend):
             registry = oci_spec.get('registry')
             
             if not image:
-                console.print("[red]✗[/red] No image specified in oci section")
+                logger.error("No image specified in oci section")
                 return None
             
             # Check if template exists or pull it
             image_name = image.split('/')[-1]
             template_name = f'{image_name}-{tag}.tar'
-            template_path = self.template_dir / template_name
             
-            if not template_path.exists():
-                console.print(f"[cyan]→[/cyan] Pulling OCI image: {image}:{tag}")
+            if template_name not in self._template_index():
+                logger.info(f"Pulling OCI image: {image}:{tag}")
                 template_ref = self.pull_image(image, tag, registry)
                 if not template_ref:
                     return None
@@ -133,74 +301,62 @@ class OCIBackend(ContainerBackend):
         # Get or allocate VMID
         vmid = spec.get('vmid') or self._get_next_vmid()
         
-        # Build pct create command
-        cmd = ['pct', 'create', str(vmid), template_ref]
-        
-        # Add basic options
         hostname = spec.get('hostname') or spec.get('name')
-        if hostname:
-            cmd.extend(['--hostname', hostname])
-        
+
         # Resources (prefer top-level, fallback to resources section)
-        cores = spec.get('cores') or spec.get('resources', {}).get('cores', 2)
-        memory = spec.get('memory') or spec.get('resources', {}).get('memory', 2048)
-        disk = spec.get('disk') or spec.get('resources', {}).get('disk', 8)
-        
-        cmd.extend([
-            '--cores', str(cores),
-            '--memory', str(memory),
-            '--rootfs', f'{storage}:{disk}',
-            '--ostype', 'unmanaged'  # CRITICAL: Run as OCI container, not LXC
-        ])
-        
-        # Network
+        resources = spec.get('resources', {})
+        cores = spec.get('cores') or resources.get('cores', 2)
+        memory = spec.get('memory') or resources.get('memory', 2048)
+        disk = spec.get('disk') or resources.get('disk', 8)
+
         network = spec.get('network', {})
-        bridge = network.get('bridge', 'vmbr0')
-        ip = network.get('ip', 'dhcp')
-        net_parts = ['name=eth0', f'bridge={bridge}']
-        # firewall flag if provided
-        if network.get('firewall') is not None:
-            net_parts.append(f'firewall={int(bool(network.get("firewall")))}')
-        if ip != 'dhcp':
-            net_parts.append(f'ip={ip}')
-            if network.get('gateway'):
-                net_parts.append(f'gw={network["gateway"]}')
-        else:
-            net_parts.append('ip=dhcp')
-        cmd.extend(['--net0', ','.join(net_parts)])
-        
-        # Unprivileged (default for OCI)
-        if spec.get('unprivileged', True):
-            cmd.extend(['--unprivileged', '1'])
+        firewall = network.get('firewall')
+        net0 = self._net0_str(
+            network.get('bridge', 'vmbr0'),
+            network.get('ip', 'dhcp'),
+            network.get('gateway'),
+            # firewall flag only if provided
+            int(bool(firewall)) if firewall is not None else None,
+        )
 
-        # Features
         features = spec.get('features', {})
         if not isinstance(features, dict):
             features = {}
-        if features:
-            feature_str = ','.join(f'{k}={int(v)}' for k, v in features.items() if v is not None)
-            if feature_str:
-                cmd.extend(['--features', feature_str])
+        feature_str = self._features_str(
+            frozenset((k, int(v)) for k, v in features.items() if v is not None)
+        )
 
         # Environment variables at create time (gap noted in Proxmox UI)
         env = spec.get('env') or oci_spec.get('env') or {}
-        for key, value in env.items():
-            cmd.extend(['--env', f'{key}={value}'])
-        
-        # Pool
-        if pool:
-            cmd.extend(['--pool', pool])
+
+        # Build pct create command
+        cmd = ['pct', 'create', str(vmid), template_ref]
+        cmd += ['--hostname', hostname] if hostname else []
+        cmd += [
+            '--cores', str(cores),
+            '--memory', str(memory),
+            '--rootfs', f'{storage}:{disk}',
+            '--ostype', 'unmanaged',  # CRITICAL: Run as OCI container, not LXC
+            '--net0', net0,
+        ]
+        # Unprivileged (default for OCI)
+        cmd += ['--unprivileged', '1'] if spec.get('unprivileged', True) else []
+        cmd += ['--features', feature_str] if feature_str else []
+        cmd += [arg for key, value in env.items() for arg in ('--env', f'{key}={value}')]
+        cmd += ['--pool', pool] if pool else []
         
         # Execute creation
         if self.mock:
-            console.print(f"[dim][MOCK] Would run: {' '.join(cmd)}[/dim]")
+            logger.info(f"MOCK: Would run: {shlex.join(cmd)}")
             return vmid
         
         try:
-            with console.status(f"[cyan]Creating container {vmid}...[/cyan]", spinner="dots"):
+            if not self._planned(cmd):
+                logger.info(f"Creating container {vmid}...")
                 _ = subprocess.run(
                     cmd,
-                    capture_output=True,
+                    stdout=subprocess.DEVNULL,
+                    stderr=subprocess.PIPE,
                     text=True,
                     check=True
                 )
@@ -215,53 +371,41 @@ class OCIBackend(ContainerBackend):
             elif isinstance(gpu_cfg, bool):
                 gpu_enabled = gpu_cfg
 
+            # GPU devices and mounts go in one pct set (one config lock/write)
+            set_flags: List[str] = []
             if gpu_enabled or features.get('gpu'):
-                with console.status(f"[cyan]Configuring GPU for {vmid}...[/cyan]", spinner="dots"):
-                    self.configure_gpu(vmid, gpu_type)
-            
-            # Add mounts
-            mounts = spec.get('mounts', [])
-            for mount in mounts:
-                if not self._add_mount(vmid, mount):
-                    console.print(f"[red]✗[/red] Error adding mount: {mount}")
+                set_flags.extend(self._gpu_flags(gpu_type))
+
+            # New container: mount slots start at mp0
+            for slot, mount in enumerate(spec.get('mounts', [])):
+                mount_flags = self._mount_flags(mount, slot)
+                if mount_flags is None:
+                    logger.error(f"Invalid mount spec: {mount}")
                     return None
+                set_flags.extend(mount_flags)
+
+            if set_flags and not self._run(
+                ['pct', 'set', str(vmid), *set_flags],
+                f"Error configuring devices/mounts for {vmid}"
+            ):
+                return None
             
-            console.print(f"[green]✓[/green] Created container {vmid}")
+            logger.info(f"✓ Created container {vmid}")
             return vmid
             
         except subprocess.CalledProcessError as e:
-            console.print(f"[red]✗[/red] Error creating container: {e.stderr}")
+            logger.error(f"Error creating container: {e.stderr}")
             return None
 
     def start_container(self, vmid: int) -> bool:
         """Start OCI container."""
         cmd = ['pct', 'start', str(vmid)]
-        
-        if self.mock:
-            console.print(f"[dim][MOCK] Would run: {' '.join(cmd)}[/dim]")
-            return True
-        
-        try:
-            subprocess.run(cmd, capture_output=True, text=True, check=True)
-            return True
-        except subprocess.CalledProcessError as e:
-            console.print(f"[red]✗[/red] Error starting container {vmid}: {e.stderr}")
-            return False
+        return self._run(cmd, f"Error starting container {vmid}")
 
     def stop_container(self, vmid: int, timeout: int = 30) -> bool:
         """Stop OCI container."""
         cmd = ['pct', 'stop', str(vmid), '--timeout', str(timeout)]
-        
-        if self.mock:
-            console.print(f"[dim][MOCK] Would run: {' '.join(cmd)}[/dim]")
-            return True
-        
-        try:
-            subprocess.run(cmd, capture_output=True, text=True, check=True)
-            return True
-        except subprocess.CalledProcessError as e:
-            console.print(f"[red]✗[/red] Error stopping container {vmid}: {e.stderr}")
-            return False
+        return self._run(cmd, f"Error stopping container {vmid}")
 
     def update_env(self, vmid: int, env: Dict[str, str]) -> bool:
         """Apply environment variables to an existing OCI container."""
@@ -274,99 +418,30 @@ class OCIBackend(ContainerBackend):
 
         cmd = ['pct', 'set', str(vmid)] + args
 
-        if self.mock:
-            console.print(f"[dim][MOCK] Would run: {' '.join(cmd)}[/dim]")
-            return True
-
-        try:
-            subprocess.run(cmd, capture_output=True, text=True, check=True)
-            console.print(f"[green]✓[/green] Updated env for OCI container {vmid}")
-            return True
-        except subprocess.CalledProcessError as e:
-            console.print(f"[red]✗[/red] Error updating env for container {vmid}: {e.stderr}")
+        if not self._run(cmd, f"Error updating env for container {vmid}"):
             return False
+        if not self.mock:
+            logger.info(f"✓ Updated env for OCI container {vmid}")
+        return True
 
     def destroy_container(self, vmid: int, purge: bool = False) -> bool:
         """Destroy OCI container."""
         cmd = ['pct', 'destroy', str(vmid)]
         if purge:
             cmd.append('--purge')
-        
-        if self.mock:
-            console.print(f"[dim][MOCK] Would run: {' '.join(cmd)}[/dim]")
-            return True
-        
-        try:
-            subprocess.run(cmd, capture_output=True, text=True, check=True)
-            return True
-        except subprocess.CalledProcessError as e:
-            console.print(f"[red]✗[/red] Error destroying container {vmid}: {e.stderr}")
-            return False
-
-    def container_exists(self, vmid: int) -> bool:
-        """Check if container exists."""
-        cmd = ['pct', 'status', str(vmid)]
-        
-        if self.mock:
-            return False
-        
-        try:
-            subprocess.run(cmd, capture_output=True, text=True, check=True)
-            return True
-        except subprocess.CalledProcessError:
-            return False
-
-    def configure_gpu(self, vmid: int, gpu_type: Optional[str] = None) -> bool:
-        """Configure GPU passthrough."""
-        # Add Intel GPU devices (most common)
-        devices = [
-            ('--dev0', '/dev/dri/card0,mode=0666'),
-            ('--dev1', '/dev/dri/renderD128,mode=0666')
-        ]
-        
-        cmd = ['pct', 'set', str(vmid)]
-        for flag, device in devices:
-            cmd.extend([flag, device])
-        
-        if self.mock:
-            console.print(f"[dim][MOCK] Would run: {' '.join(cmd)}[/dim]")
-            return True
-        
-        try:
-            subprocess.run(cmd, capture_output=True, text=True, check=True)
-            return True
-        except subprocess.CalledProcessError as e:
-            console.print(f"[red]✗[/red] Error configuring GPU for {vmid}: {e.stderr}")
-            return False
+        return self._run(cmd, f"Error destroying container {vmid}")
 
     def _add_mount(self, vmid: int, mount: Dict) -> bool:
         """Add mount point to container."""
-        source = mount.get('source')
-        target = mount.get('target')
-        readonly = mount.get('readonly', False)
-        
-        if not source or not target:
-            console.print(f"[red]✗[/red] Invalid mount spec: {mount}")
-            return False
-        
         # Find next available mpX slot
-        mp_id = self._get_next_mp_slot(vmid)
-        ro_flag = ',ro=1' if readonly else ''
-        mount_spec = f'{source},mp={target}{ro_flag}'
-        
-        cmd = ['pct', 'set', str(vmid), f'--mp{mp_id}', mount_spec]
-        
-        if self.mock:
-            console.print(f"[dim][MOCK] Would run: {' '.join(cmd)}[/dim]")
-            return True
-        
-        try:
-            subprocess.run(cmd, capture_output=True, text=True, check=True)
-            return True
-        except subprocess.CalledProcessError as e:
-            console.print(f"[red]✗[/red] Error adding mount {mount}: {e.stderr}")
+        mount_flags = self._mount_flags(mount, self._get_next_mp_slot(vmid))
+        if mount_flags is None:
+            logger.error(f"Invalid mount spec: {mount}")
             return False
 
+        cmd = ['pct', 'set', str(vmid), *mount_flags]
+        return self._run(cmd, f"Error adding mount {mount}")
+
     def _get_next_vmid(self) -> int:
         """Get next available VMID."""
         # Simple implementation: start at 200 for OCI containers
@@ -375,25 +450,12 @@ class OCIBackend(ContainerBackend):
 
     def _get_next_mp_slot(self, vmid: int) -> int:
         """Get next available mount point slot."""
-        if self.mock:
+        if self.mock or self.plan is not None:
             return 0
 
         try:
-            result = subprocess.run(
-                ['pct', 'config', str(vmid)],
-                capture_output=True,
-                text=True,
-                check=True
-            )
-            max_slot = -1
-            for line in result.stdout.splitlines():
-                line = line.strip()
-                if line.startswith('mp') and ':' in line:
-                    try:
-                        slot = int(line.split(':', 1)[0][2:])
-                        max_slot = max(max_slot, slot)
-                    except ValueError:
-                        continue
-            return max_slot + 1
-        except subprocess.CalledProcessError:
+            config = read_lxc_config(vmid)
+        except OSError:
             return 0
+
+        return max(mount_slots(config), default=-1) + 1
@@ -11,7 +11,7 @@ For backward compatibility, ContainerManager is aliased to ContainerOrchestrator
 """
 from .discovery import ContainerDiscovery
 from .lifecycle import ContainerLifecycle
-from .mounts import MountManager
+from .mounts import MountManager, MountResult
 from .orchestrator import ContainerOrchestrator
 from .templates import TemplateManager
 
@@ -23,6 +23,7 @@ __all__ = [
     'ContainerDiscovery',
     'ContainerLifecycle',
     'MountManager',
+    'MountResult',
     'ContainerOrchestrator',
     'ContainerManager',  # Backward compatibility
 ]
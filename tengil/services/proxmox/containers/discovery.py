@@ -1,21 +1,110 @@
 """Container discovery and information retrieval."""
+import json
+import os
 import subprocess
-from pathlib import Path
-from typing import Dict, List, Optional
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Set, Tuple, Union
+
+import requests
 
 from tengil.core.logger import get_logger
+from tengil.services.proxmox.lxc_config import config_vmids, lxc_config_path, read_lxc_config
 
 logger = get_logger(__name__)
 
+# Upper bound on concurrent per-container config reads
+MAX_PARALLEL_CONFIG_READS = 16
+
+# Seconds a container listing or config read is reused outside a cached() pass
+LIST_CACHE_TTL = 2.0
+
+# Local Proxmox REST endpoint, used for listings when an API token is set
+PVE_API_URL = 'https://localhost:8006/api2/json'
+PVE_API_TIMEOUT = 5
+
+# CA that signs the node certificates (not in certifi's bundle); overridable
+# with TG_PVE_API_CA next to TG_PVE_API_TOKEN
+PVE_ROOT_CA = '/etc/pve/pve-root-ca.pem'
+
+
+def default_api_verify() -> Union[bool, str]:
+    """Return the TLS verification setting for the local Proxmox API.
+
+    TG_PVE_API_CA wins if set; otherwise the cluster CA is used when
+    present, else requests' default bundle.
+    """
+    ca_path = os.environ.get('TG_PVE_API_CA')
+    if ca_path:
+        return ca_path
+    return PVE_ROOT_CA if os.path.exists(PVE_ROOT_CA) else True
+
 
 class ContainerDiscovery:
     """Discovers and retrieves information about Proxmox LXC containers."""
 
-    def __init__(self, mock: bool = False):
+    def __init__(
+        self,
+        mock: bool = False,
+        api_token: Optional[str] = None,
+        api_url: str = PVE_API_URL,
+        api_verify: Optional[Union[bool, str]] = None,
+    ):
+        """Initialize discovery.
+
+        Args:
+            mock: If True, return canned data
+            api_token: Proxmox API token (``user@realm!id=secret``); defaults to
+                TG_PVE_API_TOKEN. When set, listings use the REST API instead of
+                forking pvesh, falling back to pvesh on any HTTP error.
+            api_url: Base URL of the Proxmox API
+            api_verify: TLS verification for the API (bool or CA bundle path);
+                defaults to :func:`default_api_verify`
+        """
         self.mock = mock
+        self.api_token = api_token or os.environ.get('TG_PVE_API_TOKEN')
+        self.api_url = api_url.rstrip('/')
+        self.api_verify = default_api_verify() if api_verify is None else api_verify
+        self._session: Optional[requests.Session] = None
+        # Container listing and configs, reused for LIST_CACHE_TTL seconds
+        # (or the whole cached() pass)
+        self._caching = False
+        self._list_cache: Optional[List[Dict]] = None
+        self._list_cached_at = 0.0
+        # (listing it was built from, name -> vmid); only valid for that listing
+        self._name_index: Optional[Tuple[List[Dict], Dict[str, int]]] = None
+        self._config_cache: Dict[int, Tuple[float, Dict]] = {}
+
+    @contextmanager
+    def cached(self):
+        """Reuse ``pct list`` and config reads for one orchestration pass.
+
+        Callers that change a container during the pass must call
+        :meth:`invalidate` so later lookups see the new state.
+        """
+        self._caching = True
+        try:
+            yield self
+        finally:
+            self._caching = False
+            self.invalidate()
+
+    def invalidate(self, vmid: Optional[int] = None) -> None:
+        """Drop cached discovery data.
+
+        Args:
+            vmid: Container whose config and status changed; None drops everything
+        """
+        self._list_cache = None
+        self._name_index = None
+        if vmid is None:
+            self._config_cache.clear()
+        else:
+            self._config_cache.pop(vmid, None)
 
     def list_containers(self) -> List[Dict]:
-        """List all LXC containers.
+        """List all LXC containers on this node.
 
         Returns:
             List of container dicts with vmid, name, status
@@ -27,32 +116,125 @@ class ContainerDiscovery:
                 {'vmid': 101, 'name': 'nextcloud', 'status': 'stopped'}
             ]
 
-        containers = []
+        if self._list_cache is not None and (
+            self._caching or time.monotonic() - self._list_cached_at < LIST_CACHE_TTL
+        ):
+            return self._list_cache
+
         try:
-            # Use pct list to get all containers
-            result = subprocess.run(
-                ["pct", "list"],
-                capture_output=True,
-                text=True,
-                check=True
+            entries = self._fetch_api_entries() if self.api_token else None
+            if entries is None:
+                entries = self._fetch_pvesh_entries()
+            containers = sorted(
+                (
+                    {
+                        'vmid': int(entry['vmid']),
+                        'status': entry.get('status', 'unknown'),
+                        'name': entry.get('name', '')
+                    }
+                    for entry in entries
+                ),
+                key=lambda c: c['vmid']
             )
 
-            # Parse output (skip header)
-            for line in result.stdout.strip().split('\n')[1:]:
-                if line:
-                    parts = line.split()
-                    if len(parts) >= 3:
-                        containers.append({
-                            'vmid': int(parts[0]),
-                            'status': parts[1],
-                            'name': parts[2] if len(parts) > 2 else ''
-                        })
-
         except subprocess.CalledProcessError as e:
             logger.error(f"Failed to list containers: {e}")
-
+            return []
+        except (ValueError, KeyError, TypeError) as e:
+            logger.error(f"Failed to parse container list: {e}")
+            return []
+
+        self._list_cache = containers
+        self._list_cached_at = time.monotonic()
+        self._name_index = None
         return containers
 
+    def _fetch_pvesh_entries(self) -> List[Dict]:
+        """Return raw container entries from pvesh.
+
+        pvesh returns typed JSON; pct list's text columns shift when a
+        container holds a lock.
+        """
+        result = subprocess.run(
+            ["pvesh", "get", "/nodes/localhost/lxc", "--output-format", "json"],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            check=True,
+            close_fds=False  # our fds are non-inheritable (PEP 446); skip the close loop
+        )
+        return json.loads(result.stdout or '[]')
+
+    def _fetch_api_entries(self) -> Optional[List[Dict]]:
+        """Return raw container entries from the REST API, or None on failure."""
+        try:
+            return self.api_call('get', '/nodes/localhost/lxc')
+        except (requests.RequestException, ValueError, KeyError) as e:
+            logger.warning(f"Proxmox API listing failed, falling back to pvesh: {e}")
+            return None
+
+    def api_call(self, method: str, path: str, data: Optional[Dict] = None) -> Any:
+        """Call the Proxmox REST API and return its ``data`` payload.
+
+        One keep-alive session is reused so repeat calls skip both the fork
+        and the TLS handshake.
+
+        Args:
+            method: HTTP method ('get', 'post', 'put', ...)
+            path: API path below api_url, e.g. '/nodes/localhost/lxc'
+            data: Form parameters for the request, if any
+
+        Raises:
+            requests.RequestException: On connection or HTTP errors
+            ValueError, KeyError: On a malformed response
+        """
+        if self._session is None:
+            self._session = requests.Session()
+            self._session.headers['Authorization'] = f'PVEAPIToken={self.api_token}'
+            self._session.verify = self.api_verify
+
+        response = getattr(self._session, method)(
+            f'{self.api_url}{path}', data=data, timeout=PVE_API_TIMEOUT
+        )
+        response.raise_for_status()
+        return response.json()['data']
+
+    def list_cluster_vmids(self) -> Set[int]:
+        """Return every VMID in use across the cluster.
+
+        VMIDs are unique cluster-wide and shared with QEMU VMs, so allocation
+        must look beyond this node's containers. Falls back to the local
+        listing when the cluster query fails.
+
+        Returns:
+            Set of used VMIDs
+        """
+        if self.mock:
+            return {c['vmid'] for c in self.list_containers()}
+
+        try:
+            result = subprocess.run(
+                ["pvesh", "get", "/cluster/resources", "--type", "vm", "--output-format", "json"],
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                text=True,
+                check=True,
+                close_fds=False
+            )
+            return {int(entry['vmid']) for entry in json.loads(result.stdout or '[]')}
+        except (subprocess.CalledProcessError, ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Cluster resource listing failed, using local containers: {e}")
+            return self.list_local_vmids()
+
+    def list_local_vmids(self) -> Set[int]:
+        """Return VMIDs of containers on this node from their config files.
+
+        A directory scan needs no pct/pvesh process at all.
+        """
+        if self.mock:
+            return {c['vmid'] for c in self.list_containers()}
+        return config_vmids()
+
     def find_container_by_name(self, name: str) -> Optional[int]:
         """Find container VMID by name.
 
@@ -63,10 +245,23 @@ class ContainerDiscovery:
             Container VMID or None if not found
         """
         containers = self.list_containers()
-        for container in containers:
-            if container.get('name') == name:
-                return container['vmid']
-        return None
+        if containers is not self._list_cache:
+            # Uncached listing (mock or failed call); indexing it would not pay off
+            for container in containers:
+                if container.get('name') == name:
+                    return container['vmid']
+            return None
+
+        # Index each listing snapshot once, first match wins as in the scan.
+        # The index is tied to its listing: a worker may finish building one
+        # from a listing that has since been replaced, and must not serve it.
+        cached_index = self._name_index
+        if cached_index is None or cached_index[0] is not containers:
+            index: Dict[str, int] = {}
+            for container in containers:
+                index.setdefault(container.get('name'), container['vmid'])
+            cached_index = self._name_index = (containers, index)
+        return cached_index[1].get(name)
 
     def get_container_config(self, vmid: int) -> Dict:
         """Get raw configuration for a specific container.
@@ -85,25 +280,26 @@ class ContainerDiscovery:
                 'mp0': '/tank/media,mp=/media'
             }
 
+        cached = self._config_cache.get(vmid)
+        if cached is not None and (
+            self._caching or time.monotonic() - cached[0] < LIST_CACHE_TTL
+        ):
+            return cached[1]
+
         config = {}
-        config_path = Path(f"/etc/pve/lxc/{vmid}.conf")
+        config_path = lxc_config_path(vmid)
 
         if not config_path.exists():
             logger.warning(f"Container config not found: {config_path}")
             return config
 
         try:
-            with open(config_path) as f:
-                for line in f:
-                    line = line.strip()
-                    if line and not line.startswith('#'):
-                        if ':' in line:
-                            key, value = line.split(':', 1)
-                            config[key.strip()] = value.strip()
-
+            config = read_lxc_config(vmid)
         except Exception as e:
             logger.error(f"Failed to read container config: {e}")
+            return config
 
+        self._config_cache[vmid] = (time.monotonic(), config)
         return config
 
     def get_container_info(self, vmid: int) -> Optional[Dict]:
@@ -142,25 +338,37 @@ class ContainerDiscovery:
                 }
             return None
 
-        # Check if container exists
-        if not self.container_exists(vmid):
-            return None
-
-        # Get basic info from pct list
+        # A row in the listing already proves the container exists
         containers = self.list_containers()
         container_info = next((c for c in containers if c['vmid'] == vmid), None)
 
         if not container_info:
             return None
 
-        # Get config details
-        config = self.get_container_config(vmid)
+        return self._info_from_snapshot(container_info)
+
+    def _info_from_snapshot(self, container: Dict) -> Dict:
+        """Build container details from a listing row plus its config file."""
+        return self._assemble_info(container, self.get_container_config(container['vmid']))
+
+    @staticmethod
+    def _assemble_info(container: Dict, config: Dict) -> Dict:
+        """Combine a listing row and a parsed config into container details.
+
+        Args:
+            container: Row from list_containers (vmid, name, status)
+            config: Parsed config from get_container_config
+
+        Returns:
+            Container info dict (see get_container_info)
+        """
+        vmid = container['vmid']
 
         # Extract relevant fields
         info = {
             'vmid': vmid,
-            'name': container_info.get('name', config.get('hostname', '')),
-            'status': container_info.get('status', 'unknown'),
+            'name': container.get('name', config.get('hostname', '')),
+            'status': container.get('status', 'unknown'),
             'template': config.get('ostemplate', ''),
             'memory': int(config.get('memory', 512)),
             'cores': int(config.get('cores', 1)),
@@ -193,21 +401,30 @@ class ContainerDiscovery:
             List of container info dicts
         """
         containers = self.list_containers()
-        result = []
-
-        for container in containers:
-            vmid = container['vmid']
-            info = self.get_container_info(vmid)
-            if info:
-                result.append(info)
-
-        return result
 
-    def container_exists(self, vmid: int) -> bool:
+        if self.mock:
+            result = []
+            for container in containers:
+                info = self.get_container_info(container['vmid'])
+                if info:
+                    result.append(info)
+            return result
+
+        if not containers:
+            return []
+
+        # Rows from one pct list already prove existence; only configs remain,
+        # and those reads overlap well across threads
+        workers = min(MAX_PARALLEL_CONFIG_READS, len(containers))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(self._info_from_snapshot, containers))
+
+    def container_exists(self, vmid: int, strict: bool = False) -> bool:
         """Check if a container exists.
 
         Args:
             vmid: Container ID
+            strict: Ask ``pct status`` instead of checking for the config file
 
         Returns:
             True if container exists
@@ -215,9 +432,18 @@ class ContainerDiscovery:
         if self.mock:
             return True  # In mock mode, assume container exists
 
-        try:
-            cmd = ["pct", "status", str(vmid)]
-            subprocess.run(cmd, check=True, capture_output=True, text=True)
-            return True
-        except subprocess.CalledProcessError:
-            return False
+        if strict:
+            result = subprocess.run(
+                ['pct', 'status', str(vmid)],
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                check=False,
+                close_fds=False
+            )
+            return result.returncode == 0
+
+        if self._caching:
+            return any(c['vmid'] == vmid for c in self.list_containers())
+
+        # Config file presence is what pct status checks, minus the fork
+        return lxc_config_path(vmid).exists()
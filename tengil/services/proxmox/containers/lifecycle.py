@@ -1,23 +1,170 @@
 """Container lifecycle management (create, start, stop)."""
+import functools
+import ipaddress
+import logging
+import re
 import shlex
+import shutil
 import subprocess
-from typing import Dict, List, Optional
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+from urllib.parse import quote
+
+import requests
 
 from tengil.core.logger import get_logger
+from tengil.discovery.hwdetect import SystemDetector
+from tengil.services.proxmox.lxc_config import lxc_config_path
 
 from .discovery import ContainerDiscovery
 from .templates import TemplateManager
 
 logger = get_logger(__name__)
 
+# Upper bound on concurrent pct invocations for bulk operations
+MAX_PCT_PARALLEL = 8
+
+
+@functools.lru_cache(maxsize=None)
+def _command_path(name: str) -> str:
+    """Absolute path of a command on PATH (the bare name if not found)."""
+    return shutil.which(name) or name
+
+
+def spawn_argv(cmd: List[str]) -> List[str]:
+    """Return cmd with its program resolved to an absolute path.
+
+    subprocess only launches through posix_spawn (no page-table copy of
+    this process, unlike fork) when the executable has a directory part,
+    close_fds is False and there is no preexec_fn/cwd/pass_fds. Keep pct
+    call sites within those limits.
+    """
+    return [_command_path(cmd[0]), *cmd[1:]]
+
+
+def _run_pct(cmd: List[str]) -> subprocess.CompletedProcess:
+    """Run a pct command, keeping only stderr for error reporting.
+
+    close_fds=False skips the per-spawn close loop over inherited
+    descriptors. This is safe because Python creates every descriptor
+    non-inheritable (PEP 446); only stdio reaches pct. Together with the
+    absolute path from :func:`spawn_argv` it lets subprocess use
+    posix_spawn. stderr stays raw bytes; read it with :func:`stderr_text`
+    on failure.
+
+    Raises:
+        subprocess.CalledProcessError: If pct exits non-zero
+    """
+    return subprocess.run(
+        spawn_argv(cmd),
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        check=True,
+        close_fds=False
+    )
+
+
+# pct start's complaint about a running container (matched on raw stderr bytes)
+_ALREADY_RUNNING = re.compile(rb'already running', re.IGNORECASE)
+
+
+def _already_running(error: subprocess.CalledProcessError) -> bool:
+    """Whether a failed start only means the container was already running."""
+    stderr = error.stderr or b''
+    if isinstance(stderr, str):  # API task exit status
+        stderr = stderr.encode()
+    return _ALREADY_RUNNING.search(stderr) is not None
+
+
+def stderr_text(error: subprocess.CalledProcessError) -> str:
+    """Return a failed command's stderr as text, decoding bytes only now."""
+    stderr = error.stderr
+    if isinstance(stderr, bytes):
+        return stderr.decode('utf-8', 'replace')
+    return stderr or ''
+
+
+# Polling of asynchronous Proxmox API tasks (start/stop/reboot)
+API_TASK_TIMEOUT = 300
+API_TASK_POLL = 0.5
+
+# Root disk (GB) of warm base containers; clones are grown to the spec size
+WARM_BASE_DISK = 2
+
+# Unit suffixes dropped from disk sizes ('128G' -> '128')
+_DISK_SUFFIXES = str.maketrans('', '', 'GgMmKkTt')
+
+
+def _warm_base_name(template: str, privileged: bool) -> str:
+    """Hostname of the warm base for a template and privilege level."""
+    suffix = '-priv' if privileged else ''
+    return f"tengil-warm-{template.split('_')[0].replace('.', '-')}"[:63 - len(suffix)] + suffix
+
+
+@functools.lru_cache(maxsize=64)
+def _net_config(bridge: str, ip: str, gateway: Optional[str], firewall: str) -> str:
+    """Render the ``--net0`` value (memoized, specs reuse a few networks)."""
+    parts = ['name=eth0', f'bridge={bridge}', f'firewall={firewall}', f'ip={ip}']
+    if ip != 'dhcp' and gateway:
+        parts.append(f'gw={gateway}')
+    return ','.join(parts)
+
+
+@functools.lru_cache(maxsize=1)
+def _detect_host_gpus() -> Tuple[Dict, ...]:
+    """Detect the host's GPUs once per process (lspci/nvidia-smi are slow).
+
+    Hardware does not change under a running apply; call
+    ``_detect_host_gpus.cache_clear()`` to force a fresh probe.
+    """
+    return tuple(SystemDetector()._detect_gpu())
+
+
+def _invalid_ip(spec: Dict) -> Optional[str]:
+    """Return the spec's network ip if it is neither dhcp/manual nor a valid address."""
+    ip = spec.get('network', {}).get('ip', 'dhcp')
+    if ip in ('dhcp', 'manual'):
+        return None
+    try:
+        ipaddress.ip_interface(ip)
+    except ValueError:
+        return ip
+    return None
+
+
+def _tags_value(tags) -> Optional[str]:
+    """Render ``--tags`` from a comma string or a list of tags."""
+    if not tags:
+        return None
+    if isinstance(tags, str):
+        return tags
+    return ",".join(tag.strip() for tag in tags if tag) or None
+
+
+def _startup_value(startup: Optional[str], order=None, delay=None) -> Optional[str]:
+    """Render ``--startup``; an explicit string wins over order/delay."""
+    if startup:
+        return startup
+    parts = []
+    if order is not None:
+        parts.append(f"order={order}")
+    if delay is not None:
+        parts.append(f"up={delay}")
+    return ",".join(parts) or None
+
 
 class ContainerLifecycle:
     """Manages LXC container lifecycle operations."""
 
-    def __init__(self, mock: bool = False):
+    def __init__(self, mock: bool = False, discovery: Optional[ContainerDiscovery] = None,
+                 templates: Optional[TemplateManager] = None):
         self.mock = mock
-        self.templates = TemplateManager(mock=mock)
-        self.discovery = ContainerDiscovery(mock=mock)
+        self.templates = templates or TemplateManager(mock=mock)
+        self.discovery = discovery or ContainerDiscovery(mock=mock)
+        # (template, storage, privileged) -> VMID of a Proxmox template container
+        self._warm_bases: Dict[Tuple[str, str, bool], int] = {}
 
     def create_container(
         self,
@@ -51,6 +198,12 @@ class ContainerLifecycle:
             logger.error("Container template not specified in spec")
             return None
 
+        # Reject a malformed static IP before any download or pct call
+        bad_ip = _invalid_ip(spec)
+        if bad_ip is not None:
+            logger.error(f"Invalid static IP '{bad_ip}' in network config")
+            return None
+
         # Ensure template is available (download if needed)
         if not self.templates.ensure_template_available(template):
             logger.error(f"Template {template} not available and download failed")
@@ -79,14 +232,167 @@ class ContainerLifecycle:
         # Resolve template name to full filename
         template_file = self.templates.resolve_template_filename(template)
 
-        # Build pct create command
-        # Template is always from template_storage (usually 'local'), rootfs goes to storage
-        cmd = [
-            'pct', 'create', str(vmid),
-            f'{template_storage}:vztmpl/{template_file}',
-            '--hostname', name,
-        ]
+        cmd = self._create_argv(spec, vmid, name, template_file, storage, pool, template_storage)
+        self._resolve_gpu_type(spec)
+
+        warm_vmid = self._warm_bases.get((template, storage, bool(spec.get('privileged', False))))
+
+        try:
+            if warm_vmid is not None:
+                logger.info(f"Cloning container {vmid} ({name}) from warm base {warm_vmid}")
+                self._clone_from_warm(warm_vmid, cmd)
+            else:
+                logger.info(f"Creating container {vmid} ({name}) with template {template}")
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("Command: %s", shlex.join(cmd))
+
+                subprocess.run(
+                    cmd,
+                    capture_output=True,
+                    text=True,
+                    check=True
+                )
 
+            logger.info(f"✓ Container {vmid} ({name}) created successfully")
+            self.discovery.invalidate()
+            self._finish_create(vmid, spec)
+            return vmid
+
+        except subprocess.CalledProcessError as e:
+            logger.error(f"Failed to create container {vmid}: {e}")
+            if e.stderr:
+                logger.error(f"Error output: {e.stderr}")
+            return None
+
+    def create_containers(
+        self,
+        specs: List[Dict],
+        storage: str = 'local-lvm',
+        pool: Optional[str] = None,
+        template_storage: str = 'local'
+    ) -> List[Optional[int]]:
+        """Create several LXC containers with one shell invocation.
+
+        All ``pct create`` command lines go to a single ``bash -s`` instead
+        of one subprocess each. Templates are checked and resolved once per
+        distinct template, and missing VMIDs come from one cluster listing.
+
+        Args:
+            specs: Container specifications (see create_container)
+            storage: Storage backend for rootfs (default: local-lvm)
+            pool: Resource pool name (optional, per-spec 'pool' otherwise)
+            template_storage: Storage backend where templates are stored
+
+        Returns:
+            VMID (or None on failure) for each spec, in order
+        """
+        if self.mock or len(specs) <= 1:
+            return [self.create_container(spec, storage, pool, template_storage) for spec in specs]
+
+        results: List[Optional[int]] = [None] * len(specs)
+        # VMIDs other specs in this batch ask for are taken too
+        fresh_vmids = iter(self.allocate_vmids(
+            sum(1 for spec in specs if not spec.get('vmid')),
+            reserved=(spec['vmid'] for spec in specs if spec.get('vmid')),
+        ))
+        # Check or download every distinct template up front, concurrently
+        available = self.templates.ensure_templates_available(
+            spec['template'] for spec in specs if spec.get('template')
+        )
+        template_files: Dict[str, Optional[str]] = {}
+        batch = []
+
+        for index, spec in enumerate(specs):
+            template = spec.get('template')
+            if not template:
+                logger.error("Container template not specified in spec")
+                continue
+
+            bad_ip = _invalid_ip(spec)
+            if bad_ip is not None:
+                logger.error(f"Invalid static IP '{bad_ip}' in network config")
+                continue
+
+            if template not in template_files:
+                template_files[template] = (
+                    self.templates.resolve_template_filename(template)
+                    if available[template] else None
+                )
+            if template_files[template] is None:
+                logger.error(f"Template {template} not available and download failed")
+                continue
+
+            vmid = spec.get('vmid') or next(fresh_vmids)
+            if self.discovery.container_exists(vmid):
+                logger.warning(f"Container {vmid} already exists, skipping creation")
+                results[index] = vmid
+                continue
+
+            spec_pool = pool if pool is not None else spec.get('pool')
+            if (template, storage, bool(spec.get('privileged', False))) in self._warm_bases:
+                # Cloning is already cheap; keep its multi-step path
+                results[index] = self.create_container(
+                    {**spec, 'vmid': vmid}, storage, spec_pool, template_storage
+                )
+                continue
+
+            name = spec.get('name', f'ct{vmid}')
+            cmd = self._create_argv(
+                spec, vmid, name, template_files[template], storage, spec_pool, template_storage
+            )
+            self._resolve_gpu_type(spec)
+            batch.append((index, vmid, name, spec, cmd))
+
+        if not batch:
+            return results
+
+        # One line per container: "<vmid> <exit code> <stderr on one line>".
+        # bash reads the script from stdin, so each command gets /dev/null as
+        # stdin; otherwise anything reading it would swallow the later lines
+        script = ''.join(
+            f"err=$({shlex.join(cmd)} 2>&1 >/dev/null </dev/null); "
+            f"echo \"{vmid} $? ${{err//$'\\n'/ }}\"\n"
+            for _, vmid, _, _, cmd in batch
+        )
+        logger.info(f"Creating {len(batch)} containers in one batch")
+        result = subprocess.run(['bash', '-s'], input=script, capture_output=True, text=True)
+        if result.returncode != 0:
+            logger.error(
+                f"Batch create script exited with {result.returncode}: "
+                f"{result.stderr.strip() or 'no output'}"
+            )
+
+        outcomes = {}
+        for line in result.stdout.splitlines():
+            vmid_str, _, rest = line.partition(' ')
+            code, _, error = rest.partition(' ')
+            outcomes[vmid_str] = (code, error)
+
+        for index, vmid, name, spec, _ in batch:
+            code, error = outcomes.get(str(vmid), ('', ''))
+            if code != '0':
+                if not code:
+                    error = f"no result (batch script exit {result.returncode})"
+                logger.error(f"Failed to create container {vmid}: {error or f'exit {code}'}")
+                continue
+            logger.info(f"✓ Container {vmid} ({name}) created successfully")
+            self._finish_create(vmid, spec)
+            results[index] = vmid
+
+        self.discovery.invalidate()
+        return results
+
+    def _create_argv(
+        self,
+        spec: Dict,
+        vmid: int,
+        name: str,
+        template_file: str,
+        storage: str,
+        pool: Optional[str],
+        template_storage: str
+    ) -> List[str]:
+        """Build the ``pct create`` argv for a spec."""
         # Add resources - support both nested resources dict and top-level fields
         resources = spec.get('resources', {})
         # Top-level takes precedence over nested (for backwards compatibility)
@@ -97,25 +403,9 @@ class ContainerLifecycle:
 
         # For ZFS storage, Proxmox expects size as a number (in GB) without unit suffix
         # Convert '128G' -> '128', '8G' -> '8', etc.
-        disk_size = str(disk).rstrip('GgMmKkTt') if isinstance(disk, str) else str(disk)
-
-        cmd.extend([
-            '--memory', str(memory),
-            '--cores', str(cores),
-            '--rootfs', f'{storage}:{disk_size}',
-            '--swap', str(swap),
-        ])
-
-        # Add resource pool if specified (explicit parameter > resources > spec)
-        resource_pool = resources.get('pool')
-        selected_pool = pool
-        if resource_pool:
-            selected_pool = resource_pool
-        if selected_pool:
-            cmd.extend(['--pool', selected_pool])
-            logger.info(f"Assigning container to resource pool: {selected_pool}")
+        disk_size = disk.translate(_DISK_SUFFIXES) if isinstance(disk, str) else str(disk)
 
-        # Add network configuration
+        # Network configuration
         network = spec.get('network', {})
         bridge = network.get('bridge', 'vmbr0')
         ip = network.get('ip', 'dhcp')
@@ -126,112 +416,220 @@ class ContainerLifecycle:
         if ip != 'dhcp' and '/' not in ip:
             logger.warning(f"Static IP '{ip}' should include CIDR notation (e.g., '{ip}/24')")
 
-        net_config = f'name=eth0,bridge={bridge},firewall={firewall}'
-        if ip != 'dhcp':
-            net_config += f',ip={ip}'
-            if gateway:
-                net_config += f',gw={gateway}'
-        else:
-            net_config += ',ip=dhcp'
-
-        cmd.extend(['--net0', net_config])
-
-        description = spec.get('description')
-        if description:
-            cmd.extend(['--description', description])
-
-        tags = spec.get('tags')
-        if tags:
-            if isinstance(tags, str):
-                tags_value = tags
-            else:
-                tags_value = ",".join(tag.strip() for tag in tags if tag)
-            if tags_value:
-                cmd.extend(['--tags', tags_value])
-        
-        startup_value = spec.get('startup')
-        if not startup_value:
-            startup_parts = []
-            if spec.get('startup_order') is not None:
-                startup_parts.append(f"order={spec['startup_order']}")
-            if spec.get('startup_delay') is not None:
-                startup_parts.append(f"up={spec['startup_delay']}")
-            if startup_parts:
-                startup_value = ",".join(startup_parts)
-        if startup_value:
-            cmd.extend(['--startup', startup_value])
+        net_config = _net_config(bridge, ip, gateway, firewall)
 
         # Privileged vs unprivileged (default: unprivileged for security)
         # Note: In newer Proxmox, containers default to unprivileged, must explicitly set --unprivileged 0
         privileged = spec.get('privileged', False)
         if privileged:
-            # Explicitly request privileged container
-            cmd.extend(['--unprivileged', '0'])
             logger.warning(f"⚠️  Creating PRIVILEGED container {vmid} - has full root access!")
-        else:
-            cmd.extend(['--unprivileged', '1'])
 
-        # Additional options
-        cmd.extend([
+        # Build pct create command
+        # Template is always from template_storage (usually 'local'), rootfs goes to storage
+        cmd = [
+            'pct', 'create', str(vmid),
+            f'{template_storage}:vztmpl/{template_file}',
+            '--hostname', name,
+            '--memory', str(memory),
+            '--cores', str(cores),
+            '--rootfs', f'{storage}:{disk_size}',
+            '--swap', str(swap),
+            '--net0', net_config,
+            '--unprivileged', '0' if privileged else '1',
             '--onboot', '1',
             '--features', 'nesting=1',
-        ])
+        ]
+
+        # Add resource pool if specified (explicit parameter > resources > spec)
+        selected_pool = resources.get('pool') or pool
+        if selected_pool:
+            cmd += ['--pool', selected_pool]
+            logger.info(f"Assigning container to resource pool: {selected_pool}")
 
+        description = spec.get('description')
+        if description:
+            cmd += ['--description', description]
+
+        tags_value = _tags_value(spec.get('tags'))
+        if tags_value:
+            cmd += ['--tags', tags_value]
+
+        startup_value = _startup_value(
+            spec.get('startup'), spec.get('startup_order'), spec.get('startup_delay')
+        )
+        if startup_value:
+            cmd += ['--startup', startup_value]
+
+        return cmd
+
+    @staticmethod
+    def _resolve_gpu_type(spec: Dict) -> None:
+        """Record the GPU type to pass through as ``spec['_gpu_type']``, if any."""
         # GPU passthrough if requested (check both old format and new features.gpu format)
         gpu_val = spec.get('gpu')
         gpu_config = gpu_val if isinstance(gpu_val, dict) else {}
         features = spec.get('features', {})
         gpu_requested = (gpu_val is True) or (gpu_config and gpu_config.get('passthrough', False)) or features.get('gpu', False)
-        
+
         if gpu_requested:
             gpu_type = gpu_config.get('type', 'auto')
-            
+
             if gpu_type == 'auto':
                 # Auto-detect GPU type
-                from tengil.discovery.hwdetect import SystemDetector
-                detector = SystemDetector()
-                gpus = detector._detect_gpu()
-                
+                gpus = _detect_host_gpus()
+
                 if gpus:
                     gpu_type = gpus[0]['type']  # Use first detected GPU
                     logger.info(f"Auto-detected GPU: {gpu_type} - {gpus[0]['model']}")
                 else:
                     logger.warning("GPU passthrough requested but no GPU detected")
                     gpu_type = None
-            
+
             # Store GPU info for post-creation config
             if gpu_type:
                 spec['_gpu_type'] = gpu_type
 
-        try:
-            logger.info(f"Creating container {vmid} ({name}) with template {template}")
-            logger.debug(f"Command: {' '.join(cmd)}")
+    def _finish_create(self, vmid: int, spec: Dict) -> None:
+        """Apply post-creation config edits (Docker support, GPU passthrough)."""
+        # Handle requires_docker flag for automatic Docker support
+        if spec.get('requires_docker', False):
+            self._configure_docker_support(vmid)
 
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                check=True
-            )
+        # Handle GPU passthrough configuration
+        if spec.get('_gpu_type'):
+            self._configure_gpu_passthrough(vmid, spec['_gpu_type'])
 
-            logger.info(f"✓ Container {vmid} ({name}) created successfully")
-            
-            # Handle requires_docker flag for automatic Docker support
-            if spec.get('requires_docker', False):
-                self._configure_docker_support(vmid)
-            
-            # Handle GPU passthrough configuration
-            if spec.get('_gpu_type'):
-                self._configure_gpu_passthrough(vmid, spec['_gpu_type'])
-            
+        # The edits above bypass pct, so drop any config read cached meanwhile
+        self.discovery.invalidate(vmid)
+
+    def _clone_from_warm(self, warm_vmid: int, create_cmd: List[str]) -> None:
+        """Create a container by cloning a warm base, then apply the create settings.
+
+        Raises:
+            subprocess.CalledProcessError: If pct clone or pct set fails
+        """
+        vmid = create_cmd[2]
+        # Everything after 'pct create <vmid> <template>' is a flag/value pair
+        flags = dict(zip(create_cmd[4::2], create_cmd[5::2]))
+
+        clone_cmd = ['pct', 'clone', str(warm_vmid), vmid, '--hostname', flags['--hostname']]
+        set_cmd = ['pct', 'set', vmid]
+        for flag in ('--pool', '--description'):
+            if flag in flags:
+                clone_cmd += [flag, flags[flag]]
+        # --unprivileged is fixed at create time (pct set rejects it); the base
+        # was looked up by privilege level, so the clone already matches
+        for flag in ('--memory', '--cores', '--swap', '--net0', '--onboot', '--features',
+                     '--tags', '--startup'):
+            if flag in flags:
+                set_cmd += [flag, flags[flag]]
+
+        for step in (clone_cmd, set_cmd):
+            subprocess.run(step, capture_output=True, text=True, check=True)
+        self._grow_rootfs(int(vmid), flags['--rootfs'].split(':', 1)[1])
+
+    def prewarm_template(
+        self,
+        template: str,
+        storage: str = 'local-lvm',
+        template_storage: str = 'local',
+        privileged: bool = False
+    ) -> Optional[int]:
+        """Create a Proxmox template container that later creates clone from.
+
+        ``pct clone`` of a template is a storage snapshot, while ``pct create``
+        unpacks the whole rootfs tarball, so batches of containers from one
+        template get much cheaper. Only creates with the same template,
+        storage and privilege level use the base.
+
+        Args:
+            template: Template name (e.g., 'debian-12-standard')
+            storage: Storage for the base rootfs (clones stay on it)
+            template_storage: Storage holding the template archive
+            privileged: Privilege level of the base (cannot change after create)
+
+        Returns:
+            VMID of the warm base, or None if it could not be created
+        """
+        key = (template, storage, bool(privileged))
+        if key in self._warm_bases:
+            return self._warm_bases[key]
+
+        if not self.templates.ensure_template_available(template):
+            logger.error(f"Template {template} not available and download failed")
+            return None
+
+        base_name = _warm_base_name(template, privileged)
+        if not self.mock:
+            # Bases outlive this process; reuse one an earlier run left behind
+            existing = self._find_warm_base(base_name, storage, privileged)
+            if existing is not None:
+                logger.info(f"Reusing warm base {existing} for {template}")
+                self._warm_bases[key] = existing
+                return existing
+
+        vmid = self._get_next_free_vmid()
+        if self.mock:
+            logger.info(f"MOCK: Would create warm base {vmid} from {template}")
+            self._warm_bases[key] = vmid
             return vmid
 
+        template_file = self.templates.resolve_template_filename(template)
+        create_cmd = [
+            'pct', 'create', str(vmid),
+            f'{template_storage}:vztmpl/{template_file}',
+            '--hostname', base_name,
+            '--rootfs', f'{storage}:{WARM_BASE_DISK}',
+            '--unprivileged', '0' if privileged else '1',
+            '--features', 'nesting=1',
+        ]
+
+        try:
+            logger.info(f"Creating warm base {vmid} from template {template}")
+            for step in (create_cmd, ['pct', 'template', str(vmid)]):
+                subprocess.run(step, capture_output=True, text=True, check=True)
         except subprocess.CalledProcessError as e:
-            logger.error(f"Failed to create container {vmid}: {e}")
+            logger.error(f"Failed to create warm base from {template}: {e}")
             if e.stderr:
                 logger.error(f"Error output: {e.stderr}")
             return None
 
+        self.discovery.invalidate()
+        self._warm_bases[key] = vmid
+        logger.info(f"✓ Warm base {vmid} ready for {template}")
+        return vmid
+
+    def _find_warm_base(self, base_name: str, storage: str, privileged: bool) -> Optional[int]:
+        """Return the VMID of an existing warm base matching storage and privilege level."""
+        unprivileged = '0' if privileged else '1'
+        for container in self.discovery.list_containers():
+            if container['name'] != base_name:
+                continue
+            config = self.discovery.get_container_config(container['vmid'])
+            if (str(config.get('template', '0')) == '1'
+                    and str(config.get('unprivileged', '0')) == unprivileged
+                    and str(config.get('rootfs', '')).startswith(f'{storage}:')):
+                return container['vmid']
+        return None
+
+    def _grow_rootfs(self, vmid: int, disk_size: str) -> None:
+        """Resize a cloned rootfs to the requested size in GB (grow only)."""
+        try:
+            if float(disk_size) <= WARM_BASE_DISK:
+                return
+        except ValueError:
+            pass
+
+        try:
+            subprocess.run(
+                ['pct', 'resize', str(vmid), 'rootfs', f'{disk_size}G'],
+                capture_output=True,
+                text=True,
+                check=True
+            )
+        except subprocess.CalledProcessError as e:
+            logger.warning(f"Could not resize rootfs of {vmid} to {disk_size}G: {e.stderr or e}")
+
     def _configure_docker_support(self, vmid: int) -> bool:
         """Configure container for Docker support.
         
@@ -243,7 +641,7 @@ class ContainerLifecycle:
         Returns:
             True if configured successfully
         """
-        config_path = f"/etc/pve/lxc/{vmid}.conf"
+        config_path = lxc_config_path(vmid)
         
         try:
             logger.info(f"Configuring Docker support for container {vmid}")
@@ -255,15 +653,20 @@ class ContainerLifecycle:
             # Check if already configured
             has_apparmor = any('lxc.apparmor.profile' in line for line in config_lines)
             has_keyctl = any('keyctl=1' in line for line in config_lines)
-            
-            modified = False
-            
+
+            if has_apparmor and has_keyctl:
+                logger.info(f"  Docker support already configured for container {vmid}")
+                return True
+
+            # Lines that only need appending avoid rewriting the whole file
+            new_lines = []
+            rewrite = False
+
             # Add AppArmor profile if not present
             if not has_apparmor:
-                config_lines.append('lxc.apparmor.profile: unconfined\n')
+                new_lines.append('lxc.apparmor.profile: unconfined\n')
                 logger.info("  ✓ Added AppArmor unconfined profile")
-                modified = True
-            
+
             # Add keyctl to features if not present
             if not has_keyctl:
                 # Find features line and update it
@@ -272,22 +675,20 @@ class ContainerLifecycle:
                         # Add keyctl to existing features
                         config_lines[i] = line.rstrip() + ',keyctl=1\n'
                         logger.info("  ✓ Added keyctl=1 to features")
-                        modified = True
+                        rewrite = True
                         break
                 else:
                     # No features line present, add a new one
-                    config_lines.append('features: keyctl=1\n')
+                    new_lines.append('features: keyctl=1\n')
                     logger.info("  ✓ Added features line with keyctl=1")
-                    modified = True
-            
-            # Write back if modified
-            if modified:
+
+            if rewrite:
                 with open(config_path, 'w') as f:
-                    f.writelines(config_lines)
-                logger.info(f"✓ Docker support configured for container {vmid}")
+                    f.writelines(config_lines + new_lines)
             else:
-                logger.info(f"  Docker support already configured for container {vmid}")
-            
+                self._append_config_lines(config_path, config_lines, new_lines)
+            logger.info(f"✓ Docker support configured for container {vmid}")
+
             return True
             
         except Exception as e:
@@ -306,7 +707,7 @@ class ContainerLifecycle:
         Returns:
             True if configured successfully
         """
-        config_path = f"/etc/pve/lxc/{vmid}.conf"
+        config_path = lxc_config_path(vmid)
         
         try:
             logger.info(f"Configuring {gpu_type} GPU passthrough for container {vmid}")
@@ -316,18 +717,24 @@ class ContainerLifecycle:
                 with open(config_path) as f:
                     config_lines = f.readlines()
                 
-                # Add GPU device access and mount
+                # Skip lines already present so repeat runs do not duplicate them
+                new_lines = []
                 # cgroup2 device allow for /dev/dri (char device 226:*)
-                config_lines.append('lxc.cgroup2.devices.allow: c 226:* rwm\n')
+                if not any(line.startswith('lxc.cgroup2.devices.allow') and '226:*' in line
+                           for line in config_lines):
+                    new_lines.append('lxc.cgroup2.devices.allow: c 226:* rwm\n')
+                    logger.info("  ✓ Added /dev/dri device access (c 226:* rwm)")
                 # Mount /dev/dri into container
-                config_lines.append('lxc.mount.entry: /dev/dri dev/dri none bind,optional,create=dir\n')
-                
-                # Write back
-                with open(config_path, 'w') as f:
-                    f.writelines(config_lines)
-                
-                logger.info("  ✓ Added /dev/dri device access (c 226:* rwm)")
-                logger.info("  ✓ Added /dev/dri mount binding")
+                if not any(line.startswith('lxc.mount.entry') and '/dev/dri' in line
+                           for line in config_lines):
+                    new_lines.append('lxc.mount.entry: /dev/dri dev/dri none bind,optional,create=dir\n')
+                    logger.info("  ✓ Added /dev/dri mount binding")
+
+                if not new_lines:
+                    logger.info(f"  GPU passthrough already configured for container {vmid}")
+                    return True
+
+                self._append_config_lines(config_path, config_lines, new_lines)
                 logger.info(f"✓ {gpu_type.upper()} GPU passthrough configured for container {vmid}")
                 
             elif gpu_type == 'nvidia':
@@ -341,25 +748,63 @@ class ContainerLifecycle:
             logger.error(f"Failed to configure GPU passthrough for container {vmid}: {e}")
             return False
 
-    def _get_next_free_vmid(self, start: int = 100) -> int:
+    @staticmethod
+    def _append_config_lines(config_path: Path, config_lines: List[str], new_lines: List[str]) -> None:
+        """Append lines to a container config without rewriting existing ones."""
+        with open(config_path, 'a') as f:
+            if config_lines and not config_lines[-1].endswith('\n'):
+                f.write('\n')
+            f.writelines(new_lines)
+
+    def _get_next_free_vmid(self, start: int = 100, extra_used: Optional[Set[int]] = None) -> int:
         """Find the next available VMID.
 
         Args:
             start: Starting VMID to check from
+            extra_used: VMIDs already handed out in this batch but not yet created
 
         Returns:
             Next available VMID
         """
-        containers = self.discovery.list_containers()
-        used_vmids = {c['vmid'] for c in containers}
+        used = self.discovery.list_cluster_vmids()
+        if extra_used:
+            used = used | extra_used
+        return self._first_free_vmids(used, 1, start)[0]
+
+    def allocate_vmids(self, count: int, start: int = 100,
+                       reserved: Iterable[int] = ()) -> List[int]:
+        """Reserve ``count`` free VMIDs from a single cluster listing.
+
+        Args:
+            count: Number of VMIDs needed
+            start: Starting VMID to check from
+            reserved: VMIDs to treat as used although no container has them yet
+
+        Returns:
+            Ascending list of free VMIDs
+        """
+        used = self.discovery.list_cluster_vmids() | {int(vmid) for vmid in reserved}
+        return self._first_free_vmids(used, count, start)
 
+    @staticmethod
+    def _first_free_vmids(used: Set[int], count: int, start: int) -> List[int]:
+        """Walk the sorted used IDs once, collecting the first ``count`` gaps."""
+        free: List[int] = []
         vmid = start
-        while vmid in used_vmids:
+        for taken in sorted(v for v in used if v >= start):
+            while vmid < taken and len(free) < count:
+                free.append(vmid)
+                vmid += 1
+            if len(free) == count:
+                break
+            vmid = taken + 1
+        while len(free) < count:
+            free.append(vmid)
             vmid += 1
-            if vmid > 999999:  # Proxmox max
-                raise ValueError("No free VMIDs available")
 
-        return vmid
+        if free and free[-1] > 999999:  # Proxmox max
+            raise ValueError("No free VMIDs available")
+        return free
 
     def start_container(self, vmid: int) -> bool:
         """Start a container.
@@ -376,18 +821,14 @@ class ContainerLifecycle:
 
         try:
             logger.info(f"Starting container {vmid}")
-            subprocess.run(
-                ['pct', 'start', str(vmid)],
-                capture_output=True,
-                text=True,
-                check=True
-            )
+            self._power_action(vmid, 'start', 'start')
+            self.discovery.invalidate(vmid)
             logger.info(f"✓ Container {vmid} started")
             return True
 
         except subprocess.CalledProcessError as e:
             # Container might already be running
-            if e.stderr and 'already running' in e.stderr.lower():
+            if _already_running(e):
                 logger.info(f"Container {vmid} already running")
                 return True
             logger.error(f"Failed to start container {vmid}: {e}")
@@ -408,12 +849,8 @@ class ContainerLifecycle:
 
         try:
             logger.info(f"Stopping container {vmid}")
-            subprocess.run(
-                ['pct', 'stop', str(vmid)],
-                capture_output=True,
-                text=True,
-                check=True
-            )
+            self._power_action(vmid, 'stop', 'stop')
+            self.discovery.invalidate(vmid)
             logger.info(f"✓ Container {vmid} stopped")
             return True
 
@@ -436,21 +873,101 @@ class ContainerLifecycle:
 
         try:
             logger.info(f"Restarting container {vmid}")
-            subprocess.run(
-                ['pct', 'restart', str(vmid)],
-                capture_output=True,
-                text=True,
-                check=True
-            )
+            self._power_action(vmid, 'restart', 'reboot')
+            self.discovery.invalidate(vmid)
             logger.info(f"✓ Container {vmid} restarted")
             return True
 
         except subprocess.CalledProcessError as e:
             logger.error(f"Failed to restart container {vmid}: {e}")
             if e.stderr:
-                logger.error(f"Error output: {e.stderr}")
+                logger.error(f"Error output: {stderr_text(e)}")
             return False
 
+    def _power_action(self, vmid: int, verb: str, api_action: str) -> None:
+        """Run a start/stop/restart through the REST API if configured, else pct.
+
+        The API keeps one HTTPS session for every call, where each pct run
+        starts a fresh Perl interpreter.
+
+        Raises:
+            subprocess.CalledProcessError: On failure, with the reason in stderr
+        """
+        if self.discovery.api_token:
+            exitstatus = self._api_task(vmid, api_action)
+            if exitstatus is not None:
+                # "WARNINGS: n" means the task finished but logged warnings
+                if exitstatus.startswith('WARNINGS'):
+                    logger.warning(f"pct {verb} {vmid} finished with {exitstatus}")
+                elif exitstatus != 'OK':
+                    raise subprocess.CalledProcessError(
+                        1, ['pct', verb, str(vmid)], stderr=exitstatus
+                    )
+                return
+        _run_pct(['pct', verb, str(vmid)])
+
+    def _api_task(self, vmid: int, action: str) -> Optional[str]:
+        """Start a container status task via the API and wait for it.
+
+        Returns:
+            Task exit status ('OK' on success), or None if the task could not
+            be submitted and the caller should fall back to pct
+        """
+        try:
+            upid = self.discovery.api_call('post', f'/nodes/localhost/lxc/{vmid}/status/{action}')
+        except (requests.RequestException, ValueError, KeyError) as e:
+            logger.warning(f"Proxmox API {action} failed for {vmid}, falling back to pct: {e}")
+            return None
+
+        status_path = f"/nodes/localhost/tasks/{quote(upid, safe='')}/status"
+        deadline = time.monotonic() + API_TASK_TIMEOUT
+        while True:
+            try:
+                task = self.discovery.api_call('get', status_path)
+            except (requests.RequestException, ValueError, KeyError) as e:
+                return f"task status unavailable: {e}"
+            if task.get('status') == 'stopped':
+                return task.get('exitstatus', '')
+            if time.monotonic() > deadline:
+                return f"timed out waiting for task {upid}"
+            time.sleep(API_TASK_POLL)
+
+    def start_many(self, vmids: Iterable[int]) -> Dict[int, bool]:
+        """Start several containers concurrently.
+
+        Args:
+            vmids: Container IDs to start
+
+        Returns:
+            Dict mapping each VMID to whether it started
+        """
+        return self._fan_out(self.start_container, vmids)
+
+    def stop_many(self, vmids: Iterable[int]) -> Dict[int, bool]:
+        """Stop several containers concurrently.
+
+        Args:
+            vmids: Container IDs to stop
+
+        Returns:
+            Dict mapping each VMID to whether it stopped
+        """
+        return self._fan_out(self.stop_container, vmids)
+
+    def _fan_out(self, operation: Callable[[int], bool], vmids: Iterable[int],
+                 max_workers: int = MAX_PCT_PARALLEL) -> Dict[int, bool]:
+        """Run a per-container operation across a bounded thread pool.
+
+        Each pct call spends most of its time in Perl startup, so independent
+        containers overlap well.
+        """
+        vmids = list(dict.fromkeys(vmids))
+        if len(vmids) <= 1 or self.mock:
+            return {vmid: operation(vmid) for vmid in vmids}
+
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(vmids))) as executor:
+            return dict(zip(vmids, executor.map(operation, vmids)))
+
     def exec_container_command(
         self,
         vmid: int,
@@ -479,14 +996,14 @@ class ContainerLifecycle:
         base_cmd.append('--')
         base_cmd.extend(command)
 
-        command_str = shlex.join(base_cmd)
-
         if self.mock:
-            logger.info(f"MOCK: Would execute: {command_str}")
+            logger.info(f"MOCK: Would execute: {shlex.join(base_cmd)}")
             return 0
 
         try:
-            logger.info(f"Executing in container {vmid}: {command_str}")
+            # Quoting the argv is only worth it when the line is emitted
+            if logger.isEnabledFor(logging.INFO):
+                logger.info(f"Executing in container {vmid}: {shlex.join(base_cmd)}")
             result = subprocess.run(base_cmd, check=False)
             if result.returncode != 0:
                 logger.error(f"Command exited with code {result.returncode}")
@@ -506,10 +1023,8 @@ class ContainerLifecycle:
         if user:
             base_cmd.extend(['--user', user])
 
-        command_str = shlex.join(base_cmd)
-
         if self.mock:
-            logger.info(f"MOCK: Would open shell: {command_str}")
+            logger.info(f"MOCK: Would open shell: {shlex.join(base_cmd)}")
             return 0
 
         try:
@@ -576,3 +1091,26 @@ class ContainerLifecycle:
             if e.stderr:
                 logger.error(f"Error output: {e.stderr}")
             return False
+
+    def update_containers(self, vmids: Iterable[int], concurrency: int = 4,
+                          upgrade: bool = True) -> Dict[int, bool]:
+        """Update packages in several containers concurrently.
+
+        Args:
+            vmids: Container VMIDs
+            concurrency: Maximum simultaneous updates (apt is disk/network bound)
+            upgrade: If True, run apt upgrade. If False, only apt update.
+
+        Returns:
+            Dict mapping each VMID to whether its update succeeded
+        """
+        results = self._fan_out(
+            lambda vmid: self.update_container(vmid, upgrade=upgrade),
+            vmids,
+            max_workers=concurrency,
+        )
+        failed = sorted(vmid for vmid, ok in results.items() if not ok)
+        logger.info(f"Updated {len(results) - len(failed)}/{len(results)} containers")
+        if failed:
+            logger.warning(f"Update failed for: {', '.join(map(str, failed))}")
+        return results
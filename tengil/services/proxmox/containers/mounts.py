@@ -1,20 +1,42 @@
 """Mount management for Proxmox LXC containers."""
+import re
 import subprocess
-from typing import Dict, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, NamedTuple, Optional, Set
+
+import requests
 
 from tengil.core.logger import get_logger
+from tengil.services.proxmox.lxc_config import MP_KEY_RE, mount_slots
 
 from .discovery import ContainerDiscovery
+from .lifecycle import MAX_PCT_PARALLEL, spawn_argv, stderr_text
 
 logger = get_logger(__name__)
 
+# key=value options after the volume in a mount config ("mp=/movies,ro=1")
+_MOUNT_OPTION_RE = re.compile(r'\s*([^,=]+?)\s*=\s*([^,]*?)\s*(?:,|$)')
+
+
+class MountResult(NamedTuple):
+    """Outcome of mounting a dataset into one container.
+
+    vmid is None when no container could be resolved, so it cannot be
+    mistaken for a real container ID. Still unpacks as (vmid, ok, reason).
+    """
+
+    vmid: Optional[int]
+    ok: bool
+    reason: str = ''
+
 
 class MountManager:
     """Manages mount points for LXC containers."""
 
-    def __init__(self, mock: bool = False, permission_manager=None):
+    def __init__(self, mock: bool = False, permission_manager=None,
+                 discovery: Optional[ContainerDiscovery] = None):
         self.mock = mock
-        self.discovery = ContainerDiscovery(mock=mock)
+        self.discovery = discovery or ContainerDiscovery(mock=mock)
         self.permission_manager = permission_manager  # For determining mount flags
 
     def get_container_mounts(self, vmid: int) -> Dict[str, Dict[str, str]]:
@@ -34,44 +56,36 @@ class MountManager:
             logger.info(f"MOCK: Would get mounts for container {vmid}")
             return {}
 
-        mounts = {}
-        config = self.discovery.get_container_config(vmid)
+        return self._mounts_from_config(self.discovery.get_container_config(vmid))
 
-        for key, value in config.items():
-            if key.startswith('mp'):
-                # Parse mount config: /tank/movies,mp=/movies,ro=1
-                mount_info = self._parse_mount_config(value)
-                if mount_info:
-                    mounts[key] = mount_info
+    def _mounts_from_config(self, config: Dict[str, str]) -> Dict[str, Dict[str, str]]:
+        """Extract parsed mpN entries from an already-read container config."""
+        # Parse mount config: /tank/movies,mp=/movies,ro=1
+        return {
+            key: self._parse_mount_config(value)
+            for key, value in config.items()
+            if MP_KEY_RE.match(key)
+        }
 
-        return mounts
-
-    def _parse_mount_config(self, config_str: str) -> Optional[Dict[str, str]]:
+    def _parse_mount_config(self, config_str: str) -> Dict[str, str]:
         """Parse a Proxmox mount configuration string.
 
         Args:
             config_str: Mount config like "/tank/movies,mp=/movies,ro=1"
 
         Returns:
-            Dict with 'volume', 'mp', 'ro' keys, or None if parsing fails
+            Dict with 'volume', 'ro' and any further options (usually 'mp');
+            bare flags without '=' are ignored
         """
-        try:
-            parts = config_str.split(',')
-            result = {'volume': parts[0].strip(), 'ro': '0'}
-
-            for part in parts[1:]:
-                if '=' in part:
-                    key, val = part.split('=', 1)
-                    result[key.strip()] = val.strip()
-
-            return result
-        except Exception as e:
-            logger.warning(f"Failed to parse mount config '{config_str}': {e}")
-            return None
+        volume, _, options = config_str.partition(',')
+        result = {'volume': volume.strip(), 'ro': '0'}
+        result.update(_MOUNT_OPTION_RE.findall(options))
+        return result
 
     def add_container_mount(self, vmid: int, mount_point: int,
                            host_path: str, container_path: str,
-                           readonly: bool = False, container_name: str = None) -> bool:
+                           readonly: bool = False, container_name: str = None,
+                           *, existing_mounts: Optional[Dict[str, Dict[str, str]]] = None) -> bool:
         """Add a mount point to a container.
 
         Checks for existing mounts at the same path and handles conflicts.
@@ -84,11 +98,39 @@ class MountManager:
             container_path: Path inside container (e.g., '/movies')
             readonly: Whether mount should be read-only (can be overridden by permission_manager)
             container_name: Name of container (used for permission lookup)
+            existing_mounts: Current mounts from get_container_mounts, if the
+                caller already has them (skips re-reading the config; the
+                caller is then expected to have confirmed the container exists)
 
         Returns:
             True if mount added or already exists with same config
         """
-        # Check permission manager for readonly flag (overrides parameter)
+        request = {
+            'mount_point': mount_point,
+            'host_path': host_path,
+            'container_path': container_path,
+            'readonly': readonly,
+            'container_name': container_name,
+        }
+        return self._apply_container_mounts(vmid, [request], existing_mounts)[0]
+
+    def add_container_mounts_batch(self, vmid: int, mounts: List[Dict],
+                                   *, existing_mounts: Optional[Dict[str, Dict[str, str]]] = None) -> List[bool]:
+        """Add several mount points to one container with a single pct set.
+
+        Args:
+            vmid: Container ID
+            mounts: add_container_mount keyword arguments without vmid
+                (mount_point, host_path, container_path, readonly, ...)
+            existing_mounts: Current mounts, as for add_container_mount
+
+        Returns:
+            Result for each mount, in order
+        """
+        return self._apply_container_mounts(vmid, mounts, existing_mounts)
+
+    def _mount_readonly(self, host_path: str, readonly: bool, container_name: Optional[str]) -> bool:
+        """Return the readonly flag, letting the permission manager override it."""
         if self.permission_manager and container_name:
             try:
                 flags = self.permission_manager.get_container_mount_flags(host_path, container_name)
@@ -96,21 +138,17 @@ class MountManager:
                 logger.info(f"Permission manager determined readonly={readonly} for {container_name} -> {host_path}")
             except Exception as e:
                 logger.warning(f"Could not get mount flags from permission manager: {e}, using readonly={readonly}")
-        
-        if self.mock:
-            logger.info(f"MOCK: Would add mount to container {vmid}: {host_path} -> {container_path} (readonly={readonly})")
-            return True
+        return readonly
 
-        # Check if container exists
-        if not self.discovery.container_exists(vmid):
-            logger.error(f"Container {vmid} not found")
-            return False
-
-        # Check existing mounts
-        existing_mounts = self.get_container_mounts(vmid)
+    def _check_mount(self, vmid: int, mp_key: str, host_path: str, container_path: str,
+                     readonly: bool, existing_mounts: Dict[str, Dict[str, str]]) -> Optional[bool]:
+        """Compare a requested mount with the container's current mounts.
 
+        Returns:
+            True if already configured, False on a conflicting mount path,
+            None if the mount still has to be written
+        """
         # Check if this specific mount point already exists
-        mp_key = f"mp{mount_point}"
         if mp_key in existing_mounts:
             existing = existing_mounts[mp_key]
             ro_match = existing.get('ro', '0') == ('1' if readonly else '0')
@@ -130,23 +168,156 @@ class MountManager:
                 logger.warning(f"  Requested: {host_path} -> {container_path}")
                 return False
 
-        try:
+        return None
+
+    def _apply_container_mounts(self, vmid: int, requests: List[Dict],
+                                existing_mounts: Optional[Dict[str, Dict[str, str]]] = None) -> List[bool]:
+        """Add several mount points to one container with a single pct set.
+
+        The config is read at most once. Each request is checked against it
+        (and against the requests before it), and every mount that still
+        needs writing goes into one ``pct set -mpA ... -mpB ...`` call,
+        which takes the container's config lock once.
+
+        Args:
+            vmid: Container ID
+            requests: Dicts with mount_point, host_path, container_path and
+                optional readonly / container_name
+            existing_mounts: Current mounts, if the caller already has them
+
+        Returns:
+            Result for each request, in order
+        """
+        results = [False] * len(requests)
+        pending = []  # (index, mp key, mount spec)
+
+        for index, request in enumerate(requests):
+            mount_point = request['mount_point']
+            host_path = request['host_path']
+            container_path = request['container_path']
+            readonly = self._mount_readonly(
+                host_path, request.get('readonly', False), request.get('container_name')
+            )
+
+            if self.mock:
+                logger.info(f"MOCK: Would add mount to container {vmid}: {host_path} -> {container_path} (readonly={readonly})")
+                results[index] = True
+                continue
+
+            if existing_mounts is None:
+                # One config read answers both "does it exist" and "what is mounted";
+                # a missing container has no config at all
+                config = self.discovery.get_container_config(vmid)
+                if not config:
+                    logger.error(f"Container {vmid} not found")
+                    return results
+                existing_mounts = self._mounts_from_config(config)
+
+            mp_key = f"mp{mount_point}"
+            verdict = self._check_mount(vmid, mp_key, host_path, container_path, readonly, existing_mounts)
+            if verdict is not None:
+                results[index] = verdict
+                continue
+
             # Build mount options
             mount_spec = f"{host_path},mp={container_path}"
             if readonly:
                 mount_spec += ",ro=1"
+            logger.info(f"Adding mount point to container {vmid}: {mp_key}={mount_spec}")
 
-            # Add/update mount point using pct
-            cmd = ["pct", "set", str(vmid), f"-mp{mount_point}", mount_spec]
+            # Later requests in this batch must see this mount as taken
+            existing_mounts = {
+                **existing_mounts,
+                mp_key: {'volume': host_path, 'mp': container_path, 'ro': '1' if readonly else '0'},
+            }
+            pending.append((index, mp_key, mount_spec))
 
-            logger.info(f"Adding mount point to container {vmid}: mp{mount_point}={mount_spec}")
-            subprocess.run(cmd, check=True)
+        if not pending:
+            return results
 
-            return True
+        params = {mp_key: mount_spec for _, mp_key, mount_spec in pending}
+        cmd = ["pct", "set", str(vmid)]
+        for mp_key, mount_spec in params.items():
+            cmd += [f"-{mp_key}", mount_spec]
 
+        try:
+            self._set_config(vmid, cmd, params)
         except subprocess.CalledProcessError as e:
             logger.error(f"Failed to add container mount: {e}")
-            return False
+            if e.stderr:
+                logger.error(f"Error output: {stderr_text(e)}")
+            return results
+        finally:
+            self.discovery.invalidate(vmid)
+
+        for index, _, _ in pending:
+            results[index] = True
+        return results
+
+    def _set_config(self, vmid: int, cmd: List[str], params: Dict[str, str]) -> None:
+        """Apply a config change through the REST API if configured, else pct set.
+
+        Bind mounts (``mpN`` set to a host path) always go through pct set:
+        Proxmox only lets root@pam add them, never an API token.
+
+        Args:
+            vmid: Container ID
+            cmd: Equivalent pct set command, used without an API token or
+                when the API cannot be reached
+            params: Parameters for PUT /nodes/localhost/lxc/{vmid}/config
+
+        Raises:
+            subprocess.CalledProcessError: If the pct fallback fails
+        """
+        bind_mount = any(
+            key.startswith('mp') and value.startswith('/') for key, value in params.items()
+        )
+        if self.discovery.api_token and not bind_mount:
+            try:
+                self.discovery.api_call('put', f'/nodes/localhost/lxc/{vmid}/config', params)
+                return
+            except (requests.RequestException, ValueError, KeyError) as e:
+                logger.warning(f"Proxmox API config update failed for {vmid}, falling back to pct: {e}")
+        subprocess.run(
+            spawn_argv(cmd), stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+            check=True, close_fds=False
+        )
+
+    def add_container_mounts(self, mounts: List[Dict]) -> List[bool]:
+        """Add many mount points, running different containers concurrently.
+
+        Mounts for the same container are applied with one config read and
+        one pct set (pct holds a per-container config lock); separate
+        containers overlap.
+
+        Args:
+            mounts: add_container_mount keyword arguments, one dict per mount
+                (vmid, mount_point, host_path, container_path, readonly, ...)
+
+        Returns:
+            Result of add_container_mount for each entry, in order
+        """
+        by_vmid: Dict[int, List[int]] = {}
+        for index, mount in enumerate(mounts):
+            by_vmid.setdefault(mount['vmid'], []).append(index)
+
+        results = [False] * len(mounts)
+
+        def add_for_container(indexes: List[int]) -> None:
+            vmid = mounts[indexes[0]]['vmid']
+            outcomes = self._apply_container_mounts(vmid, [mounts[index] for index in indexes])
+            for index, ok in zip(indexes, outcomes):
+                results[index] = ok
+
+        groups = list(by_vmid.values())
+        if self.mock or len(groups) <= 1:
+            for indexes in groups:
+                add_for_container(indexes)
+            return results
+
+        with ThreadPoolExecutor(max_workers=min(MAX_PCT_PARALLEL, len(groups))) as executor:
+            list(executor.map(add_for_container, groups))
+        return results
 
     def remove_container_mount(self, vmid: int, mount_point: int) -> bool:
         """Remove a mount point from a container.
@@ -167,20 +338,25 @@ class MountManager:
             cmd = ["pct", "set", str(vmid), "-delete", f"mp{mount_point}"]
 
             logger.info(f"Removing mount point mp{mount_point} from container {vmid}")
-            subprocess.run(cmd, check=True)
+            self._set_config(vmid, cmd, {"delete": f"mp{mount_point}"})
+            self.discovery.invalidate(vmid)
 
             return True
 
         except subprocess.CalledProcessError as e:
             logger.error(f"Failed to remove container mount: {e}")
+            if e.stderr:
+                logger.error(f"Error output: {stderr_text(e)}")
             return False
 
-    def container_has_mount(self, vmid: int, host_path: str) -> bool:
+    def container_has_mount(self, vmid: int, host_path: str,
+                            existing_mounts: Optional[Dict[str, Dict[str, str]]] = None) -> bool:
         """Check if container already has a mount for the given host path.
 
         Args:
             vmid: Container ID
             host_path: Host path to check (e.g., '/tank/media')
+            existing_mounts: Current mounts, if the caller already has them
 
         Returns:
             True if mount exists, False otherwise
@@ -188,17 +364,19 @@ class MountManager:
         if self.mock:
             return False
 
-        mounts = self.get_container_mounts(vmid)
+        mounts = existing_mounts if existing_mounts is not None else self.get_container_mounts(vmid)
         for mount_config in mounts.values():
             if mount_config.get('volume') == host_path:
                 return True
         return False
 
-    def get_next_free_mountpoint(self, vmid: int) -> int:
+    def get_next_free_mountpoint(self, vmid: int, used: Optional[Set[int]] = None) -> int:
         """Find the next available mount point number for a container.
 
         Args:
             vmid: Container ID
+            used: Mount point numbers already known to be taken; skips
+                reading the container config when given
 
         Returns:
             Next available mount point number
@@ -209,16 +387,7 @@ class MountManager:
         if self.mock:
             return 0
 
-        config = self.discovery.get_container_config(vmid)
-        used_mps = []
-
-        for key in config.keys():
-            if key.startswith('mp'):
-                try:
-                    mp_num = int(key[2:])
-                    used_mps.append(mp_num)
-                except ValueError:
-                    continue
+        used_mps = used if used is not None else mount_slots(self.discovery.get_container_config(vmid))
 
         # Find first unused number starting from 0
         for i in range(256):  # Proxmox supports up to 256 mount points
@@ -1,36 +1,142 @@
 """High-level container orchestration (combines lifecycle, mounts, discovery)."""
+import json
+import os
+import re
 import subprocess
-from typing import Dict, List, Optional, Tuple
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Set, Tuple, Union
 
 from tengil.core.logger import get_logger
 from tengil.services.post_install import PostInstallManager
 from tengil.services.proxmox.backends.lxc import LXCBackend
 from tengil.services.proxmox.backends.oci import OCIBackend
+from tengil.services.proxmox.lxc_config import container_env, mount_slots
 
 from .discovery import ContainerDiscovery
-from .lifecycle import ContainerLifecycle
-from .mounts import MountManager
+from .lifecycle import MAX_PCT_PARALLEL, ContainerLifecycle
+from .mounts import MountManager, MountResult
 from .templates import TemplateManager
 
 logger = get_logger(__name__)
 
+# Creates from one template (same storage and privilege level) in a pass
+# before a warm base is built for them to clone from
+PREWARM_MIN_CREATES = 2
+
+# post_install task -> (label, port suffix, path) for the access summary
+_SERVICE_URLS: Dict[str, Tuple[str, str, str]] = {
+    'portainer': ('Portainer', ':9000', ''),
+    'jellyfin': ('Jellyfin', ':8096', ''),
+    'homeassistant': ('Home Assistant', ':8123', ''),
+    'nextcloud': ('Nextcloud', '', ''),
+    'pihole': ('Pi-hole', '', '/admin'),
+}
+
+# "name[:tag]"; a tag never contains '/', so a registry port
+# ("registry:5000/app") stays part of the name
+_IMAGE_REF_RE = re.compile(r'^(.+?)(?::([^:/]+))?$')
+
+
+@dataclass
+class ContainerMountSpec:
+    """One entry of a dataset's containers: list, parsed once.
+
+    raw is a private copy of a dict spec (empty for the string form); it is
+    what create_container, _apply_env and _apply_additional_mounts consume.
+    """
+
+    vmid: Optional[int]
+    name: Optional[str]
+    mount_path: str
+    readonly: bool = False
+    auto_create: bool = False
+    type: Optional[str] = None
+    template: Optional[str] = None
+    image: Optional[str] = None
+    post_install: Any = None
+    pool: Optional[str] = None
+    storage: str = 'tank'
+    raw: Dict = field(default_factory=dict)
+
+    @classmethod
+    def from_raw(cls, raw: Union[Dict, str], dataset_name: str) -> Optional['ContainerMountSpec']:
+        """Parse a dict spec or a "name:/mount/path[:ro]" string.
+
+        Returns:
+            The parsed spec, or None if raw is neither form
+        """
+        default_mount = f"/{dataset_name}"
+        if isinstance(raw, dict):
+            # Private copy: workers run concurrently and the template may be rewritten
+            raw = dict(raw)
+            return cls(
+                vmid=raw.get('vmid'),
+                name=raw.get('name'),
+                mount_path=raw.get('mount', default_mount),
+                readonly=raw.get('readonly', False),
+                auto_create=raw.get('auto_create', False),
+                type=raw.get('type'),
+                template=raw.get('template'),
+                image=raw.get('image'),
+                post_install=raw.get('post_install'),
+                pool=raw.get('pool'),
+                storage=raw.get('_pool_name') or raw.get('pool', 'tank'),
+                raw=raw,
+            )
+        if isinstance(raw, str):
+            name, sep, rest = raw.partition(':')
+            mount_path, _, flags = rest.partition(':')
+            return cls(
+                vmid=None,
+                name=name,
+                mount_path=mount_path if sep else default_mount,
+                readonly=flags.partition(':')[0] == 'ro',
+            )
+        return None
+
 
 class ContainerOrchestrator:
     """Orchestrates container operations (facade for all container subsystems)."""
 
-    def __init__(self, mock: bool = False, permission_manager=None):
+    def __init__(self, mock: bool = False, permission_manager=None,
+                 prewarm_templates: Optional[bool] = None):
+        """Initialize the orchestrator.
+
+        Args:
+            mock: If True, log instead of calling Proxmox
+            permission_manager: Decides per-container mount flags
+            prewarm_templates: Clone repeated creates from a warm template base;
+                defaults to TG_PREWARM_TEMPLATES
+        """
         self.mock = mock
         self.permission_manager = permission_manager
-        self.lifecycle = ContainerLifecycle(mock=mock)
-        self.mounts = MountManager(mock=mock, permission_manager=permission_manager)
+        if prewarm_templates is None:
+            prewarm_templates = os.environ.get('TG_PREWARM_TEMPLATES', '').lower() in ('1', 'true')
+        self.prewarm_templates = prewarm_templates
+        # One discovery shared by all subsystems so cached lookups stay coherent
         self.discovery = ContainerDiscovery(mock=mock)
         self.templates = TemplateManager(mock=mock)
+        self.lifecycle = ContainerLifecycle(
+            mock=mock, discovery=self.discovery, templates=self.templates
+        )
+        self.mounts = MountManager(
+            mock=mock, permission_manager=permission_manager, discovery=self.discovery
+        )
         self.post_install = PostInstallManager(mock=mock)
         
         # Backend instances for OCI and LXC
         self.oci_backend = OCIBackend(mock=mock)
         self.lxc_backend = LXCBackend(mock=mock)
 
+        # Concurrent setup_container_mounts workers: creates are serialized,
+        # and each container's mount edits are held by one worker at a time
+        self._create_lock = threading.Lock()
+        self._vmid_locks: Dict[int, threading.Lock] = {}
+        self._vmid_locks_guard = threading.Lock()
+
     # ==================== Delegation Methods ====================
     # Delegate to subsystems for backward compatibility
 
@@ -50,18 +156,23 @@ class ContainerOrchestrator:
         Returns:
             Container VMID if successful, None if failed
         """
-        # Detect backend type from spec
-        container_type = spec.get('type', '').lower()
-        has_oci_section = 'oci' in spec
-        
-        if container_type == 'oci' or has_oci_section:
+        if self._is_oci_spec(spec):
             # Use OCI backend
             logger.info("Detected OCI container spec, using OCI backend")
-            return self._create_oci_container(spec, storage, pool)
+            vmid = self._create_oci_container(spec, storage, pool)
         else:
             # Use traditional LXC backend
-            return self.lifecycle.create_container(spec, storage, pool=pool)
+            vmid = self.lifecycle.create_container(spec, storage, pool=pool)
+
+        if vmid:
+            self.discovery.invalidate()
+        return vmid
     
+    @staticmethod
+    def _is_oci_spec(spec: Dict) -> bool:
+        """Whether a spec targets the OCI backend ('type: oci' or an 'oci' section)."""
+        return 'oci' in spec or str(spec.get('type', '')).lower() == 'oci'
+
     def _create_oci_container(self, spec, storage='local-lvm', pool: Optional[str] = None):
         """Create OCI container using OCIBackend.
         
@@ -85,14 +196,14 @@ class ContainerOrchestrator:
             return None
         
         # Pull image if not already cached
-        logger.info(f"Pulling OCI image: {image}:{tag}")
+        logger.info("Pulling OCI image: %s:%s", image, tag)
         template_ref = self.oci_backend.pull_image(image, tag, registry)
         
         if not template_ref:
-            logger.error(f"Failed to pull OCI image: {image}:{tag}")
+            logger.error("Failed to pull OCI image: %s:%s", image, tag)
             return None
         
-        logger.info(f"Image cached as: {template_ref}")
+        logger.info("Image cached as: %s", template_ref)
         
         # Create container using OCI backend
         vmid = self.oci_backend.create_container(
@@ -112,6 +223,14 @@ class ContainerOrchestrator:
         """Stop a container (delegates to lifecycle)."""
         return self.lifecycle.stop_container(vmid)
 
+    def start_containers(self, vmids):
+        """Start several containers concurrently (delegates to lifecycle)."""
+        return self.lifecycle.start_many(vmids)
+
+    def stop_containers(self, vmids):
+        """Stop several containers concurrently (delegates to lifecycle)."""
+        return self.lifecycle.stop_many(vmids)
+
     def restart_container(self, vmid):
         """Restart a container (delegates to lifecycle)."""
         return self.lifecycle.restart_container(vmid)
@@ -201,7 +320,7 @@ class ContainerOrchestrator:
     # ==================== Orchestration Methods ====================
 
     def setup_container_mounts(self, dataset_name: str, dataset_config: Dict,
-                             pool: str = 'tank') -> List[Tuple[int, bool, str]]:
+                             pool: str = 'tank') -> List[MountResult]:
         """Set up all container mounts for a dataset.
 
         Handles containers intelligently:
@@ -216,194 +335,241 @@ class ContainerOrchestrator:
             pool: ZFS pool name
 
         Returns:
-            List of (vmid, success, message) tuples
+            List of MountResult (vmid, ok, reason), one per container spec
         """
-        results = []
+        # pct list and container configs are read once per pass, not per spec
+        with self.discovery.cached():
+            return self._setup_container_mounts(dataset_name, dataset_config, pool)
 
+    def _setup_container_mounts(self, dataset_name: str, dataset_config: Dict,
+                                pool: str) -> List[MountResult]:
+        """Body of setup_container_mounts, run inside a discovery cache pass."""
         # Check if containers are configured
         containers = dataset_config.get('containers', [])
         if not containers:
-            return results
+            return []
 
         # Host path for the dataset
         host_path = f"/{pool}/{dataset_name}"
 
-        for idx, container_spec in enumerate(containers):
-            was_created = False
-            auto_create = False
-            # Parse container specification
-            if isinstance(container_spec, dict):
-                vmid = container_spec.get('vmid')
-                container_name = container_spec.get('name')
-                mount_path = container_spec.get('mount', f"/{dataset_name}")
-                readonly = container_spec.get('readonly', False)
-                auto_create = container_spec.get('auto_create', False)
-
-                # Phase 2: Create container if auto_create is enabled
-                if auto_create:
-                    # Check if OCI container - need to pull image first
-                    is_oci = container_spec.get('type') == 'oci'
-                    template = container_spec.get('template')
-                    
-                    if is_oci and container_spec.get('image'):
-                        # Pull OCI image and get template reference
-                        image = container_spec.get('image')
-                        tag = 'latest'  # Default tag
-                        if ':' in image:
-                            image, tag = image.rsplit(':', 1)
-                        
-                        logger.info(f"Pulling OCI image: {image}:{tag}")
-                        template_ref = self.oci_backend.pull_image(image, tag)
-                        if not template_ref:
-                            msg = f"Container '{container_name or vmid}': failed to pull OCI image {image}:{tag}"
-                            logger.error(msg)
-                            results.append((0, False, "image pull failed"))
-                            continue
-                        # Extract just the filename from 'local:vztmpl/filename.tar'
-                        template = template_ref.split('/')[-1]
-                        # Store template for create_container call
-                        container_spec['template'] = template
-                    elif not template:
-                        msg = f"Container '{container_name or vmid}': auto_create requires 'template' field (LXC) or 'image' field (OCI)"
+        # Malformed entries are rejected before any pull or pct call
+        specs, results = self._validate_specs(containers, dataset_name)
+        pending = [index for index, result in enumerate(results) if result is None]
+        if not pending:
+            return results
+
+        self._prefetch_oci_images([specs[index].raw for index in pending])
+        self._prefetch_templates([specs[index] for index in pending])
+
+        # Mount slots taken per vmid, read once and updated as mounts are added
+        used_slots: Dict[int, Set[int]] = {}
+
+        def process(index: int) -> MountResult:
+            return self._setup_one_container(specs[index], host_path, used_slots)
+
+        if self.mock or len(pending) <= 1:
+            outcomes = [process(index) for index in pending]
+        else:
+            # Containers are independent; pct calls and boot waits overlap across workers
+            with ThreadPoolExecutor(max_workers=min(MAX_PCT_PARALLEL, len(pending))) as executor:
+                outcomes = list(executor.map(process, pending))
+
+        for index, outcome in zip(pending, outcomes):
+            results[index] = outcome
+        return results
+
+    def _validate_specs(self, containers: List, dataset_name: str
+                        ) -> Tuple[List[Optional[ContainerMountSpec]], List[Optional[MountResult]]]:
+        """Parse a dataset's container entries and apply the checks that need no subprocess.
+
+        Args:
+            containers: Raw entries of the dataset's containers: list
+            dataset_name: Name of the dataset
+
+        Returns:
+            (specs, results) aligned with containers; results holds the
+            failure for each rejected entry and None for entries to process
+        """
+        specs = []
+        results = []
+        for raw in containers:
+            spec = ContainerMountSpec.from_raw(raw, dataset_name)
+            result = None
+            if spec is None:
+                logger.warning("Invalid container spec: %s", raw)
+                result = MountResult(None, False, "invalid spec format")
+            elif (spec.auto_create and not spec.template
+                  and not (self._is_oci_spec(spec.raw) and spec.image)):
+                logger.error(
+                    "Container '%s': auto_create requires 'template' field (LXC) or 'image' field (OCI)",
+                    spec.name or spec.vmid
+                )
+                result = MountResult(None, False, "missing template/image")
+            specs.append(spec)
+            results.append(result)
+        return specs, results
+
+    def _setup_one_container(self, spec: ContainerMountSpec, host_path: str,
+                             used_slots: Dict[int, Set[int]]) -> MountResult:
+        """Resolve (or create) one container of a dataset and mount the dataset into it.
+
+        Args:
+            spec: Container entry that passed _validate_specs
+            host_path: Dataset path on the host
+            used_slots: Pass-wide taken mount slots per vmid
+
+        Returns:
+            MountResult for this container spec
+        """
+        vmid = spec.vmid
+        container_name = spec.name
+        mount_path = spec.mount_path
+        was_created = False
+
+        # Phase 2: Create container if auto_create is enabled
+        if spec.auto_create:
+            # Check if OCI container - need to pull image first
+            template = spec.template
+
+            if self._is_oci_spec(spec.raw) and spec.image:
+                # Pull OCI image and get template reference (already
+                # prefetched, so this normally returns without forking)
+                image, tag = self._split_image_ref(spec.image)
+
+                logger.info("Pulling OCI image: %s:%s", image, tag)
+                template_ref = self.oci_backend.pull_image(image, tag)
+                if not template_ref:
+                    msg = f"Container '{container_name or vmid}': failed to pull OCI image {image}:{tag}"
+                    logger.error(msg)
+                    return MountResult(None, False, "image pull failed")
+                # Extract just the filename from 'local:vztmpl/filename.tar'
+                template = template_ref.split('/')[-1]
+                # Store template for create_container call
+                spec.raw['template'] = template
+
+            # Serialize lookup + create across workers so VMID allocation
+            # and name lookups see containers created by other specs
+            with self._create_lock:
+                # Check if container already exists
+                existing_vmid = None
+                if vmid and self.discovery.container_exists(vmid):
+                    existing_vmid = vmid
+                    logger.info("Container %s (%s) already exists", vmid, container_name)
+                elif container_name:
+                    existing_vmid = self.discovery.find_container_by_name(container_name)
+                    if existing_vmid:
+                        logger.info("Container '%s' already exists (vmid=%s)", container_name, existing_vmid)
+
+                created_vmid = None
+                if not existing_vmid:
+                    # Create new container
+                    logger.info("Creating container '%s' from template %s", container_name, template)
+                    # Use pool name from container spec, fallback to tank then local-zfs
+                    # TODO: Pass pool name through dataset context instead of via container spec
+                    created_vmid = self.create_container(  # Use self.create_container for type routing
+                        spec.raw,
+                        storage=spec.storage,
+                        pool=spec.pool
+                    )
+
+                    if not created_vmid:
+                        msg = f"Failed to create container '{container_name}'"
                         logger.error(msg)
-                        results.append((0, False, "missing template/image"))
-                        continue
-
-                    # Check if container already exists
-                    existing_vmid = None
-                    if vmid and self.discovery.container_exists(vmid):
-                        existing_vmid = vmid
-                        logger.info(f"Container {vmid} ({container_name}) already exists")
-                    elif container_name:
-                        existing_vmid = self.discovery.find_container_by_name(container_name)
-                        if existing_vmid:
-                            logger.info(f"Container '{container_name}' already exists (vmid={existing_vmid})")
-
-                    if not existing_vmid:
-                        # Create new container
-                        logger.info(f"Creating container '{container_name}' from template {template}")
-                        # Use pool name from container spec, fallback to tank then local-zfs
-                        # TODO: Pass pool name through dataset context instead of via container spec
-                        storage = container_spec.get('_pool_name') or container_spec.get('pool', 'tank')
-                        created_vmid = self.create_container(  # Use self.create_container for type routing
-                            container_spec,
-                            storage=storage,
-                            pool=container_spec.get('pool')
-                        )
-
-                        if not created_vmid:
-                            msg = f"Failed to create container '{container_name}'"
-                            logger.error(msg)
-                            results.append((0, False, "creation failed"))
-                            continue
-
-                        logger.info(f"✓ Created container '{container_name}' (vmid={created_vmid})")
-                        was_created = True
-
-                        # Start container
-                        if self.lifecycle.start_container(created_vmid):
-                            logger.info(f"✓ Started container {created_vmid}")
-                            
-                            # Run post-install if specified
-                            post_install = container_spec.get('post_install')
-                            if post_install:
-                                logger.info(f"Running post-install tasks for container {created_vmid}...")
-
-                                # Wait for container to boot
-                                if self.post_install.wait_for_container_boot(created_vmid, timeout=30):
-                                    if self.post_install.run_post_install(created_vmid, post_install):
-                                        logger.info(f"✓ Post-install completed for container {created_vmid}")
-                                        
-                                        # Show container IP and service URLs
-                                        self._display_container_access_info(created_vmid, container_name, post_install)
-                                    else:
-                                        msg = f"Post-install failed for container {created_vmid}"
-                                        logger.error(msg)
-                                        results.append((created_vmid, False, "post-install failed"))
-                                        continue
-                                else:
-                                    msg = f"Container {created_vmid} boot timeout, post-install cannot run"
-                                    logger.error(msg)
-                                    results.append((created_vmid, False, "boot timeout"))
-                                    continue
+                        return MountResult(None, False, "creation failed")
+
+            if created_vmid:
+                logger.info("✓ Created container '%s' (vmid=%s)", container_name, created_vmid)
+                was_created = True
+
+                # Start container
+                if self.lifecycle.start_container(created_vmid):
+                    logger.info("✓ Started container %s", created_vmid)
+
+                    # Run post-install if specified
+                    post_install = spec.post_install
+                    if post_install:
+                        logger.info("Running post-install tasks for container %s...", created_vmid)
+
+                        # Wait for container to boot
+                        if self.post_install.wait_for_container_boot(created_vmid, timeout=30):
+                            if self.post_install.run_post_install(created_vmid, post_install):
+                                logger.info("✓ Post-install completed for container %s", created_vmid)
+
+                                # Show container IP and service URLs
+                                self._display_container_access_info(created_vmid, container_name, post_install)
                             else:
-                                # Show IP even without post-install
-                                self._display_container_access_info(created_vmid, container_name, None)
+                                msg = f"Post-install failed for container {created_vmid}"
+                                logger.error(msg)
+                                return MountResult(created_vmid, False, "post-install failed")
                         else:
-                            logger.warning(f"Container {created_vmid} created but failed to start")
-
-                        vmid = created_vmid
+                            msg = f"Container {created_vmid} boot timeout, post-install cannot run"
+                            logger.error(msg)
+                            return MountResult(created_vmid, False, "boot timeout")
                     else:
-                        # Use existing container
-                        vmid = existing_vmid
-
-                    # Update container_name for logging if not set
-                    if not container_name:
-                        info = self.discovery.get_container_info(vmid)
-                        container_name = info['name'] if info else f"CT{vmid}"
-
-            elif isinstance(container_spec, str):
-                # Simple format: "container_name:/mount/path" or "container_name:/mount/path:ro"
-                parts = container_spec.split(':')
-                container_name = parts[0]
-                mount_path = parts[1] if len(parts) > 1 else f"/{dataset_name}"
-                readonly = (len(parts) > 2 and parts[2] == 'ro')
-                vmid = None
+                        # Show IP even without post-install
+                        self._display_container_access_info(created_vmid, container_name, None)
+                else:
+                    logger.warning("Container %s created but failed to start", created_vmid)
 
+                vmid = created_vmid
             else:
-                logger.warning(f"Invalid container spec: {container_spec}")
-                results.append((0, False, "invalid spec format"))
-                continue
+                # Use existing container
+                vmid = existing_vmid
 
-            # Find container VMID (try vmid first, then name)
-            if vmid:
-                # vmid provided, verify it exists
-                if not self.discovery.container_exists(vmid):
-                    msg = f"Container {vmid} not found"
-                    logger.warning(f"{msg} - skipping mount")
-                    logger.info("  Create the container first, then re-run 'tg apply'")
-                    results.append((vmid, False, msg))
-                    continue
-                # Get name for logging
+            # Update container_name for logging if not set
+            if not container_name:
                 info = self.discovery.get_container_info(vmid)
-                info_name = info['name'] if info else None
-                if container_name and info_name and container_name != info_name:
-                    msg = (
-                        f"Container name mismatch for vmid {vmid}: "
-                        f"expected '{container_name}', found '{info_name}'"
-                    )
-                    logger.error(f"{msg} - skipping mount to avoid wrong target")
-                    results.append((vmid, False, "name mismatch"))
-                    continue
-
-                container_name = info_name or container_name or f"CT{vmid}"
-            else:
-                # Name provided, look up vmid
-                vmid = self.discovery.find_container_by_name(container_name)
-                if not vmid:
-                    msg = f"Container '{container_name}' not found"
-                    logger.warning(f"{msg} - skipping mount")
-                    logger.info("  Create the container first, then re-run 'tg apply'")
-                    results.append((0, False, msg))
-                    continue
-
-            # Check if mount already exists (idempotent)
-            if self.mounts.container_has_mount(vmid, host_path):
+                container_name = info['name'] if info else f"CT{vmid}"
+
+        # Find container VMID (try vmid first, then name)
+        if vmid:
+            # vmid provided, verify it exists
+            if not self.discovery.container_exists(vmid):
+                msg = f"Container {vmid} not found"
+                logger.warning("%s - skipping mount", msg)
+                logger.info("  Create the container first, then re-run 'tg apply'")
+                return MountResult(vmid, False, msg)
+            # Get name for logging
+            info = self.discovery.get_container_info(vmid)
+            info_name = info['name'] if info else None
+            if container_name and info_name and container_name != info_name:
+                msg = (
+                    f"Container name mismatch for vmid {vmid}: "
+                    f"expected '{container_name}', found '{info_name}'"
+                )
+                logger.error("%s - skipping mount to avoid wrong target", msg)
+                return MountResult(vmid, False, "name mismatch")
+
+            container_name = info_name or container_name or f"CT{vmid}"
+        else:
+            # Name provided, look up vmid
+            vmid = self.discovery.find_container_by_name(container_name)
+            if not vmid:
+                msg = f"Container '{container_name}' not found"
+                logger.warning("%s - skipping mount", msg)
+                logger.info("  Create the container first, then re-run 'tg apply'")
+                return MountResult(None, False, msg)
+
+        # Mount slots and config edits of one container stay with one worker
+        with self._vmid_lock(vmid):
+            # Check if mount already exists (idempotent); one config read
+            # serves both this check and add_container_mount's conflict check
+            existing_mounts = self.mounts.get_container_mounts(vmid)
+            if self.mounts.container_has_mount(vmid, host_path, existing_mounts):
                 msg = f"Mount already exists: {host_path} → {container_name}:{mount_path}"
-                logger.info(f"✓ {msg}")
+                logger.info("✓ %s", msg)
                 # Apply env if requested even when mount already exists
-                self._apply_env(vmid, container_spec, container_name)
-                results.append((vmid, True, "already exists"))
-                continue
+                self._apply_env(vmid, spec.raw, container_name)
+                return MountResult(vmid, True, "already exists")
 
             # Find next available mount point
+            used = self._used_mount_slots(vmid, used_slots)
             try:
-                mp_num = self.mounts.get_next_free_mountpoint(vmid)
+                mp_num = self.mounts.get_next_free_mountpoint(vmid, used)
             except ValueError as e:
                 msg = f"No free mount points for container {vmid}"
-                logger.error(f"{msg}: {e}")
-                results.append((vmid, False, msg))
-                continue
+                logger.error("%s: %s", msg, e)
+                return MountResult(vmid, False, msg)
 
             # Add the mount
             success = self.mounts.add_container_mount(
@@ -411,30 +577,90 @@ class ContainerOrchestrator:
                 mount_point=mp_num,
                 host_path=host_path,
                 container_path=mount_path,
-                readonly=readonly,
-                container_name=container_name
+                readonly=spec.readonly,
+                container_name=container_name,
+                existing_mounts=existing_mounts
             )
 
             if success:
+                used.add(mp_num)
                 msg = f"Mounted {host_path} → {container_name}:{mount_path}"
-                if auto_create and was_created:
-                    results.append((vmid, True, "created and mounted"))
+                if was_created:
+                    result = MountResult(vmid, True, "created and mounted")
                 else:
-                    results.append((vmid, True, "mounted"))
-                logger.info(f"✓ {msg}")
-                
+                    result = MountResult(vmid, True, "mounted")
+                logger.info("✓ %s", msg)
+
                 # Apply additional mounts if specified in container spec
-                if isinstance(container_spec, dict) and container_spec.get('mounts'):
-                    self._apply_additional_mounts(vmid, container_spec, container_name)
-                
+                if spec.raw.get('mounts'):
+                    self._apply_additional_mounts(vmid, spec.raw, container_name, used)
+
                 # Apply env after mount succeeds
-                self._apply_env(vmid, container_spec, container_name)
+                self._apply_env(vmid, spec.raw, container_name)
+                return result
             else:
                 msg = f"Failed to mount {host_path} → {container_name}"
                 logger.error(msg)
-                results.append((vmid, False, "mount failed"))
+                return MountResult(vmid, False, "mount failed")
 
-        return results
+    def _vmid_lock(self, vmid: int) -> threading.Lock:
+        """Return the lock guarding mount edits of one container."""
+        with self._vmid_locks_guard:
+            return self._vmid_locks.setdefault(vmid, threading.Lock())
+
+    @staticmethod
+    def _split_image_ref(image: str) -> Tuple[str, str]:
+        """Split 'name:tag' into (name, tag), defaulting the tag to latest."""
+        match = _IMAGE_REF_RE.match(image)
+        return match.group(1), match.group(2) or 'latest'
+
+    def _prefetch_oci_images(self, containers: List) -> None:
+        """Pull every auto_create OCI image of a dataset concurrently.
+
+        skopeo copies are network-bound and independent, so they overlap here;
+        the per-container pull in the main loop then hits the backend's session
+        cache and pct create/set run in order as before.
+        """
+        requests = {}
+        for spec in containers:
+            if (isinstance(spec, dict) and spec.get('auto_create')
+                    and self._is_oci_spec(spec) and spec.get('image')):
+                image, tag = self._split_image_ref(spec['image'])
+                requests.setdefault(f"{image}:{tag}", (image, tag, None))
+
+        if len(requests) > 1:
+            logger.info("Pulling %s OCI images in parallel", len(requests))
+            self.oci_backend.pull_images(list(requests.values()))
+
+    def _prefetch_templates(self, specs: List[ContainerMountSpec]) -> None:
+        """Check or download the LXC templates of containers still to be created.
+
+        Containers that already exist are skipped (discovery answers from the
+        pass cache), so no template is fetched for them. The per-container
+        create then finds each template in TemplateManager's memo. With
+        prewarm_templates, templates that several creates share get a warm
+        base, so those creates clone instead of unpacking the tarball.
+        """
+        to_create = [
+            spec for spec in specs
+            if spec.auto_create and spec.template and not self._is_oci_spec(spec.raw)
+            and not (spec.vmid and self.discovery.container_exists(spec.vmid))
+            and not (spec.name and self.discovery.find_container_by_name(spec.name))
+        ]
+        templates = [spec.template for spec in to_create]
+        if len(set(templates)) > 1:
+            logger.info("Checking %s LXC templates in parallel", len(set(templates)))
+            self.templates.ensure_templates_available(templates)
+
+        if not self.prewarm_templates:
+            return
+        bases = Counter(
+            (spec.template, spec.storage, bool(spec.raw.get('privileged', False)))
+            for spec in to_create
+        )
+        for (template, storage, privileged), count in bases.items():
+            if count >= PREWARM_MIN_CREATES:
+                self.lifecycle.prewarm_template(template, storage=storage, privileged=privileged)
 
     def _apply_env(self, vmid: int, container_spec: Dict, container_name: Optional[str] = None) -> bool:
         """Ensure container env matches spec, restarting if running."""
@@ -444,12 +670,19 @@ class ContainerOrchestrator:
         if not env:
             return True
 
-        is_oci = container_spec.get('type') == 'oci' or 'oci' in container_spec
-        updater = self.oci_backend.update_env if is_oci else self.lxc_backend.update_env
+        # Already applied: skip the pct set and, above all, the restart.
+        # YAML values may be ints/bools; update_env writes them as str(value)
+        wanted = {key: str(value) for key, value in env.items()}
+        if container_env(self.discovery.get_container_config(vmid)) == wanted:
+            logger.debug("Env for container %s already up to date", vmid)
+            return True
+
+        updater = self.oci_backend.update_env if self._is_oci_spec(container_spec) else self.lxc_backend.update_env
 
         if not updater(vmid, env):
-            logger.error(f"Failed to apply env to container {vmid}")
+            logger.error("Failed to apply env to container %s", vmid)
             return False
+        self.discovery.invalidate(vmid)
 
         # Restart if running to apply env
         info = self.discovery.get_container_info(vmid)
@@ -458,7 +691,14 @@ class ContainerOrchestrator:
             self.lifecycle.restart_container(vmid)
         return True
     
-    def _apply_additional_mounts(self, vmid: int, container_spec: Dict, container_name: Optional[str] = None) -> bool:
+    def _used_mount_slots(self, vmid: int, used_slots: Dict[int, Set[int]]) -> Set[int]:
+        """Return the pass-local set of taken mount slots for vmid, reading its config once."""
+        if vmid not in used_slots:
+            used_slots[vmid] = mount_slots(self.discovery.get_container_config(vmid))
+        return used_slots[vmid]
+
+    def _apply_additional_mounts(self, vmid: int, container_spec: Dict, container_name: Optional[str] = None,
+                                 used: Optional[Set[int]] = None) -> bool:
         """Apply additional mounts from container spec's mounts: field.
         
         The primary dataset mount is handled separately. This method processes
@@ -468,6 +708,7 @@ class ContainerOrchestrator:
             vmid: Container ID
             container_spec: Container specification dict
             container_name: Optional container name for logging
+            used: Taken mount slots for vmid, updated in place (read from config if omitted)
             
         Returns:
             True if all mounts applied successfully or no mounts to apply
@@ -475,13 +716,19 @@ class ContainerOrchestrator:
         additional_mounts = container_spec.get('mounts', [])
         if not additional_mounts:
             return True
+
+        if used is None:
+            used = self._used_mount_slots(vmid, {})
+        existing_mounts = self.mounts.get_container_mounts(vmid)
         
-        logger.info(f"Applying {len(additional_mounts)} additional mount(s) to container {vmid}")
+        logger.info("Applying %s additional mount(s) to container %s", len(additional_mounts), vmid)
         
         success_count = 0
+        requests = []
+        queued_sources = set()
         for mount in additional_mounts:
             if not isinstance(mount, dict):
-                logger.warning(f"Invalid mount specification (not a dict): {mount}")
+                logger.warning("Invalid mount specification (not a dict): %s", mount)
                 continue
             
             source = mount.get('source')
@@ -489,39 +736,90 @@ class ContainerOrchestrator:
             readonly = mount.get('readonly', False)
             
             if not source or not target:
-                logger.warning(f"Mount missing source or target: {mount}")
+                logger.warning("Mount missing source or target: %s", mount)
                 continue
             
-            # Check if mount already exists
-            if self.mounts.container_has_mount(vmid, source):
-                logger.info(f"  ✓ Additional mount already exists: {source} → {target}")
+            # Check if mount already exists (or is already part of this batch)
+            if source in queued_sources or self.mounts.container_has_mount(vmid, source, existing_mounts):
+                logger.info("  ✓ Additional mount already exists: %s → %s", source, target)
                 success_count += 1
                 continue
             
-            # Find next available mount point
+            # Find next available mount point, reserving it for the rest of the batch
             try:
-                mp_num = self.mounts.get_next_free_mountpoint(vmid)
+                mp_num = self.mounts.get_next_free_mountpoint(vmid, used)
             except ValueError as e:
-                logger.error(f"  ✗ No free mount points for additional mount: {e}")
+                logger.error("  ✗ No free mount points for additional mount: %s", e)
                 continue
-            
-            # Add the mount
-            if self.mounts.add_container_mount(
-                vmid=vmid,
-                mount_point=mp_num,
-                host_path=source,
-                container_path=target,
-                readonly=readonly,
-                container_name=container_name
-            ):
-                logger.info(f"  ✓ Added additional mount: {source} → {target} (readonly={readonly})")
+            used.add(mp_num)
+            queued_sources.add(source)
+            requests.append({
+                'mount_point': mp_num,
+                'host_path': source,
+                'container_path': target,
+                'readonly': readonly,
+                'container_name': container_name,
+            })
+
+        # All new mounts of this container go out in one pct set
+        outcomes = self.mounts.add_container_mounts_batch(
+            vmid, requests, existing_mounts=existing_mounts
+        ) if requests else []
+        for request, added in zip(requests, outcomes):
+            source, target = request['host_path'], request['container_path']
+            if added:
+                logger.info("  ✓ Added additional mount: %s → %s (readonly=%s)", source, target, request['readonly'])
                 success_count += 1
             else:
-                logger.error(f"  ✗ Failed to add mount: {source} → {target}")
+                used.discard(request['mount_point'])
+                logger.error("  ✗ Failed to add mount: %s → %s", source, target)
         
-        logger.info(f"Applied {success_count}/{len(additional_mounts)} additional mount(s)")
+        logger.info("Applied %s/%s additional mount(s)", success_count, len(additional_mounts))
         return success_count == len(additional_mounts)
     
+    def _container_ip(self, vmid: int) -> Optional[str]:
+        """Find a container's IPv4 address, cheapest source first.
+
+        A static ``ip=`` in net0 needs no process at all; a DHCP address is
+        looked up by the container's MAC in the host's neighbour table. Only
+        if both fail is ``hostname -I`` run inside the container.
+        """
+        net0 = self.discovery.get_container_config(vmid).get('net0', '')
+        options = dict(part.split('=', 1) for part in net0.split(',') if '=' in part)
+
+        ip = options.get('ip', '')
+        if ip and ip not in ('dhcp', 'manual'):
+            return ip.split('/', 1)[0]
+
+        mac = options.get('hwaddr', '').lower()
+        if mac:
+            try:
+                result = subprocess.run(
+                    ['ip', '-4', '-j', 'neigh', 'show'],
+                    stdin=subprocess.DEVNULL,
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.DEVNULL,
+                    check=True,
+                    timeout=5,
+                    close_fds=False
+                )
+                for entry in json.loads(result.stdout or b'[]'):
+                    if entry.get('lladdr', '').lower() == mac and entry.get('dst'):
+                        return entry['dst']
+            except (OSError, subprocess.SubprocessError, ValueError) as e:
+                logger.debug("Neighbour lookup failed for container %s: %s", vmid, e)
+
+        result = subprocess.run(
+            ['pct', 'exec', str(vmid), '--', 'hostname', '-I'],
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            timeout=5,
+            close_fds=False
+        )
+        addresses = result.stdout.split(None, 1) if result.returncode == 0 else []
+        return addresses[0].decode('ascii', 'replace') if addresses else None  # First IP if multiple
+
     def _display_container_access_info(self, vmid: int, container_name: str, post_install: list = None):
         """Display container IP address and access information.
         
@@ -531,37 +829,25 @@ class ContainerOrchestrator:
             post_install: List of post-install tasks (to detect services)
         """
         try:
-            # Get container IP
-            result = subprocess.run(
-                ['pct', 'exec', str(vmid), '--', 'hostname', '-I'],
-                capture_output=True,
-                text=True,
-                timeout=5
-            )
-            
-            if result.returncode == 0 and result.stdout.strip():
-                ip = result.stdout.strip().split()[0]  # First IP if multiple
-                
+            ip = self._container_ip(vmid)
+            if ip:
                 logger.info("=" * 60)
-                logger.info(f"🎉 Container '{container_name}' (ID {vmid}) is ready!")
-                logger.info(f"   IP Address: {ip}")
+                logger.info("🎉 Container '%s' (ID %s) is ready!", container_name, vmid)
+                logger.info("   IP Address: %s", ip)
                 
                 # Show service URLs if we know what was installed
                 if post_install:
-                    if 'portainer' in post_install or 'tteck/portainer' in post_install:
-                        logger.info(f"   Portainer:  http://{ip}:9000")
-                    if 'jellyfin' in post_install or 'tteck/jellyfin' in post_install:
-                        logger.info(f"   Jellyfin:   http://{ip}:8096")
-                    if 'homeassistant' in post_install or 'tteck/homeassistant' in post_install:
-                        logger.info(f"   Home Assistant: http://{ip}:8123")
-                    if 'nextcloud' in post_install or 'tteck/nextcloud' in post_install:
-                        logger.info(f"   Nextcloud:  http://{ip}")
-                    if 'pihole' in post_install or 'tteck/pihole' in post_install:
-                        logger.info(f"   Pi-hole:    http://{ip}/admin")
+                    if isinstance(post_install, str):
+                        post_install = [post_install]
+                    # Dict tasks (script/shell/docker_compose) name no known service
+                    tasks = {task.split('/')[-1] for task in post_install if isinstance(task, str)}
+                    for task, (label, port, path) in _SERVICE_URLS.items():
+                        if task in tasks:
+                            logger.info("   %s: http://%s%s%s", label, ip, port, path)
                 
                 logger.info("=" * 60)
             else:
-                logger.debug(f"Could not get IP for container {vmid}")
+                logger.debug("Could not get IP for container %s", vmid)
                 
         except Exception as e:
-            logger.debug(f"Could not display access info for container {vmid}: {e}")
+            logger.debug("Could not display access info for container %s: %s", vmid, e)
@@ -1,6 +1,11 @@
 """Template management for Proxmox LXC containers."""
+import functools
+import os
+import re
 import subprocess
-from typing import List
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Set, Tuple
 
 from tengil.core.config import get_config
 from tengil.core.logger import get_logger
@@ -8,12 +13,50 @@ from tengil.core.retry import retry
 
 logger = get_logger(__name__)
 
+# Archive suffixes pct accepts for container templates
+TEMPLATE_SUFFIXES = ('.tar', '.tar.gz', '.tgz', '.tar.xz', '.tar.zst')
+
+# Concurrent template checks/downloads when preparing a batch
+MAX_TEMPLATE_PREFETCH = 4
+
+# "<section>  <archive>" rows of `pveam available`; captures the name without
+# its archive suffix
+_AVAILABLE_TEMPLATE_RE = re.compile(rb'^\S+[ \t]+(\S+?)\.tar\.(?:zst|xz|gz)[ \t]*$', re.MULTILINE)
+
+# Directory behind the 'local' storage's vztmpl content, and how long a
+# listing of it is reused
+LOCAL_TEMPLATE_DIR = '/var/lib/vz/template/cache'
+LOCAL_TEMPLATE_TTL = 5.0
+
+# File name column of `pveam list local` rows
+# ("local:vztmpl/debian-12-standard_12.7-1_amd64.tar.zst  120.29MB")
+_VZTMPL_RE = re.compile(rb'^\S+:vztmpl/(\S+)', re.MULTILINE)
+
+# Seconds before list_available_templates runs `pveam update` again
+TEMPLATE_INDEX_TTL = 3600.0
+
+# pveam download's complaint when the archive is already in storage
+_ALREADY_EXISTS = 'already exists'
+
+
+@functools.lru_cache(maxsize=64)
+def template_file_name(template: str) -> str:
+    """Return the archive filename for a template ('.tar.zst' unless given)."""
+    return template if template.endswith(TEMPLATE_SUFFIXES) else f'{template}.tar.zst'
+
 
 class TemplateManager:
     """Manages Proxmox LXC templates (download, list, ensure availability)."""
 
     def __init__(self, mock: bool = False):
         self.mock = mock
+        # Templates confirmed present; they are never removed during a run
+        self._available: Set[str] = set()
+        # (monotonic time, sorted file names, short name -> file name) of
+        # the 'local' storage's templates
+        self._local_cache: Optional[Tuple[float, List[str], Dict[str, str]]] = None
+        # monotonic time of the last successful `pveam update`
+        self._last_update_ts: Optional[float] = None
 
     def list_available_templates(self) -> List[str]:
         """Get list of available templates from Proxmox repository.
@@ -28,39 +71,48 @@ class TemplateManager:
                 'debian-12-turnkey-mediaserver',
             ]
 
-        # Update template list first
-        try:
-            subprocess.run(['pveam', 'update'], capture_output=True, check=True)
-        except subprocess.CalledProcessError:
-            logger.warning("Failed to update template list")
+        self._update_template_index()
 
-        # Get available templates
+        # Get available templates (raw bytes; only matched names are decoded)
         try:
             result = subprocess.run(
                 ['pveam', 'available'],
+                stdin=subprocess.DEVNULL,
                 capture_output=True,
-                text=True,
-                check=True
+                check=True,
+                close_fds=False
             )
         except subprocess.CalledProcessError as e:
-            logger.error(f"Failed to get available templates: {e}")
+            logger.error("Failed to get available templates: %s", e)
             return []
 
-        # Parse output, extract template names
-        templates = []
-        for line in result.stdout.splitlines():
-            if 'vztmpl' in line:
-                # Extract template name from line
-                parts = line.split()
-                if len(parts) > 1:
-                    # Template names like "debian-12-standard_12.2-1_amd64.tar.zst"
-                    # Extract base name without version/arch suffix
-                    template_full = parts[1]
-                    # Remove .tar.zst extension
-                    template_base = template_full.replace('.tar.zst', '').replace('.tar.xz', '')
-                    templates.append(template_base)
-
-        return templates
+        # Rows look like "system  debian-12-standard_12.2-1_amd64.tar.zst"
+        return [name.decode('ascii', 'replace') for name in _AVAILABLE_TEMPLATE_RE.findall(result.stdout)]
+
+    def _update_template_index(self) -> None:
+        """Refresh pveam's template index at most once per TEMPLATE_INDEX_TTL.
+
+        `pveam update` contacts the mirror and takes seconds; a listing
+        against an index up to an hour old is good enough.
+        """
+        now = time.monotonic()
+        if self._last_update_ts is not None and now - self._last_update_ts < TEMPLATE_INDEX_TTL:
+            return
+
+        try:
+            subprocess.run(
+                ['pveam', 'update'],
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                check=True,
+                close_fds=False
+            )
+        except subprocess.CalledProcessError:
+            # Leave the timestamp alone so the next lookup retries
+            logger.warning("Failed to update template list")
+            return
+        self._last_update_ts = now
 
     def template_exists_locally(self, template: str) -> bool:
         """Check if template is downloaded locally.
@@ -75,17 +127,67 @@ class TemplateManager:
             # In mock mode, common templates exist
             return template in ['debian-12-standard', 'ubuntu-22.04-standard']
 
+        listing = self._local_templates()
+        if listing is None:
+            return False
+        names, by_short_name = listing
+        return template in by_short_name or any(template in name for name in names)
+
+    def _local_templates(self, allow_pveam: bool = True) -> Optional[Tuple[List[str], Dict[str, str]]]:
+        """List template archives in the 'local' storage.
+
+        A directory scan replaces forking ``pveam list local`` (which goes
+        through pvedaemon); pveam is only asked when the directory cannot
+        be read. Either listing is reused for LOCAL_TEMPLATE_TTL seconds or
+        until :meth:`invalidate`.
+
+        Args:
+            allow_pveam: Fall back to ``pveam list local`` (False: give up
+                instead)
+
+        Returns:
+            (sorted file names, short name -> first file name), or None if
+            no listing could be obtained
+        """
+        cached = self._local_cache
+        if cached is not None and time.monotonic() - cached[0] < LOCAL_TEMPLATE_TTL:
+            return cached[1], cached[2]
+
+        try:
+            with os.scandir(LOCAL_TEMPLATE_DIR) as entries:
+                names = sorted(entry.name for entry in entries if entry.is_file())
+        except OSError:
+            names = self._pveam_local_names() if allow_pveam else None
+            if names is None:
+                return None
+
+        # Short name (up to the version, e.g. 'debian-12-standard') -> first file
+        by_short_name: Dict[str, str] = {}
+        for name in names:
+            by_short_name.setdefault(name.split('_', 1)[0], name)
+        self._local_cache = (time.monotonic(), names, by_short_name)
+        return names, by_short_name
+
+    def _pveam_local_names(self) -> Optional[List[str]]:
+        """Return the template file names listed by ``pveam list local``."""
         try:
             result = subprocess.run(
                 ['pveam', 'list', 'local'],
+                stdin=subprocess.DEVNULL,
                 capture_output=True,
-                text=True,
-                check=True
+                check=True,
+                close_fds=False
             )
-            return template in result.stdout
         except subprocess.CalledProcessError as e:
-            logger.error(f"Failed to check local templates: {e}")
-            return False
+            logger.error("Failed to list local templates: %s", e)
+            return None
+
+        # Raw bytes; only the matched file names are decoded
+        return sorted(name.decode('ascii', 'replace') for name in _VZTMPL_RE.findall(result.stdout))
+
+    def invalidate(self) -> None:
+        """Drop the cached listing of local templates (e.g. after a download)."""
+        self._local_cache = None
 
     def resolve_template_filename(self, template: str) -> str:
         """Resolve short template name to full filename.
@@ -100,29 +202,15 @@ class TemplateManager:
         if self.mock:
             return f'{template}.tar.zst'
 
-        try:
-            result = subprocess.run(
-                ['pveam', 'list', 'local'],
-                capture_output=True,
-                text=True,
-                check=True
-            )
-            # Find line containing the template name
-            for line in result.stdout.splitlines():
-                if template in line and 'vztmpl' in line:
-                    # Extract filename from line like:
-                    # local:vztmpl/debian-12-standard_12.12-1_amd64.tar.zst  118.00MB
-                    parts = line.split()
-                    if len(parts) >= 1:
-                        full_path = parts[0]  # local:vztmpl/filename.tar.zst
-                        # Extract just the filename
-                        filename = full_path.split('/')[-1]
-                        return filename
-        except subprocess.CalledProcessError as e:
-            logger.error(f"Failed to resolve template filename: {e}")
+        listing = self._local_templates()
+        if listing is not None:
+            names, by_short_name = listing
+            match = by_short_name.get(template) or next((name for name in names if template in name), None)
+            if match:
+                return match
 
         # Fallback: assume .tar.zst extension
-        return f'{template}.tar.zst' if '.tar' not in template else template
+        return template_file_name(template)
 
     @retry(max_attempts=3, delay=5, exceptions=(subprocess.CalledProcessError,))
     def download_template(self, template: str) -> bool:
@@ -138,31 +226,38 @@ class TemplateManager:
             Automatically retries up to 3 times with exponential backoff on network failures
         """
         if self.mock:
-            logger.info(f"MOCK: Would download template {template}")
+            logger.info("MOCK: Would download template %s", template)
             return True
 
         config = get_config()
-        logger.info(f"Downloading template {template}...")
+        logger.info("Downloading template %s...", template)
 
         # Template names might need full version suffix for download
         # Try exact name first, then with .tar.zst
-        template_file = template if '.tar' in template else f"{template}.tar.zst"
+        template_file = template_file_name(template)
 
         try:
             result = subprocess.run(
                 ['pveam', 'download', 'local', template_file],
+                stdin=subprocess.DEVNULL,
                 capture_output=True,
                 text=True,
                 check=True,
+                close_fds=False,
                 timeout=config.template_download_timeout
             )
-            logger.info(f"✓ Downloaded template {template}")
+            logger.info("✓ Downloaded template %s", template)
+            self.invalidate()
             return True
 
         except subprocess.CalledProcessError as e:
-            logger.error(f"✗ Failed to download template {template}: {e}")
+            if e.stderr and _ALREADY_EXISTS in e.stderr:
+                logger.debug("Template %s already downloaded", template)
+                self.invalidate()
+                return True
+            logger.error("✗ Failed to download template %s: %s", template, e)
             if e.stderr:
-                logger.error(f"Error output: {e.stderr}")
+                logger.error("Error output: %s", e.stderr)
             raise  # Re-raise to trigger retry
         except subprocess.TimeoutExpired:
             logger.error("✗ Template download timed out after 10 minutes")
@@ -177,9 +272,44 @@ class TemplateManager:
         Returns:
             True if template is available (already existed or downloaded successfully)
         """
-        if self.template_exists_locally(template):
-            logger.debug(f"Template {template} already available")
+        if template in self._available:
             return True
 
-        logger.info(f"Template {template} not found locally, downloading...")
-        return self.download_template(template)
+        if (not self.mock and template.endswith(TEMPLATE_SUFFIXES)
+                and self._local_templates(allow_pveam=False) is None):
+            # A full archive name and no directory listing to consult: rather
+            # than fork 'pveam list local' first, go straight to the download,
+            # which pveam skips when the archive is already present. Short
+            # names still need the listing, as they are not downloadable.
+            logger.info("Ensuring template %s via pveam download...", template)
+        elif self.template_exists_locally(template):
+            logger.debug("Template %s already available", template)
+            self._available.add(template)
+            return True
+        else:
+            logger.info("Template %s not found locally, downloading...", template)
+
+        if not self.download_template(template):
+            return False
+        self._available.add(template)
+        return True
+
+    def ensure_templates_available(self, templates: Iterable[str]) -> Dict[str, bool]:
+        """Ensure several templates are available, checking them concurrently.
+
+        Args:
+            templates: Template names; duplicates are checked once
+
+        Returns:
+            Dict of template name to ensure_template_available result
+        """
+        unique = list(dict.fromkeys(templates))
+        if len(unique) <= 1:
+            return {template: self.ensure_template_available(template) for template in unique}
+
+        # One listing of local templates serves every check below; only the
+        # missing templates then reach pveam download, concurrently
+        if not self.mock:
+            self._local_templates(allow_pveam=False)
+        with ThreadPoolExecutor(max_workers=min(MAX_TEMPLATE_PREFETCH, len(unique))) as executor:
+            return dict(zip(unique, executor.map(self.ensure_template_available, unique)))
@@ -0,0 +1,92 @@
+"""Parsing for Proxmox LXC container config files (/etc/pve/lxc/<vmid>.conf)."""
+import os
+import re
+from pathlib import Path
+from typing import Dict, Iterable, Set, Union
+
+LXC_CONFIG_DIR = Path('/etc/pve/lxc')
+
+# Mount point keys (mp0, mp1, ...); rejects look-alikes such as "mp0-backup"
+MP_KEY_RE = re.compile(r'^mp(\d+)$')
+
+# Separator between KEY=value pairs of the 'env' option (escaped as \0 on disk)
+_ENV_SEPARATOR_RE = re.compile(r'\\0|\x00')
+
+# Raw LXC keys carrying one variable each (lxc.environment.KEY: value)
+_ENVIRONMENT_KEY_PREFIX = 'lxc.environment.'
+
+
+def lxc_config_path(vmid: int) -> Path:
+    """Return the config file path for a container."""
+    return LXC_CONFIG_DIR / f'{vmid}.conf'
+
+
+def parse_lxc_config(source: Union[str, Iterable[str]]) -> Dict[str, str]:
+    """Parse the ``key: value`` lines of an LXC config.
+
+    Parsing stops at the first ``[snapshot]`` section so snapshot copies of
+    keys do not shadow the live configuration. Given an open file, the
+    snapshot sections are never read at all.
+
+    Args:
+        source: Config file contents, or an iterable of lines (e.g. a file)
+
+    Returns:
+        Dict of config key/value pairs
+    """
+    lines = source.splitlines() if isinstance(source, str) else source
+    config = {}
+    for line in lines:
+        line = line.strip()
+        if not line or line[0] == '#':
+            continue
+        if line[0] == '[':
+            break
+        key, sep, value = line.partition(':')
+        if sep:
+            config[key.strip()] = value.strip()
+    return config
+
+
+def read_lxc_config(vmid: int) -> Dict[str, str]:
+    """Read and parse a container's config file.
+
+    Raises:
+        OSError: If the config file cannot be read
+    """
+    with lxc_config_path(vmid).open() as config_file:
+        return parse_lxc_config(config_file)
+
+
+def mount_slots(config: Dict[str, str]) -> Set[int]:
+    """Return the mount point numbers used in a parsed config."""
+    return {int(m.group(1)) for key in config if (m := MP_KEY_RE.match(key))}
+
+
+def container_env(config: Dict[str, str]) -> Dict[str, str]:
+    """Return the environment variables set in a parsed config.
+
+    Reads both the ``env`` option written by ``pct set --env`` and raw
+    ``lxc.environment.KEY`` entries.
+    """
+    env = {}
+    for pair in _ENV_SEPARATOR_RE.split(config.get('env', '')):
+        key, sep, value = pair.partition('=')
+        if sep:
+            env[key] = value
+    for key, value in config.items():
+        if key.startswith(_ENVIRONMENT_KEY_PREFIX):
+            env[key[len(_ENVIRONMENT_KEY_PREFIX):]] = value
+    return env
+
+
+def config_vmids() -> Set[int]:
+    """Return the VMIDs that have a config file on this node."""
+    try:
+        with os.scandir(LXC_CONFIG_DIR) as entries:
+            return {
+                int(entry.name[:-5]) for entry in entries
+                if entry.name.endswith('.conf') and entry.name[:-5].isdigit()
+            }
+    except OSError:
+        return set()
@@ -1,9 +1,9 @@
 """Unified Proxmox management interface."""
 import os
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, List, Optional
 
 from tengil.core.logger import get_logger
-from tengil.services.proxmox.containers import ContainerManager
+from tengil.services.proxmox.containers import ContainerManager, MountResult
 from tengil.services.proxmox.storage import StorageManager
 
 logger = get_logger(__name__)
@@ -123,7 +123,7 @@ class ProxmoxManager:
         return self.containers.get_next_free_mountpoint(vmid)
 
     def setup_container_mounts(self, dataset_name: str, dataset_config: Dict,
-                             pool: str = 'tank') -> List[Tuple[int, bool]]:
+                             pool: str = 'tank') -> List[MountResult]:
         """Set up all container mounts for a dataset."""
         return self.containers.setup_container_mounts(dataset_name, dataset_config, pool)
 
@@ -152,7 +152,7 @@ class ProxmoxManager:
         # Set up container mounts
         if 'containers' in dataset_config:
             mount_results = self.setup_container_mounts(dataset_name, dataset_config, pool)
-            if mount_results and not all(r[1] for r in mount_results):
+            if mount_results and not all(r.ok for r in mount_results):
                 success = False
 
         return success
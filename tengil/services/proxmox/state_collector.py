@@ -1,8 +1,10 @@
 """Reality model collector for Proxmox + ZFS."""
 from __future__ import annotations
 
+import re
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
-from typing import Any, Dict, Iterable, List, Optional
+from typing import Any, Callable, Dict, Iterable, List, Optional, TypeVar
 
 from tengil.core.logger import get_logger
 from tengil.core.zfs_manager import ZFSManager
@@ -12,6 +14,28 @@ logger = get_logger(__name__)
 
 _BOOL_TRUE = {"1", "true", "yes", "on"}
 
+# key=value items of a comma-separated device/option string (whitespace trimmed)
+_KV_PAIR_RE = re.compile(r'([^,=\s][^,=]*?)\s*=\s*([^,]*?)\s*(?=,|$)')
+# Leading positional item without '=' (the volume of "tank/vol,mp=/data")
+_PRIMARY_RE = re.compile(r'[\s,]*([^,=]+?)\s*(?:,|$)')
+
+# Upper bound on concurrent config reads / zfs list calls
+MAX_COLLECT_PARALLEL = 16
+
+_T = TypeVar("_T")
+_R = TypeVar("_R")
+
+
+def _map_concurrently(func: Callable[[_T], _R], items: List[_T]) -> List[_R]:
+    """Apply func to each item on a bounded thread pool, keeping order.
+
+    Each call waits on a subprocess or file read, so the waits overlap.
+    """
+    if len(items) <= 1:
+        return [func(item) for item in items]
+    with ThreadPoolExecutor(max_workers=min(MAX_COLLECT_PARALLEL, len(items))) as executor:
+        return list(executor.map(func, items))
+
 
 class RealityStateCollector:
     """Collects the live state of Proxmox containers and ZFS datasets."""
@@ -34,7 +58,7 @@ class RealityStateCollector:
         """Collect the full reality snapshot."""
         containers = self._collect_containers()
         storage_cfg = self._collect_storage()
-        datasets = self._collect_datasets(pools)
+        datasets = self._collect_datasets(pools, storage_cfg)
 
         metadata = {
             "generated_at": datetime.now(timezone.utc).isoformat(),
@@ -59,42 +83,45 @@ class RealityStateCollector:
             logger.error("Failed to list containers: %s", exc)
             return []
 
-        result: List[Dict[str, Any]] = []
-        for summary in summaries:
-            vmid = self._coerce_int(summary.get("vmid"))
-            if vmid is None:
-                continue
-
-            try:
-                config = self.proxmox.get_container_config(vmid) or {}
-            except Exception as exc:  # pragma: no cover - defensive
-                logger.error("Failed to get config for vmid %s: %s", vmid, exc)
-                config = {}
-
-            mounts = self._collect_mounts(vmid, config)
-            network = self._collect_network(config)
-            features = self._collect_features(config)
-            rootfs = self._collect_rootfs(config.get("rootfs"))
-
-            container_state: Dict[str, Any] = {
-                "vmid": vmid,
-                "name": summary.get("name") or config.get("hostname"),
-                "hostname": config.get("hostname"),
-                "status": summary.get("status", "unknown"),
-                "unprivileged": self._coerce_bool(config.get("unprivileged")),
-                "resources": self._collect_resources(config),
-                "rootfs": rootfs,
-                "mounts": mounts,
-                "network": network,
-                "features": features,
-                "raw_config": config,
-            }
-
-            # Drop None values for cleaner diffs
-            result.append({k: v for k, v in container_state.items() if v is not None})
-
+        # Config (and mount) reads of different containers overlap
+        states = _map_concurrently(self._collect_container, summaries)
+        result = [state for state in states if state is not None]
         return sorted(result, key=lambda item: item.get("vmid", 0))
 
+    def _collect_container(self, summary: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Build the state of one container from its pct list row."""
+        vmid = self._coerce_int(summary.get("vmid"))
+        if vmid is None:
+            return None
+
+        try:
+            config = self.proxmox.get_container_config(vmid) or {}
+        except Exception as exc:  # pragma: no cover - defensive
+            logger.error("Failed to get config for vmid %s: %s", vmid, exc)
+            config = {}
+
+        mounts = self._collect_mounts(vmid, config)
+        network = self._collect_network(config)
+        features = self._collect_features(config)
+        rootfs = self._collect_rootfs(config.get("rootfs"))
+
+        container_state: Dict[str, Any] = {
+            "vmid": vmid,
+            "name": summary.get("name") or config.get("hostname"),
+            "hostname": config.get("hostname"),
+            "status": summary.get("status", "unknown"),
+            "unprivileged": self._coerce_bool(config.get("unprivileged")),
+            "resources": self._collect_resources(config),
+            "rootfs": rootfs,
+            "mounts": mounts,
+            "network": network,
+            "features": features,
+            "raw_config": config,
+        }
+
+        # Drop None values for cleaner diffs
+        return {k: v for k, v in container_state.items() if v is not None}
+
     def _collect_resources(self, config: Dict[str, str]) -> Dict[str, Any]:
         resources = {
             "memory_mb": self._coerce_int(config.get("memory")),
@@ -188,19 +215,21 @@ class RealityStateCollector:
 
     # -------------------- ZFS helpers --------------------
 
-    def _collect_datasets(self, pools: Optional[Iterable[str]]) -> Dict[str, Dict[str, Dict[str, Any]]]:
-        pool_list = list(pools) if pools else list(self._infer_pools())
-        datasets: Dict[str, Dict[str, Dict[str, Any]]] = {}
-        for pool in pool_list:
-            try:
-                datasets[pool] = self.zfs.list_datasets(pool)
-            except Exception as exc:  # pragma: no cover - defensive
-                logger.error("Failed to list datasets for %s: %s", pool, exc)
-                datasets[pool] = {}
-        return datasets
-
-    def _infer_pools(self) -> List[str]:
-        storage = self._collect_storage()
+    def _collect_datasets(
+        self, pools: Optional[Iterable[str]], storage: Dict[str, Any]
+    ) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        # storage is the snapshot's parsed storage.cfg; it is not re-read here
+        pool_list = list(pools) if pools else self._infer_pools(storage)
+        return dict(zip(pool_list, _map_concurrently(self._collect_pool_datasets, pool_list)))
+
+    def _collect_pool_datasets(self, pool: str) -> Dict[str, Dict[str, Any]]:
+        try:
+            return self.zfs.list_datasets(pool)
+        except Exception as exc:  # pragma: no cover - defensive
+            logger.error("Failed to list datasets for %s: %s", pool, exc)
+            return {}
+
+    def _infer_pools(self, storage: Dict[str, Any]) -> List[str]:
         pools = set()
         for cfg in storage.values():
             pool = cfg.get("pool")
@@ -214,24 +243,14 @@ class RealityStateCollector:
 
     def _parse_device_config(self, value: str, primary_key: str) -> Dict[str, Any]:
         parsed = self._parse_kv_pairs(value)
-        parts = [part.strip() for part in value.split(",") if part.strip()]
-        if parts and "=" not in parts[0]:
-            parsed.setdefault(primary_key, parts[0])
-        if "ro" in parsed:
-            parsed["ro"] = parsed["ro"]
+        primary = _PRIMARY_RE.match(value)
+        if primary:
+            parsed.setdefault(primary_key, primary.group(1))
         return parsed
 
     @staticmethod
     def _parse_kv_pairs(value: str) -> Dict[str, str]:
-        result: Dict[str, str] = {}
-        for part in value.split(","):
-            part = part.strip()
-            if not part:
-                continue
-            if "=" in part:
-                key, raw = part.split("=", 1)
-                result[key.strip()] = raw.strip()
-        return result
+        return dict(_KV_PAIR_RE.findall(value))
 
     @staticmethod
     def _coerce_bool(value: Any) -> Optional[bool]:
@@ -1,4 +1,5 @@
 """Proxmox storage configuration management."""
+import re
 import subprocess
 from pathlib import Path
 from typing import Dict
@@ -7,6 +8,11 @@ from tengil.core.logger import get_logger
 
 logger = get_logger(__name__)
 
+# "<type>: <storage id>" section header (not indented)
+_HEADER_RE = re.compile(r'^(\w+):\s*(\S+)\s*$')
+# Indented "<key> <value>" property of the current section
+_PROP_RE = re.compile(r'^[ \t]+(\S+)\s+(.+?)\s*$')
+
 
 class StorageManager:
     """Manages Proxmox storage configuration."""
@@ -36,33 +42,28 @@ class StorageManager:
         current_storage = None
 
         try:
-            with open(self.storage_cfg_path) as f:
-                for raw_line in f:
-                    line = raw_line.strip()
-
-                    # Skip comments and empty lines
-                    if not line or line.startswith('#'):
-                        continue
-
-                    # Storage definition starts (no indentation)
-                    if ':' in line and not raw_line.startswith((' ', '\t')):
-                        parts = line.split(':', 1)
-                        if len(parts) == 2:
-                            storage_type = parts[0].strip()
-                            storage_name = parts[1].strip()
-                            current_storage = storage_name
-                            storages[storage_name] = {'type': storage_type}
-
-                    # Storage properties (indented)
-                    elif current_storage and raw_line.startswith((' ', '\t')):
-                        # Handle both space and tab separated values
-                        parts = line.split(None, 1)
-                        if len(parts) == 2:
-                            key, value = parts
-                            storages[current_storage][key] = value
-                        else:
-                            # Handle properties without values or weird formatting
-                            pass
+            # One read of the whole (small) file; a stray non-UTF-8 byte in a
+            # comment must not abort the parse
+            text = self.storage_cfg_path.read_text(encoding='utf-8', errors='replace')
+            for raw_line in text.splitlines():
+                line = raw_line.lstrip()
+
+                # Skip comments and empty lines
+                if not line or line[0] == '#':
+                    continue
+
+                # Storage definition starts (no indentation)
+                match = _HEADER_RE.match(raw_line)
+                if match:
+                    current_storage = match.group(2)
+                    storages[current_storage] = {'type': match.group(1)}
+                    continue
+
+                # Storage properties (indented, space or tab separated);
+                # properties without a value are skipped
+                match = _PROP_RE.match(raw_line)
+                if match and current_storage:
+                    storages[current_storage][match.group(1)] = match.group(2)
 
         except Exception as e:
             logger.error(f"Failed to parse storage.cfg: {e}")
@@ -107,7 +108,7 @@ class StorageManager:
             logger.info(f"Added storage '{name}' to storage.cfg")
 
             # Reload Proxmox storage
-            subprocess.run(["pvesm", "status"], capture_output=True)
+            subprocess.run(["pvesm", "status"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
 
             return True
 
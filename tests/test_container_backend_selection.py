@@ -200,5 +200,35 @@ class TestBackendSelection(unittest.TestCase):
             )
 
 
+    def test_dataset_oci_images_prefetched_in_parallel(self):
+        """Distinct auto_create OCI images in a dataset are pulled in one batch."""
+        containers = [
+            {'name': 'redis', 'type': 'oci', 'image': 'redis:7', 'auto_create': True},
+            {'name': 'cache2', 'type': 'oci', 'image': 'redis:7', 'auto_create': True},
+            {'name': 'db', 'type': 'oci', 'image': 'postgres', 'auto_create': True},
+            {'name': 'jellyfin', 'mount': '/media'},
+        ]
+
+        with patch.object(self.orchestrator.oci_backend, 'pull_images') as mock_pull:
+            self.orchestrator._prefetch_oci_images(containers)
+
+        mock_pull.assert_called_once_with([('redis', '7', None), ('postgres', 'latest', None)])
+
+
+    def test_uppercase_oci_type_validated_and_prefetched_as_oci(self):
+        """'type: OCI' is treated as OCI everywhere, not only at create time."""
+        containers = [
+            {'name': 'redis', 'type': 'OCI', 'image': 'redis:7', 'auto_create': True},
+            {'name': 'db', 'type': 'Oci', 'image': 'postgres', 'auto_create': True},
+        ]
+
+        specs, results = self.orchestrator._validate_specs(containers, 'media')
+        self.assertEqual(results, [None, None])
+
+        with patch.object(self.orchestrator.oci_backend, 'pull_images') as mock_pull:
+            self.orchestrator._prefetch_oci_images(containers)
+
+        mock_pull.assert_called_once_with([('redis', '7', None), ('postgres', 'latest', None)])
+
 if __name__ == '__main__':
     unittest.main()
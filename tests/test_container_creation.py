@@ -1,6 +1,8 @@
 """Tests for Phase 2 Task 4: Container creation."""
 from types import SimpleNamespace
 
+import pytest
+
 from tengil.services.proxmox.containers.lifecycle import ContainerLifecycle
 
 
@@ -12,9 +14,9 @@ def _setup_lifecycle(monkeypatch):
 
     captured = {}
 
-    def fake_run(cmd, capture_output, text, check):
+    def fake_run(cmd, **kwargs):
         captured['cmd'] = cmd
-        return SimpleNamespace(stdout="", stderr="")
+        return SimpleNamespace(stdout=b"", stderr=b"")
 
     monkeypatch.setattr(
         "tengil.services.proxmox.containers.lifecycle.subprocess.run",
@@ -552,3 +554,430 @@ class TestContainerPrivileged:
         assert '--startup' in captured['cmd']
         startup_value = captured['cmd'][captured['cmd'].index('--startup') + 1]
         assert startup_value == 'order=5,down=60'
+
+    def test_disk_unit_suffix_stripped(self, monkeypatch):
+        """Ensure disk sizes reach pct as bare gigabyte numbers."""
+        lifecycle, captured = _setup_lifecycle(monkeypatch)
+        spec = {
+            'name': 'disk-test',
+            'vmid': 993,
+            'template': 'debian-12-standard',
+            'resources': {'disk': '128G'},
+        }
+
+        lifecycle.create_container(spec, storage='tank')
+
+        assert captured['cmd'][captured['cmd'].index('--rootfs') + 1] == 'tank:128'
+
+
+class TestBulkLifecycle:
+    """Test concurrent start/stop across several containers."""
+
+    def test_start_many_reports_per_vmid(self, monkeypatch):
+        lifecycle = ContainerLifecycle(mock=False)
+        started = []
+
+        def fake_start(vmid):
+            started.append(vmid)
+            return vmid != 102
+
+        monkeypatch.setattr(lifecycle, "start_container", fake_start)
+
+        assert lifecycle.start_many([100, 101, 102, 100]) == {100: True, 101: True, 102: False}
+        assert sorted(started) == [100, 101, 102]
+
+    def test_stop_many_mock(self):
+        lifecycle = ContainerLifecycle(mock=True)
+
+        assert lifecycle.stop_many([100, 101]) == {100: True, 101: True}
+
+    def test_update_containers_bounded_and_aggregated(self, monkeypatch):
+        lifecycle = ContainerLifecycle(mock=False)
+        seen = []
+
+        def fake_update(vmid, upgrade=True):
+            seen.append((vmid, upgrade))
+            return vmid != 101
+
+        monkeypatch.setattr(lifecycle, "update_container", fake_update)
+
+        assert lifecycle.update_containers([100, 101], concurrency=2, upgrade=False) == {
+            100: True, 101: False,
+        }
+        assert sorted(seen) == [(100, False), (101, False)]
+
+
+class TestArgvHelpers:
+    """Test the pure pct create value renderers."""
+
+    def test_net_config(self):
+        from tengil.services.proxmox.containers.lifecycle import _net_config
+
+        assert _net_config('vmbr0', 'dhcp', '10.0.0.1', '1') == 'name=eth0,bridge=vmbr0,firewall=1,ip=dhcp'
+        assert _net_config('vmbr1', '10.0.0.5/24', '10.0.0.1', '0') == (
+            'name=eth0,bridge=vmbr1,firewall=0,ip=10.0.0.5/24,gw=10.0.0.1'
+        )
+
+    def test_tags_and_startup(self):
+        from tengil.services.proxmox.containers.lifecycle import _startup_value, _tags_value
+
+        assert _tags_value(['media', ' web', '']) == 'media,web'
+        assert _tags_value([]) is None
+        assert _startup_value(None, 1, None) == 'order=1'
+        assert _startup_value('order=5', 1, 30) == 'order=5'
+        assert _startup_value(None) is None
+
+    def test_spawn_argv_resolves_program_path(self):
+        import os
+
+        from tengil.services.proxmox.containers.lifecycle import spawn_argv
+
+        argv = spawn_argv(['sh', '-c', 'true'])
+        assert os.path.isabs(argv[0]) and argv[1:] == ['-c', 'true']
+        assert spawn_argv(['no-such-tool-xyz', 'x']) == ['no-such-tool-xyz', 'x']
+
+    def test_template_file_name(self):
+        from tengil.services.proxmox.containers.templates import template_file_name
+
+        assert template_file_name('debian-12-standard') == 'debian-12-standard.tar.zst'
+        assert template_file_name('alpine.tar.xz') == 'alpine.tar.xz'
+        assert template_file_name('app.tar') == 'app.tar'
+        assert template_file_name('tools.tarball-base') == 'tools.tarball-base.tar.zst'
+
+    def test_invalid_static_ip_rejected_before_pct(self, monkeypatch):
+        from tengil.services.proxmox.containers.lifecycle import _invalid_ip
+
+        assert _invalid_ip({}) is None
+        assert _invalid_ip({'network': {'ip': '192.168.1.50/24'}}) is None
+        assert _invalid_ip({'network': {'ip': 'fd00::5/64'}}) is None
+        assert _invalid_ip({'network': {'ip': '1.2.3/24'}}) == '1.2.3/24'
+        assert _invalid_ip({'network': {'ip': '10.0.0.5/33'}}) == '10.0.0.5/33'
+
+        lifecycle = ContainerLifecycle(mock=False)
+        monkeypatch.setattr(
+            lifecycle.templates, "ensure_template_available", lambda t: pytest.fail("unexpected")
+        )
+        spec = {'name': 'x', 'template': 'debian-12-standard', 'network': {'ip': 'garbage/33'}}
+        assert lifecycle.create_container(spec) is None
+
+    def test_gpu_auto_detection_runs_once(self, monkeypatch):
+        from tengil.services.proxmox.containers import lifecycle as lifecycle_module
+
+        probes = []
+
+        def fake_detect(self):
+            probes.append(1)
+            return [{'type': 'intel', 'model': 'UHD 630'}]
+
+        monkeypatch.setattr(lifecycle_module.SystemDetector, "_detect_gpu", fake_detect)
+        lifecycle_module._detect_host_gpus.cache_clear()
+        try:
+            specs = [{'gpu': {'passthrough': True}}, {'features': {'gpu': True}}]
+            for spec in specs:
+                ContainerLifecycle._resolve_gpu_type(spec)
+        finally:
+            lifecycle_module._detect_host_gpus.cache_clear()
+
+        assert [spec['_gpu_type'] for spec in specs] == ['intel', 'intel']
+        assert len(probes) == 1
+
+
+class TestBulkCreate:
+    """Test creating many containers through one shell invocation."""
+
+    def test_create_containers_runs_one_script(self, monkeypatch):
+        lifecycle = ContainerLifecycle(mock=False)
+        ensured = []
+        monkeypatch.setattr(
+            lifecycle.templates, "ensure_template_available", lambda t: ensured.append(t) or True
+        )
+        monkeypatch.setattr(lifecycle.templates, "resolve_template_filename", lambda t: f"{t}.tar.zst")
+        monkeypatch.setattr(lifecycle.discovery, "container_exists", lambda vmid: vmid == 150)
+        monkeypatch.setattr(lifecycle.discovery, "list_cluster_vmids", lambda: {100, 150})
+        runs = []
+
+        def fake_run(cmd, input=None, **kwargs):
+            runs.append((cmd, input))
+            return SimpleNamespace(stdout="101 0 \n102 2 storage full\n", stderr="", returncode=0)
+
+        monkeypatch.setattr(
+            "tengil.services.proxmox.containers.lifecycle.subprocess.run", fake_run
+        )
+        specs = [
+            {'name': 'a', 'template': 'debian-12-standard'},
+            {'name': 'b', 'template': 'debian-12-standard'},
+            {'name': 'c', 'vmid': 150, 'template': 'debian-12-standard'},
+        ]
+
+        assert lifecycle.create_containers(specs, storage='tank') == [101, None, 150]
+        assert ensured == ['debian-12-standard']
+        assert len(runs) == 1
+        cmd, script = runs[0]
+        assert cmd == ['bash', '-s']
+        assert 'pct create 101 local:vztmpl/debian-12-standard.tar.zst --hostname a' in script
+        assert 'pct create 102 ' in script and 'pct create 150' not in script
+        assert script.count('</dev/null') == 2
+
+    def test_explicit_batch_vmids_not_allocated_to_other_specs(self, monkeypatch):
+        lifecycle = ContainerLifecycle(mock=False)
+        monkeypatch.setattr(lifecycle.templates, "ensure_template_available", lambda t: True)
+        monkeypatch.setattr(lifecycle.templates, "resolve_template_filename", lambda t: f"{t}.tar.zst")
+        monkeypatch.setattr(lifecycle.discovery, "container_exists", lambda vmid: False)
+        monkeypatch.setattr(lifecycle.discovery, "list_cluster_vmids", lambda: set())
+        scripts = []
+
+        def fake_run(cmd, input=None, **kwargs):
+            scripts.append(input)
+            return SimpleNamespace(stdout="100 0 \n101 0 \n", stderr="", returncode=0)
+
+        monkeypatch.setattr(
+            "tengil.services.proxmox.containers.lifecycle.subprocess.run", fake_run
+        )
+        specs = [
+            {'name': 'a', 'vmid': 100, 'template': 'debian-12-standard'},
+            {'name': 'b', 'template': 'debian-12-standard'},
+        ]
+
+        assert lifecycle.create_containers(specs, storage='tank') == [100, 101]
+        assert 'pct create 101 ' in scripts[0]
+
+    def test_batch_script_failure_logged_with_exit_code(self, monkeypatch):
+        lifecycle = ContainerLifecycle(mock=False)
+        monkeypatch.setattr(lifecycle.templates, "ensure_template_available", lambda t: True)
+        monkeypatch.setattr(lifecycle.templates, "resolve_template_filename", lambda t: f"{t}.tar.zst")
+        monkeypatch.setattr(lifecycle.discovery, "container_exists", lambda vmid: False)
+        monkeypatch.setattr(lifecycle.discovery, "list_cluster_vmids", lambda: {100})
+        errors = []
+        monkeypatch.setattr(
+            "tengil.services.proxmox.containers.lifecycle.logger.error",
+            lambda msg, *args: errors.append(msg % args if args else msg),
+        )
+        monkeypatch.setattr(
+            "tengil.services.proxmox.containers.lifecycle.subprocess.run",
+            lambda cmd, input=None, **kw: SimpleNamespace(stdout="101 0 \n", stderr="killed", returncode=137),
+        )
+        specs = [
+            {'name': 'a', 'template': 'debian-12-standard'},
+            {'name': 'b', 'template': 'debian-12-standard'},
+        ]
+
+        assert lifecycle.create_containers(specs, storage='tank') == [101, None]
+        assert errors[0] == "Batch create script exited with 137: killed"
+        assert errors[1] == "Failed to create container 102: no result (batch script exit 137)"
+
+
+class TestWarmClones:
+    """Test cloning creates from a prewarmed template container."""
+
+    def test_create_clones_from_matching_warm_base(self, monkeypatch):
+        lifecycle = ContainerLifecycle(mock=False)
+        monkeypatch.setattr(lifecycle.templates, "ensure_template_available", lambda t: True)
+        monkeypatch.setattr(lifecycle.templates, "resolve_template_filename", lambda t: f"{t}.tar.zst")
+        monkeypatch.setattr(lifecycle.discovery, "container_exists", lambda vmid: False)
+        monkeypatch.setattr(lifecycle.discovery, "list_cluster_vmids", lambda: {100})
+        monkeypatch.setattr(lifecycle.discovery, "list_containers", lambda: [])
+        commands = []
+
+        def fake_run(cmd, capture_output, text, check, **kwargs):
+            commands.append(cmd)
+            return SimpleNamespace(stdout="", stderr="")
+
+        monkeypatch.setattr(
+            "tengil.services.proxmox.containers.lifecycle.subprocess.run", fake_run
+        )
+
+        assert lifecycle.prewarm_template('debian-12-standard', storage='tank') == 101
+        assert lifecycle.prewarm_template('debian-12-standard', storage='tank') == 101
+        assert [c[:2] for c in commands] == [['pct', 'create'], ['pct', 'template']]
+        commands.clear()
+
+        spec = {'name': 'web', 'vmid': 120, 'template': 'debian-12-standard', 'disk': '16G'}
+        assert lifecycle.create_container(spec, storage='tank') == 120
+
+        assert commands[0] == ['pct', 'clone', '101', '120', '--hostname', 'web']
+        assert commands[1][:3] == ['pct', 'set', '120']
+        assert commands[1][commands[1].index('--features') + 1] == 'nesting=1'
+        assert '--unprivileged' not in commands[1]
+        assert commands[2] == ['pct', 'resize', '120', 'rootfs', '16G']
+
+        commands.clear()
+        lifecycle.create_container({**spec, 'vmid': 121}, storage='local-lvm')
+        assert commands[0][:2] == ['pct', 'create']
+
+
+    def test_later_run_reuses_existing_warm_base(self, monkeypatch):
+        from tengil.services.proxmox.containers.orchestrator import ContainerOrchestrator
+
+        configs = {
+            101: {'template': 1, 'unprivileged': 1, 'rootfs': 'local-lvm:base-101-disk-0,size=2G'},
+            102: {'template': 1, 'unprivileged': 1, 'rootfs': 'tank:base-102-disk-0,size=2G'},
+        }
+        listing = [
+            {'vmid': 100, 'name': 'web', 'status': 'running'},
+            {'vmid': 101, 'name': 'tengil-warm-debian-12-standard', 'status': 'stopped'},
+            {'vmid': 102, 'name': 'tengil-warm-debian-12-standard', 'status': 'stopped'},
+        ]
+        monkeypatch.setattr(
+            "tengil.services.proxmox.containers.lifecycle.subprocess.run",
+            lambda cmd, **kwargs: pytest.fail(f"unexpected {cmd}"),
+        )
+
+        for _ in range(2):
+            orch = ContainerOrchestrator(mock=False, prewarm_templates=True)
+            monkeypatch.setattr(orch.templates, "ensure_template_available", lambda t: True)
+            monkeypatch.setattr(orch.discovery, "list_containers", lambda: listing)
+            monkeypatch.setattr(orch.discovery, "get_container_config", configs.get)
+
+            assert orch.lifecycle.prewarm_template('debian-12-standard', storage='tank') == 102
+
+    def test_privileged_warm_base_is_named_apart(self):
+        from tengil.services.proxmox.containers.lifecycle import _warm_base_name
+
+        assert _warm_base_name('debian-12-standard_12.7-1_amd64.tar.zst', False) == (
+            'tengil-warm-debian-12-standard'
+        )
+        assert _warm_base_name('debian-12-standard', True) == 'tengil-warm-debian-12-standard-priv'
+
+
+class TestApiPowerActions:
+    """Test start/stop/restart through the Proxmox REST API."""
+
+    def _lifecycle(self, monkeypatch, api_call):
+        lifecycle = ContainerLifecycle(mock=False)
+        lifecycle.discovery.api_token = 'root@pam!tg=secret'
+        monkeypatch.setattr(lifecycle.discovery, "api_call", api_call)
+        monkeypatch.setattr(
+            "tengil.services.proxmox.containers.lifecycle._run_pct",
+            lambda cmd: pytest.fail(f"unexpected pct call {cmd}"),
+        )
+        return lifecycle
+
+    def test_start_waits_for_task(self, monkeypatch):
+        calls = []
+        statuses = iter([{'status': 'running'}, {'status': 'stopped', 'exitstatus': 'OK'}])
+
+        def api_call(method, path):
+            calls.append((method, path))
+            return 'UPID:pve:1:start:' if method == 'post' else next(statuses)
+
+        monkeypatch.setattr("tengil.services.proxmox.containers.lifecycle.API_TASK_POLL", 0)
+        lifecycle = self._lifecycle(monkeypatch, api_call)
+
+        assert lifecycle.start_container(100)
+        assert calls[0] == ('post', '/nodes/localhost/lxc/100/status/start')
+        assert calls[1][1] == '/nodes/localhost/tasks/UPID%3Apve%3A1%3Astart%3A/status'
+        assert len(calls) == 3
+
+    def test_task_errors_map_to_pct_semantics(self, monkeypatch):
+        def api_call(method, path):
+            if method == 'post':
+                return 'UPID'
+            return {'status': 'stopped', 'exitstatus': 'CT 100 already running'}
+
+        lifecycle = self._lifecycle(monkeypatch, api_call)
+
+        assert lifecycle.start_container(100)
+        assert not lifecycle.restart_container(100)
+
+    def test_task_warnings_count_as_success(self, monkeypatch):
+        def api_call(method, path):
+            if method == 'post':
+                return 'UPID'
+            return {'status': 'stopped', 'exitstatus': 'WARNINGS: 1'}
+
+        lifecycle = self._lifecycle(monkeypatch, api_call)
+
+        assert lifecycle.stop_container(100)
+        assert lifecycle.restart_container(100)
+
+    def test_unreachable_api_falls_back_to_pct(self, monkeypatch):
+        import requests
+
+        def api_call(method, path):
+            raise requests.ConnectionError("refused")
+
+        lifecycle = self._lifecycle(monkeypatch, api_call)
+        ran = []
+        monkeypatch.setattr(
+            "tengil.services.proxmox.containers.lifecycle._run_pct", ran.append
+        )
+
+        assert lifecycle.stop_container(100)
+        assert ran == [['pct', 'stop', '100']]
+
+    def test_pct_stderr_decoded_only_on_failure(self, monkeypatch):
+        import subprocess
+
+        kwargs_seen = []
+
+        def fake_run(cmd, **kwargs):
+            kwargs_seen.append(kwargs)
+            raise subprocess.CalledProcessError(1, cmd, stderr=b'CT 100 already running\n')
+
+        monkeypatch.setattr(subprocess, "run", fake_run)
+        lifecycle = ContainerLifecycle(mock=False)
+
+        assert lifecycle.start_container(100)
+        assert 'text' not in kwargs_seen[0]
+        assert kwargs_seen[0]['stdout'] is subprocess.DEVNULL
+
+
+class TestVmidAllocation:
+    """Test free VMID selection."""
+
+    def _lifecycle(self, monkeypatch, vmids):
+        lifecycle = ContainerLifecycle(mock=False)
+        monkeypatch.setattr(lifecycle.discovery, "list_cluster_vmids", lambda: set(vmids))
+        return lifecycle
+
+    def test_first_gap_in_dense_range(self, monkeypatch):
+        lifecycle = self._lifecycle(monkeypatch, [103, 100, 101, 102, 105, 50])
+
+        assert lifecycle._get_next_free_vmid() == 104
+
+    def test_start_beyond_used_range(self, monkeypatch):
+        lifecycle = self._lifecycle(monkeypatch, [100, 101])
+
+        assert lifecycle._get_next_free_vmid(start=200) == 200
+
+    def test_batch_allocation_skips_pending_ids(self, monkeypatch):
+        lifecycle = self._lifecycle(monkeypatch, [100, 102, 103])
+
+        assert lifecycle.allocate_vmids(3) == [101, 104, 105]
+        assert lifecycle.allocate_vmids(0) == []
+        assert lifecycle._get_next_free_vmid(extra_used={101, 104}) == 105
+
+
+class TestConfigEdits:
+    """Test idempotent edits to /etc/pve/lxc/<vmid>.conf."""
+
+    def _config(self, tmp_path, monkeypatch, text):
+        monkeypatch.setattr("tengil.services.proxmox.lxc_config.LXC_CONFIG_DIR", tmp_path)
+        path = tmp_path / "200.conf"
+        path.write_text(text)
+        return path
+
+    def test_gpu_passthrough_not_duplicated(self, tmp_path, monkeypatch):
+        path = self._config(tmp_path, monkeypatch, "hostname: gpu\nmemory: 512")
+        lifecycle = ContainerLifecycle(mock=False)
+
+        assert lifecycle._configure_gpu_passthrough(200, 'intel')
+        assert lifecycle._configure_gpu_passthrough(200, 'intel')
+
+        assert path.read_text() == (
+            "hostname: gpu\nmemory: 512\n"
+            "lxc.cgroup2.devices.allow: c 226:* rwm\n"
+            "lxc.mount.entry: /dev/dri dev/dri none bind,optional,create=dir\n"
+        )
+
+    def test_docker_support_extends_features_line(self, tmp_path, monkeypatch):
+        path = self._config(tmp_path, monkeypatch, "features: nesting=1\nhostname: app\n")
+        lifecycle = ContainerLifecycle(mock=False)
+
+        assert lifecycle._configure_docker_support(200)
+        assert lifecycle._configure_docker_support(200)
+
+        assert path.read_text() == (
+            "features: nesting=1,keyctl=1\nhostname: app\n"
+            "lxc.apparmor.profile: unconfined\n"
+        )
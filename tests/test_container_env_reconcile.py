@@ -1,6 +1,8 @@
 import subprocess
 from types import SimpleNamespace
 
+import pytest
+
 from tengil.services.proxmox.backends.lxc import LXCBackend
 from tengil.services.proxmox.backends.oci import OCIBackend
 from tengil.services.proxmox.containers.orchestrator import ContainerOrchestrator
@@ -9,7 +11,7 @@ from tengil.services.proxmox.containers.orchestrator import ContainerOrchestrato
 def test_lxc_update_env_runs_pct_set(monkeypatch):
     calls = []
 
-    def fake_run(cmd, capture_output=True, text=True, check=True):
+    def fake_run(cmd, **kwargs):
         calls.append(cmd)
         return subprocess.CompletedProcess(cmd, 0, "", "")
 
@@ -25,7 +27,7 @@ def test_lxc_update_env_runs_pct_set(monkeypatch):
 def test_oci_update_env_runs_pct_set(monkeypatch):
     calls = []
 
-    def fake_run(cmd, capture_output=True, text=True, check=True):
+    def fake_run(cmd, **kwargs):
         calls.append(cmd)
         return subprocess.CompletedProcess(cmd, 0, "", "")
 
@@ -56,3 +58,21 @@ def test_orchestrator_apply_env_existing_container(monkeypatch):
     updates.oci = False
     assert orch._apply_env(200, lxc_spec, "ct-lxc") is True
     assert updates.lxc is True and updates.restarted is True
+
+
+def test_orchestrator_apply_env_skips_unchanged_env(monkeypatch):
+    orch = ContainerOrchestrator(mock=True)
+    orch.discovery.get_container_config = lambda vmid: {"env": "KEY=VAL\\0TZ=UTC"}
+    orch.lxc_backend.update_env = lambda vmid, env: pytest.fail("env rewritten")
+    orch.lifecycle.restart_container = lambda vmid: pytest.fail("container restarted")
+
+    assert orch._apply_env(200, {"type": "lxc", "env": {"KEY": "VAL", "TZ": "UTC"}}, "ct-lxc") is True
+
+
+def test_orchestrator_apply_env_skips_unchanged_non_string_env(monkeypatch):
+    orch = ContainerOrchestrator(mock=True)
+    orch.discovery.get_container_config = lambda vmid: {"env": "PUID=1000\\0DEBUG=True"}
+    orch.lxc_backend.update_env = lambda vmid, env: pytest.fail("env rewritten")
+    orch.lifecycle.restart_container = lambda vmid: pytest.fail("container restarted")
+
+    assert orch._apply_env(200, {"type": "lxc", "env": {"PUID": 1000, "DEBUG": True}}, "ct-lxc") is True
@@ -1,4 +1,10 @@
 """Tests for Phase 1 Task 3: Mount existing containers."""
+from types import SimpleNamespace
+
+import pytest
+
+from tengil.services.proxmox.containers.discovery import ContainerDiscovery
+from tengil.services.proxmox.containers.mounts import MountManager
 from tengil.services.proxmox.manager import ProxmoxManager
 
 
@@ -84,7 +90,7 @@ class TestMountExistingContainers:
         
         assert len(results) == 1
         vmid, success, msg = results[0]
-        assert vmid == 0  # No vmid found
+        assert vmid is None  # No vmid found
         assert success is False
         assert 'not found' in msg.lower()
 
@@ -308,3 +314,661 @@ class TestContainerMountResults:
         assert success is False
         assert len(msg) > 0
         assert 'not found' in msg.lower()
+
+
+class TestDiscoveryCache:
+    """Test request-scoped caching of the container list."""
+
+    PVESH_LXC = '[{"vmid": 100, "status": "running", "name": "jellyfin", "maxmem": 2147483648}]'
+    LIST_CMD = ["pvesh", "get", "/nodes/localhost/lxc", "--output-format", "json"]
+
+    def _fake_pct(self, monkeypatch, calls):
+        def fake_run(cmd, **kwargs):
+            calls.append(cmd)
+            return SimpleNamespace(stdout=self.PVESH_LXC, returncode=0)
+
+        monkeypatch.setattr(
+            "tengil.services.proxmox.containers.discovery.subprocess.run", fake_run
+        )
+
+    def test_list_reused_within_pass(self, monkeypatch):
+        calls = []
+        self._fake_pct(monkeypatch, calls)
+        discovery = ContainerDiscovery(mock=False)
+
+        with discovery.cached():
+            assert discovery.find_container_by_name('jellyfin') == 100
+            assert discovery.container_exists(100)
+            assert not discovery.container_exists(101)
+
+        assert calls == [self.LIST_CMD]
+
+    def test_name_index_built_once_and_dropped_on_invalidate(self, monkeypatch):
+        calls = []
+        self._fake_pct(monkeypatch, calls)
+        discovery = ContainerDiscovery(mock=False)
+
+        with discovery.cached():
+            assert discovery.find_container_by_name('jellyfin') == 100
+            assert discovery.find_container_by_name('missing') is None
+            assert discovery._name_index[1] == {'jellyfin': 100}
+            discovery.invalidate()
+            assert discovery._name_index is None
+
+    def test_name_index_from_replaced_listing_not_served(self, monkeypatch):
+        discovery = ContainerDiscovery(mock=False)
+        old_listing = [{'vmid': 100, 'name': 'jellyfin', 'status': 'running'}]
+        new_listing = old_listing + [{'vmid': 101, 'name': 'immich', 'status': 'running'}]
+        discovery._list_cache = new_listing
+        monkeypatch.setattr(discovery, "list_containers", lambda: discovery._list_cache)
+        # A worker finished indexing the listing from before another worker's create
+        discovery._name_index = (old_listing, {'jellyfin': 100})
+
+        assert discovery.find_container_by_name('immich') == 101
+        assert discovery._name_index[0] is new_listing
+
+    def test_invalidate_and_pass_exit_drop_snapshot(self, monkeypatch):
+        calls = []
+        self._fake_pct(monkeypatch, calls)
+        discovery = ContainerDiscovery(mock=False)
+
+        with discovery.cached():
+            discovery.list_containers()
+            discovery.invalidate(100)
+            discovery.list_containers()
+        discovery.list_containers()
+
+        assert len(calls) == 3
+
+    def test_list_reused_within_ttl_outside_pass(self, monkeypatch):
+        calls = []
+        self._fake_pct(monkeypatch, calls)
+        discovery = ContainerDiscovery(mock=False)
+        clock = [1000.0]
+        monkeypatch.setattr(
+            "tengil.services.proxmox.containers.discovery.time.monotonic", lambda: clock[0]
+        )
+
+        discovery.list_containers()
+        assert discovery.find_container_by_name('jellyfin') == 100
+        assert len(calls) == 1
+
+        clock[0] += 5
+        discovery.list_containers()
+        assert len(calls) == 2
+
+        discovery.invalidate(100)
+        discovery.list_containers()
+        assert len(calls) == 3
+
+    def test_config_read_reused_within_ttl(self, tmp_path, monkeypatch):
+        monkeypatch.setattr("tengil.services.proxmox.lxc_config.LXC_CONFIG_DIR", tmp_path)
+        conf = tmp_path / "100.conf"
+        conf.write_text("hostname: jellyfin\nmp0: /tank/a,mp=/a\n")
+        clock = [1000.0]
+        monkeypatch.setattr(
+            "tengil.services.proxmox.containers.discovery.time.monotonic", lambda: clock[0]
+        )
+        mounts = MountManager(mock=False)
+
+        assert list(mounts.get_container_mounts(100)) == ['mp0']
+        conf.write_text("hostname: jellyfin\n")
+        assert mounts.get_next_free_mountpoint(100) == 1
+
+        clock[0] += 5
+        assert mounts.get_next_free_mountpoint(100) == 0
+
+    def test_subsystems_share_discovery(self):
+        pm = ProxmoxManager(mock=True)
+        orchestrator = pm.containers
+
+        assert orchestrator.mounts.discovery is orchestrator.discovery
+        assert orchestrator.lifecycle.discovery is orchestrator.discovery
+        assert orchestrator.lifecycle.templates is orchestrator.templates
+
+    def test_all_containers_info_lists_once(self, monkeypatch):
+        calls = []
+        self._fake_pct(monkeypatch, calls)
+        discovery = ContainerDiscovery(mock=False)
+        monkeypatch.setattr(discovery, "get_container_config", lambda vmid: {'memory': '1024'})
+
+        infos = discovery.get_all_containers_info()
+
+        assert calls == [self.LIST_CMD]
+        assert infos == [{
+            'vmid': 100, 'name': 'jellyfin', 'status': 'running', 'template': '',
+            'memory': 1024, 'cores': 1, 'rootfs': '', 'mounts': {},
+        }]
+
+    def test_container_info_skips_existence_check(self, monkeypatch):
+        calls = []
+        self._fake_pct(monkeypatch, calls)
+        discovery = ContainerDiscovery(mock=False)
+        monkeypatch.setattr(discovery, "container_exists", lambda vmid: pytest.fail("unexpected"))
+        monkeypatch.setattr(discovery, "get_container_config", lambda vmid: {'cores': '4'})
+
+        assert discovery.get_container_info(100)['cores'] == 4
+        assert discovery.get_container_info(101) is None
+
+    def test_list_uses_api_when_token_set(self, monkeypatch):
+        calls = []
+        self._fake_pct(monkeypatch, calls)
+        discovery = ContainerDiscovery(mock=False, api_token='root@pam!tg=secret')
+        requested = []
+
+        def fake_get(session, url, data, timeout):
+            requested.append(url)
+            return SimpleNamespace(
+                raise_for_status=lambda: None,
+                json=lambda: {'data': [{'vmid': 102, 'status': 'running', 'name': 'api'}]},
+            )
+
+        monkeypatch.setattr("requests.Session.get", fake_get)
+
+        assert discovery.list_containers() == [{'vmid': 102, 'status': 'running', 'name': 'api'}]
+        assert requested == ['https://localhost:8006/api2/json/nodes/localhost/lxc']
+        assert calls == []
+        assert discovery._session.headers['Authorization'] == 'PVEAPIToken=root@pam!tg=secret'
+
+    def test_api_session_verifies_with_cluster_ca(self, tmp_path, monkeypatch):
+        from tengil.services.proxmox.containers import discovery as discovery_module
+
+        ca = tmp_path / "pve-root-ca.pem"
+        ca.write_text("cert")
+        monkeypatch.setattr(discovery_module, "PVE_ROOT_CA", str(ca))
+        monkeypatch.delenv("TG_PVE_API_CA", raising=False)
+        monkeypatch.setattr(
+            "requests.Session.get",
+            lambda session, url, data, timeout: SimpleNamespace(
+                raise_for_status=lambda: None, json=lambda: {'data': []}
+            ),
+        )
+
+        discovery = ContainerDiscovery(mock=False, api_token='root@pam!tg=secret')
+        discovery.api_call('get', '/nodes/localhost/lxc')
+        assert discovery._session.verify == str(ca)
+
+        monkeypatch.setenv("TG_PVE_API_CA", "/srv/ca.pem")
+        assert ContainerDiscovery(mock=False).api_verify == "/srv/ca.pem"
+
+        monkeypatch.delenv("TG_PVE_API_CA")
+        monkeypatch.setattr(discovery_module, "PVE_ROOT_CA", str(tmp_path / "missing.pem"))
+        assert ContainerDiscovery(mock=False).api_verify is True
+
+    def test_api_failure_falls_back_to_pvesh(self, monkeypatch):
+        import requests
+
+        calls = []
+        self._fake_pct(monkeypatch, calls)
+        discovery = ContainerDiscovery(mock=False, api_token='root@pam!tg=secret')
+
+        def failing_get(session, url, data, timeout):
+            raise requests.ConnectionError("refused")
+
+        monkeypatch.setattr("requests.Session.get", failing_get)
+
+        assert discovery.find_container_by_name('jellyfin') == 100
+        assert calls == [self.LIST_CMD]
+
+    def test_cluster_vmids_include_vms(self, monkeypatch):
+        def fake_run(cmd, **kwargs):
+            return SimpleNamespace(
+                stdout='[{"vmid": 100, "type": "lxc"}, {"vmid": "300", "type": "qemu"}]',
+                returncode=0,
+            )
+
+        monkeypatch.setattr(
+            "tengil.services.proxmox.containers.discovery.subprocess.run", fake_run
+        )
+
+        assert ContainerDiscovery(mock=False).list_cluster_vmids() == {100, 300}
+
+    def test_cluster_vmids_fall_back_to_config_scan(self, tmp_path, monkeypatch):
+        import subprocess
+
+        def fake_run(cmd, **kwargs):
+            raise subprocess.CalledProcessError(1, cmd)
+
+        monkeypatch.setattr(
+            "tengil.services.proxmox.containers.discovery.subprocess.run", fake_run
+        )
+        monkeypatch.setattr("tengil.services.proxmox.lxc_config.LXC_CONFIG_DIR", tmp_path)
+        for name in ('100.conf', '105.conf', '105.conf.tmp', 'notes.conf'):
+            (tmp_path / name).write_text('')
+
+        assert ContainerDiscovery(mock=False).list_cluster_vmids() == {100, 105}
+
+    def test_strict_existence_uses_pct_status_return_code(self, monkeypatch):
+        def fake_run(cmd, **kwargs):
+            assert cmd[:2] == ['pct', 'status'] and kwargs['check'] is False
+            return SimpleNamespace(returncode=0 if cmd[2] == '100' else 2)
+
+        monkeypatch.setattr(
+            "tengil.services.proxmox.containers.discovery.subprocess.run", fake_run
+        )
+        discovery = ContainerDiscovery(mock=False)
+
+        assert discovery.container_exists(100, strict=True)
+        assert not discovery.container_exists(101, strict=True)
+
+    def test_list_parses_pvesh_json_sorted(self, monkeypatch):
+        def fake_run(cmd, **kwargs):
+            return SimpleNamespace(
+                stdout='[{"vmid": "105", "status": "stopped", "name": "b", "lock": "backup"},'
+                       ' {"vmid": 101, "status": "running", "name": "a"}]',
+                returncode=0,
+            )
+
+        monkeypatch.setattr(
+            "tengil.services.proxmox.containers.discovery.subprocess.run", fake_run
+        )
+
+        assert ContainerDiscovery(mock=False).list_containers() == [
+            {'vmid': 101, 'status': 'running', 'name': 'a'},
+            {'vmid': 105, 'status': 'stopped', 'name': 'b'},
+        ]
+
+
+class TestMountConfigParsing:
+    """Test parsing of mpN values."""
+
+    def test_options_and_whitespace(self):
+        parse = MountManager(mock=False)._parse_mount_config
+
+        assert parse('/tank/movies,mp=/movies,ro=1') == {'volume': '/tank/movies', 'mp': '/movies', 'ro': '1'}
+        assert parse(' /tank/x , mp = /x ,noflag,backup=0') == {
+            'volume': '/tank/x', 'mp': '/x', 'ro': '0', 'backup': '0',
+        }
+        assert parse('/tank/y') == {'volume': '/tank/y', 'ro': '0'}
+
+    def test_add_mount_reads_config_once(self, monkeypatch):
+        import subprocess
+
+        manager = MountManager(mock=False)
+        reads = []
+        calls = []
+
+        def fake_config(vmid):
+            reads.append(vmid)
+            return {'hostname': 'jellyfin', 'mp0': '/tank/old,mp=/old'} if vmid == 100 else {}
+
+        monkeypatch.setattr(manager.discovery, "get_container_config", fake_config)
+        monkeypatch.setattr(manager.discovery, "container_exists", lambda vmid: pytest.fail("unexpected"))
+        monkeypatch.setattr(subprocess, "run", lambda cmd, **kw: calls.append(cmd))
+
+        assert manager.add_container_mount(100, 1, '/tank/new', '/new')
+        assert not manager.add_container_mount(101, 0, '/tank/new', '/new')
+        assert not manager.add_container_mount(100, 1, '/tank/other', '/old')
+
+        assert reads == [100, 101, 100]
+        assert calls == [['pct', 'set', '100', '-mp1', '/tank/new,mp=/new']]
+
+    def test_repeat_mount_served_from_discovery_config_cache(self, tmp_path, monkeypatch):
+        import subprocess
+
+        from tengil.services.proxmox.containers import discovery as discovery_module
+
+        monkeypatch.setattr("tengil.services.proxmox.lxc_config.LXC_CONFIG_DIR", tmp_path)
+        (tmp_path / "100.conf").write_text("hostname: x\nmp0: /tank/a,mp=/a\n")
+        reads = []
+        real_read = discovery_module.read_lxc_config
+        monkeypatch.setattr(
+            discovery_module, "read_lxc_config", lambda vmid: reads.append(vmid) or real_read(vmid)
+        )
+        monkeypatch.setattr(subprocess, "run", lambda cmd, **kw: pytest.fail(f"unexpected {cmd}"))
+        manager = MountManager(mock=False)
+
+        assert manager.add_container_mount(100, 0, '/tank/a', '/a')
+        assert manager.add_container_mount(100, 0, '/tank/a', '/a')
+        assert reads == [100]
+
+    def test_mount_removal_uses_api_but_bind_mounts_use_pct(self, monkeypatch):
+        import subprocess
+
+        manager = MountManager(mock=False)
+        manager.discovery.api_token = 'root@pam!tg=secret'
+        api_calls = []
+        pct_calls = []
+        monkeypatch.setattr(manager.discovery, "get_container_config", lambda vmid: {'hostname': 'x'})
+        monkeypatch.setattr(
+            manager.discovery, "api_call", lambda method, path, data=None: api_calls.append((method, path, data))
+        )
+        monkeypatch.setattr(subprocess, "run", lambda cmd, **kw: pct_calls.append(cmd))
+
+        # API tokens may not add bind mounts, only root@pam through pct may
+        assert manager.add_container_mount(100, 2, '/tank/a', '/a', readonly=True)
+        assert manager.remove_container_mount(100, 0)
+
+        assert pct_calls == [['pct', 'set', '100', '-mp2', '/tank/a,mp=/a,ro=1']]
+        assert api_calls == [('put', '/nodes/localhost/lxc/100/config', {'delete': 'mp0'})]
+
+
+class TestBulkMounts:
+    """Test adding many mounts across containers."""
+
+    def test_one_pct_set_per_container(self, monkeypatch):
+        import subprocess
+
+        mounts = MountManager(mock=False)
+        reads = []
+        calls = []
+        configs = {
+            100: {'hostname': 'a', 'mp0': '/tank/a,mp=/a'},
+            101: {'hostname': 'b', 'mp0': '/tank/other,mp=/b'},
+        }
+        monkeypatch.setattr(
+            mounts.discovery, "get_container_config", lambda vmid: reads.append(vmid) or configs[vmid]
+        )
+        monkeypatch.setattr(subprocess, "run", lambda cmd, **kw: calls.append(cmd))
+        requests = [
+            {'vmid': 100, 'mount_point': 0, 'host_path': '/tank/a', 'container_path': '/a'},
+            {'vmid': 101, 'mount_point': 1, 'host_path': '/tank/bad', 'container_path': '/b'},
+            {'vmid': 100, 'mount_point': 1, 'host_path': '/tank/c', 'container_path': '/c'},
+            {'vmid': 100, 'mount_point': 2, 'host_path': '/tank/d', 'container_path': '/d', 'readonly': True},
+            {'vmid': 100, 'mount_point': 3, 'host_path': '/tank/e', 'container_path': '/c'},
+        ]
+
+        assert mounts.add_container_mounts(requests) == [True, False, True, True, False]
+        assert sorted(reads) == [100, 101]
+        assert calls == [
+            ['pct', 'set', '100', '-mp1', '/tank/c,mp=/c', '-mp2', '/tank/d,mp=/d,ro=1'],
+        ]
+
+
+class TestMountSlotAssignment:
+    """Test pass-local mount slot bookkeeping."""
+
+    def test_slots_assigned_from_one_config_read(self, monkeypatch):
+        from tengil.services.proxmox.containers.orchestrator import ContainerOrchestrator
+
+        orch = ContainerOrchestrator(mock=False)
+        config_reads = []
+        added = []
+
+        def fake_config(vmid):
+            config_reads.append(vmid)
+            return {'hostname': 'jellyfin', 'mp0': '/tank/old,mp=/old'}
+
+        def fake_add(vmid, mount_point, host_path, container_path, readonly=False,
+                     container_name=None, existing_mounts=None):
+            assert existing_mounts is not None
+            added.append(mount_point)
+            return True
+
+        monkeypatch.setattr(orch.discovery, "container_exists", lambda vmid: True)
+        monkeypatch.setattr(orch.discovery, "get_container_info", lambda vmid: {'name': 'jellyfin'})
+        monkeypatch.setattr(orch.discovery, "get_container_config", fake_config)
+        monkeypatch.setattr(orch.mounts, "get_container_mounts", lambda vmid: {})
+        monkeypatch.setattr(orch.mounts, "add_container_mount", fake_add)
+        monkeypatch.setattr(
+            orch.mounts, "add_container_mounts_batch",
+            lambda vmid, mounts, existing_mounts=None: [fake_add(vmid, existing_mounts=existing_mounts, **m)
+                                                        for m in mounts],
+        )
+
+        dataset_config = {'containers': [{
+            'vmid': 100,
+            'mount': '/media',
+            'mounts': [
+                {'source': '/tank/a', 'target': '/a'},
+                {'source': '/tank/b', 'target': '/b'},
+            ],
+        }]}
+
+        results = orch.setup_container_mounts('media', dataset_config, 'tank')
+
+        assert results == [(100, True, 'mounted')]
+        assert added == [1, 2, 3]
+        assert config_reads == [100]
+
+    def test_additional_mounts_written_in_one_pct_set(self, monkeypatch):
+        import subprocess
+
+        from tengil.services.proxmox.containers.orchestrator import ContainerOrchestrator
+
+        orch = ContainerOrchestrator(mock=False)
+        calls = []
+        monkeypatch.setattr(orch.discovery, "container_exists", lambda vmid: True)
+        monkeypatch.setattr(orch.discovery, "get_container_info", lambda vmid: {'name': 'jellyfin'})
+        monkeypatch.setattr(
+            orch.discovery, "get_container_config", lambda vmid: {'hostname': 'jellyfin'}
+        )
+        monkeypatch.setattr(subprocess, "run", lambda cmd, **kw: calls.append(cmd))
+
+        dataset_config = {'containers': [{
+            'vmid': 100,
+            'mount': '/media',
+            'mounts': [
+                {'source': '/tank/a', 'target': '/a'},
+                {'source': '/tank/b', 'target': '/b', 'readonly': True},
+                {'source': '/tank/a', 'target': '/a'},
+            ],
+        }]}
+
+        assert orch.setup_container_mounts('media', dataset_config, 'tank') == [(100, True, 'mounted')]
+        assert calls == [
+            ['pct', 'set', '100', '-mp0', '/tank/media,mp=/media'],
+            ['pct', 'set', '100', '-mp1', '/tank/a,mp=/a', '-mp2', '/tank/b,mp=/b,ro=1'],
+        ]
+
+    def test_invalid_specs_rejected_before_any_container_work(self, monkeypatch):
+        from tengil.services.proxmox.containers.orchestrator import ContainerOrchestrator
+
+        orch = ContainerOrchestrator(mock=False)
+        monkeypatch.setattr(orch.discovery, "container_exists", lambda vmid: pytest.fail("looked up"))
+        monkeypatch.setattr(orch.oci_backend, "pull_images", lambda requests: pytest.fail("pulled"))
+        monkeypatch.setattr(orch.oci_backend, "pull_image", lambda image, tag: pytest.fail("pulled"))
+
+        dataset_config = {'containers': [
+            42,
+            {'name': 'web', 'auto_create': True, 'type': 'oci'},
+            {'name': 'db', 'auto_create': True},
+        ]}
+
+        assert orch.setup_container_mounts('media', dataset_config, 'tank') == [
+            (None, False, 'invalid spec format'),
+            (None, False, 'missing template/image'),
+            (None, False, 'missing template/image'),
+        ]
+
+    def test_templates_prefetched_only_for_containers_to_create(self, monkeypatch):
+        from tengil.services.proxmox.containers.mounts import MountResult
+        from tengil.services.proxmox.containers.orchestrator import ContainerOrchestrator
+
+        orch = ContainerOrchestrator(mock=True)
+        prefetched = []
+        monkeypatch.setattr(orch.discovery, "container_exists", lambda vmid: vmid == 100)
+        monkeypatch.setattr(orch.discovery, "find_container_by_name", lambda name: None)
+        monkeypatch.setattr(orch.templates, "ensure_templates_available", prefetched.append)
+        monkeypatch.setattr(
+            orch, "_setup_one_container",
+            lambda spec, host_path, used_slots: MountResult(spec.vmid, True, "mounted"),
+        )
+
+        dataset_config = {'containers': [
+            {'vmid': 100, 'auto_create': True, 'template': 'debian-12-standard'},
+            {'vmid': 101, 'auto_create': True, 'template': 'ubuntu-24.04-standard'},
+            {'vmid': 102, 'auto_create': True, 'template': 'alpine-3.20-default'},
+            {'vmid': 103, 'auto_create': True, 'type': 'oci', 'image': 'nginx', 'template': 'x'},
+        ]}
+        monkeypatch.setattr(orch.oci_backend, "pull_images", lambda requests: None)
+
+        orch.setup_container_mounts('media', dataset_config, 'tank')
+
+        assert prefetched == [['ubuntu-24.04-standard', 'alpine-3.20-default']]
+
+    def test_shared_templates_prewarmed_when_enabled(self, monkeypatch):
+        from tengil.services.proxmox.containers.mounts import MountResult
+        from tengil.services.proxmox.containers.orchestrator import ContainerOrchestrator
+
+        monkeypatch.delenv("TG_PREWARM_TEMPLATES", raising=False)
+        assert not ContainerOrchestrator(mock=True).prewarm_templates
+        monkeypatch.setenv("TG_PREWARM_TEMPLATES", "1")
+        orch = ContainerOrchestrator(mock=True)
+        prewarmed = []
+        monkeypatch.setattr(orch.discovery, "container_exists", lambda vmid: False)
+        monkeypatch.setattr(orch.discovery, "find_container_by_name", lambda name: None)
+        monkeypatch.setattr(orch.templates, "ensure_templates_available", lambda templates: None)
+        monkeypatch.setattr(
+            orch.lifecycle, "prewarm_template",
+            lambda template, storage, privileged: prewarmed.append((template, storage, privileged)),
+        )
+        monkeypatch.setattr(
+            orch, "_setup_one_container",
+            lambda spec, host_path, used_slots: MountResult(spec.vmid, True, "mounted"),
+        )
+
+        dataset_config = {'containers': [
+            {'vmid': 100, 'auto_create': True, 'template': 'debian-12-standard'},
+            {'vmid': 101, 'auto_create': True, 'template': 'debian-12-standard'},
+            {'vmid': 102, 'auto_create': True, 'template': 'debian-12-standard', 'privileged': True},
+            {'vmid': 103, 'auto_create': True, 'template': 'alpine-3.20-default'},
+        ]}
+
+        orch.setup_container_mounts('media', dataset_config, 'tank')
+
+        assert prewarmed == [('debian-12-standard', 'tank', False)]
+
+    def test_containers_processed_concurrently_in_order(self, monkeypatch):
+        import threading
+
+        from tengil.services.proxmox.containers.orchestrator import ContainerOrchestrator
+
+        orch = ContainerOrchestrator(mock=False)
+        both_started = threading.Barrier(2, timeout=5)
+        names = {100: 'jellyfin', 101: 'immich'}
+
+        def fake_add(vmid, mount_point, host_path, container_path, readonly=False,
+                     container_name=None, existing_mounts=None):
+            both_started.wait()  # deadlocks (then times out) if run sequentially
+            return vmid == 100
+
+        monkeypatch.setattr(orch.discovery, "container_exists", lambda vmid: True)
+        monkeypatch.setattr(orch.discovery, "get_container_info", lambda vmid: {'name': names[vmid]})
+        monkeypatch.setattr(orch.discovery, "get_container_config", lambda vmid: {'hostname': names[vmid]})
+        monkeypatch.setattr(orch.mounts, "get_container_mounts", lambda vmid: {})
+        monkeypatch.setattr(orch.mounts, "add_container_mount", fake_add)
+
+        dataset_config = {'containers': [{'vmid': 100, 'mount': '/media'}, {'vmid': 101, 'mount': '/media'}]}
+
+        results = orch.setup_container_mounts('media', dataset_config, 'tank')
+
+        assert results == [(100, True, 'mounted'), (101, False, 'mount failed')]
+
+
+class TestContainerAddress:
+    """Test resolving a container's IP for the access summary."""
+
+    def test_static_ip_read_from_config(self, monkeypatch):
+        import subprocess
+
+        from tengil.services.proxmox.containers.orchestrator import ContainerOrchestrator
+
+        orch = ContainerOrchestrator(mock=False)
+        monkeypatch.setattr(
+            orch.discovery, "get_container_config",
+            lambda vmid: {'net0': 'name=eth0,bridge=vmbr0,ip=192.168.1.50/24,gw=192.168.1.1'},
+        )
+        monkeypatch.setattr(subprocess, "run", lambda *a, **kw: pytest.fail("unexpected process"))
+
+        assert orch._container_ip(100) == '192.168.1.50'
+
+    def test_dhcp_ip_found_by_mac_in_neighbour_table(self, monkeypatch):
+        import subprocess
+        from types import SimpleNamespace
+
+        from tengil.services.proxmox.containers.orchestrator import ContainerOrchestrator
+
+        orch = ContainerOrchestrator(mock=False)
+        commands = []
+        neighbours = (
+            b'[{"dst":"192.168.1.7","lladdr":"aa:bb:cc:00:00:01"},'
+            b'{"dst":"192.168.1.9","lladdr":"bc:24:11:5e:aa:01"}]'
+        )
+
+        def fake_run(cmd, **kwargs):
+            commands.append(cmd[0])
+            return SimpleNamespace(stdout=neighbours, returncode=0)
+
+        monkeypatch.setattr(
+            orch.discovery, "get_container_config",
+            lambda vmid: {'net0': 'name=eth0,bridge=vmbr0,hwaddr=BC:24:11:5E:AA:01,ip=dhcp'},
+        )
+        monkeypatch.setattr(subprocess, "run", fake_run)
+
+        assert orch._container_ip(100) == '192.168.1.9'
+        assert commands == ['ip']
+
+    def test_access_info_lists_urls_for_installed_services(self, monkeypatch):
+        from tengil.services.proxmox.containers import orchestrator as orch_module
+
+        orch = orch_module.ContainerOrchestrator(mock=False)
+        lines = []
+        monkeypatch.setattr(orch, "_container_ip", lambda vmid: '10.0.0.5')
+        monkeypatch.setattr(orch_module.logger, "info", lambda msg, *args: lines.append(msg % args))
+
+        orch._display_container_access_info(100, 'media', ['docker', 'tteck/jellyfin', 'pihole'])
+
+        urls = [line for line in lines if 'http://' in line]
+        assert urls == ["   Jellyfin: http://10.0.0.5:8096", "   Pi-hole: http://10.0.0.5/admin"]
+
+
+    def test_access_info_shown_with_dict_tasks(self, monkeypatch):
+        from tengil.services.proxmox.containers import orchestrator as orch_module
+
+        orch = orch_module.ContainerOrchestrator(mock=False)
+        lines = []
+        monkeypatch.setattr(orch, "_container_ip", lambda vmid: '10.0.0.5')
+        monkeypatch.setattr(orch_module.logger, "info", lambda msg, *args: lines.append(msg % args))
+
+        orch._display_container_access_info(
+            100, 'media', [{'type': 'script', 'script': 'echo hi'}, 'portainer']
+        )
+
+        assert "   IP Address: 10.0.0.5" in lines
+        assert [line for line in lines if 'http://' in line] == ["   Portainer: http://10.0.0.5:9000"]
+
+class TestContainerMountSpec:
+    """Test parsing entries of a dataset's containers: list."""
+
+    def test_string_form(self):
+        from tengil.services.proxmox.containers.orchestrator import ContainerMountSpec
+
+        spec = ContainerMountSpec.from_raw('jellyfin:/media:ro', 'media')
+
+        assert (spec.vmid, spec.name, spec.mount_path, spec.readonly) == (None, 'jellyfin', '/media', True)
+        assert ContainerMountSpec.from_raw('jellyfin', 'media').mount_path == '/media'
+
+    def test_dict_form_copies_raw_spec(self):
+        from tengil.services.proxmox.containers.orchestrator import ContainerMountSpec
+
+        raw = {'vmid': 100, 'auto_create': True, 'type': 'oci', 'image': 'nginx', 'pool': 'rpool'}
+        spec = ContainerMountSpec.from_raw(raw, 'www')
+
+        assert (spec.vmid, spec.mount_path, spec.auto_create, spec.storage) == (100, '/www', True, 'rpool')
+        spec.raw['template'] = 'nginx.tar'
+        assert 'template' not in raw
+
+    def test_string_form_without_mount_path(self):
+        from tengil.services.proxmox.containers.orchestrator import ContainerMountSpec
+
+        spec = ContainerMountSpec.from_raw('jellyfin:/media', 'media')
+
+        assert (spec.name, spec.mount_path, spec.readonly) == ('jellyfin', '/media', False)
+
+    def test_image_refs_split_into_name_and_tag(self):
+        from tengil.services.proxmox.containers.orchestrator import ContainerOrchestrator
+
+        split = ContainerOrchestrator._split_image_ref
+        assert split('nginx') == ('nginx', 'latest')
+        assert split('nginx:1.27') == ('nginx', '1.27')
+        assert split('ghcr.io/home-assistant/home-assistant:stable') == (
+            'ghcr.io/home-assistant/home-assistant', 'stable'
+        )
+        assert split('registry:5000/app') == ('registry:5000/app', 'latest')
+        assert split('registry:5000/app:v2') == ('registry:5000/app', 'v2')
+
+    def test_other_types_rejected(self):
+        from tengil.services.proxmox.containers.orchestrator import ContainerMountSpec
+
+        assert ContainerMountSpec.from_raw(42, 'media') is None
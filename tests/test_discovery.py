@@ -1,5 +1,6 @@
 """Test system discovery and recommendations."""
 from tengil.discovery import PoolRecommender, SystemDiscovery
+from tengil.discovery.container_discovery import ProxmoxDiscovery
 from tengil.discovery.datasets import DatasetDiscovery
 from tengil.models.disk import DiskType
 from tengil.services.proxmox.manager import ProxmoxManager
@@ -307,3 +308,20 @@ def test_dataset_discovery_builds_config(monkeypatch):
     backups = result['backups']
     assert backups['profile'] == 'backups'
     assert backups['shares']['nfs'] is True
+
+
+def test_pct_list_parsing_handles_lock_column(monkeypatch):
+    """A held lock adds a column; the name is still the last field."""
+    output = (
+        "VMID       Status     Lock         Name\n"
+        "100        running                 jellyfin\n"
+        "101        stopped    backup       nextcloud\n"
+        "\n"
+    )
+    discovery = ProxmoxDiscovery()
+    monkeypatch.setattr(discovery, "_run_command", lambda cmd: (True, output))
+
+    assert discovery.get_existing_containers() == [
+        {'vmid': '100', 'status': 'running', 'name': 'jellyfin'},
+        {'vmid': '101', 'status': 'stopped', 'name': 'nextcloud'},
+    ]
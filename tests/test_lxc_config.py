@@ -0,0 +1,70 @@
+"""Tests for LXC config file parsing."""
+from tengil.services.proxmox.lxc_config import (
+    container_env,
+    mount_slots,
+    parse_lxc_config,
+    read_lxc_config,
+)
+
+CONFIG = """# managed by tengil
+arch: amd64
+hostname: jellyfin
+mp0: /tank/media,mp=/media,ro=1
+net0: name=eth0,bridge=vmbr0,ip=dhcp
+
+[before-upgrade]
+hostname: jellyfin-old
+mp1: /tank/old,mp=/old
+"""
+
+
+def test_parse_lxc_config_keys_and_values():
+    config = parse_lxc_config(CONFIG)
+
+    assert config['arch'] == 'amd64'
+    assert config['mp0'] == '/tank/media,mp=/media,ro=1'
+    assert config['net0'] == 'name=eth0,bridge=vmbr0,ip=dhcp'
+
+
+def test_parse_lxc_config_ignores_snapshot_sections():
+    config = parse_lxc_config(CONFIG)
+
+    assert config['hostname'] == 'jellyfin'
+    assert 'mp1' not in config
+
+
+def test_mount_slots_matches_only_mp_keys():
+    config = {'mp0': '/a,mp=/a', 'mp12': '/b,mp=/b', 'mp0-backup': 'x', 'memory': '512'}
+
+    assert mount_slots(config) == {0, 12}
+
+
+def test_read_lxc_config_stops_before_snapshot_sections(tmp_path, monkeypatch):
+    monkeypatch.setattr("tengil.services.proxmox.lxc_config.LXC_CONFIG_DIR", tmp_path)
+    (tmp_path / "100.conf").write_text(CONFIG)
+    lines_read = []
+
+    class RecordingLines:
+        def __init__(self, lines):
+            self.lines = lines
+
+        def __iter__(self):
+            for line in self.lines:
+                lines_read.append(line)
+                yield line
+
+    config = parse_lxc_config(RecordingLines(CONFIG.splitlines(keepends=True)))
+
+    assert read_lxc_config(100) == config
+    assert 'hostname: jellyfin-old\n' not in lines_read
+
+
+def test_container_env_reads_env_option_and_raw_keys():
+    config = {
+        'env': 'TZ=Europe/Stockholm\\0OPTS=a=b',
+        'lxc.environment.PUID': '1000',
+        'hostname': 'jellyfin',
+    }
+
+    assert container_env(config) == {'TZ': 'Europe/Stockholm', 'OPTS': 'a=b', 'PUID': '1000'}
+    assert container_env({}) == {}
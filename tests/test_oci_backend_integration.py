@@ -1,5 +1,7 @@
 """Integration-style tests for OCIBackend command generation (mocked subprocess)."""
-from pathlib import Path
+import os
+import threading
+import time
 from unittest.mock import MagicMock, patch
 
 from tengil.services.proxmox.backends.oci import OCIBackend
@@ -26,25 +28,26 @@ def test_create_container_with_env_mount_gpu_sequence():
     }
 
     # Mock to force pull and skip mp detection parsing
-    with patch.object(Path, "exists", return_value=False), \
+    with patch.object(OCIBackend, "_template_index", return_value=set()), \
          patch.object(backend, "_get_next_mp_slot", return_value=0), \
          patch("subprocess.run") as mock_run:
 
-        # side effects: skopeo copy, pct create, pct set (mp), pct set (gpu)
+        # side effects: skopeo inspect, skopeo copy, pct create, pct set (gpu + mp)
         mock_run.side_effect = [
+            _completed(),  # skopeo inspect
             _completed(),  # skopeo copy
             _completed(),  # pct create
-            _completed(),  # pct set mp
-            _completed(),  # pct set gpu
+            _completed(),  # pct set gpu + mp
         ]
 
         vmid = backend.create_container(spec, storage="tank")
         assert vmid == 1000
 
         cmds = [call[0][0] for call in mock_run.call_args_list]
-        
-        # First call: skopeo copy
-        assert cmds[0][0] == "skopeo"
+
+        # First calls: digest lookup, then skopeo copy
+        assert [cmd[:2] for cmd in cmds[:2]] == [["skopeo", "inspect"], ["skopeo", "copy"]]
+        cmds = cmds[1:]
         # Second call: pct create with env flags, features, and network gateway/firewall
         create_cmd = cmds[1]
         assert create_cmd[:2] == ["pct", "create"]
@@ -52,13 +55,13 @@ def test_create_container_with_env_mount_gpu_sequence():
         net_arg = next(arg for arg in create_cmd if arg.startswith("name=eth0"))
         assert "gw=192.168.1.1" in net_arg.lower()
         assert "firewall=1" in net_arg
-        # Third call: pct set gpu devices (GPU is configured before mounts)
-        assert cmds[2][:3] == ["pct", "set", "1000"]
-        assert "/dev/dri/card0" in cmds[2] or any("--dev" in part for part in cmds[2])
-        # Fourth call: pct set --mp0 (mount point)
-        assert cmds[3][:3] == ["pct", "set", "1000"]
-        assert any("--mp" in part for part in cmds[3]), f"Expected --mp in command: {cmds[3]}"
-        assert any("/tank/data" in part for part in cmds[3]), f"Expected /tank/data in command: {cmds[3]}"
+        # Third and last call: one pct set with gpu devices and the mount point
+        assert len(cmds) == 3
+        set_cmd = cmds[2]
+        assert set_cmd[:3] == ["pct", "set", "1000"]
+        assert "/dev/dri/card0,mode=0666" in set_cmd
+        mp_idx = set_cmd.index("--mp0")
+        assert set_cmd[mp_idx + 1] == "/tank/data,mp=/data,ro=1"
 
 
 def test_create_container_missing_image_returns_none():
@@ -74,7 +77,7 @@ def test_pull_failure_returns_none():
     backend = OCIBackend(mock=False)
     spec = {"oci": {"image": "bad/image", "tag": "latest"}}
 
-    with patch.object(Path, "exists", return_value=False), \
+    with patch.object(OCIBackend, "_template_index", return_value=set()), \
          patch("subprocess.run") as mock_run:
         # pull_image calls subprocess.run with check=True, so it raises CalledProcessError on failure
         from subprocess import CalledProcessError
@@ -92,7 +95,7 @@ def test_invalid_mount_spec_returns_none():
     }
 
     with patch("subprocess.run") as mock_run, \
-         patch.object(Path, "exists", return_value=False):
+         patch.object(OCIBackend, "_template_index", return_value=set()):
         vmid = backend.create_container(spec)
 
     assert vmid is None
@@ -110,17 +113,234 @@ def test_multi_container_specs_called_individually():
         {"oci": {"image": "ghcr.io/immich-app/immich-machine-learning", "tag": "latest"}, "vmid": 3004},
     ]
 
-    with patch.object(Path, "exists", return_value=False), \
+    with patch.object(OCIBackend, "_template_index", return_value=set()), \
          patch.object(backend, "_get_next_mp_slot", return_value=0), \
          patch("subprocess.run") as mock_run:
 
-        # one skopeo copy + one pct create per spec
-        mock_run.side_effect = [_completed(), _completed()] * len(specs)
+        # one skopeo inspect + copy and one pct create per spec
+        mock_run.side_effect = [_completed(), _completed(), _completed()] * len(specs)
 
         for spec in specs:
             vmid = backend.create_container(spec, storage="tank")
             assert vmid == spec["vmid"]
 
         # ensure we invoked skopeo for each image
-        skopeo_calls = [call for call in mock_run.call_args_list if call[0][0][0] == "skopeo"]
+        skopeo_calls = [call for call in mock_run.call_args_list if call[0][0][:2] == ["skopeo", "copy"]]
         assert len(skopeo_calls) == len(specs)
+
+
+def test_configure_gpu_uses_vendor_device_flags():
+    backend = OCIBackend(mock=False)
+    with patch("subprocess.run") as mock_run:
+        mock_run.return_value = _completed()
+        assert backend.configure_gpu(1000, "nvidia") is True
+        assert backend.configure_gpu(1000) is True
+
+    nvidia_cmd, default_cmd = (call[0][0] for call in mock_run.call_args_list)
+    assert nvidia_cmd[:3] == ["pct", "set", "1000"]
+    assert "/dev/nvidia0,mode=0666" in nvidia_cmd
+    assert "/dev/dri/card0,mode=0666" in default_cmd
+
+
+def test_configure_gpu_other_types_use_dri_devices():
+    backend = OCIBackend(mock=False)
+    with patch("subprocess.run") as mock_run:
+        mock_run.return_value = _completed()
+        assert backend.configure_gpu(1000, "Intel") is True
+        assert backend.configure_gpu(1000, "voodoo") is True
+        assert backend.configure_gpu(1000, "NVIDIA") is True
+
+    intel_cmd, unknown_cmd, nvidia_cmd = (call[0][0] for call in mock_run.call_args_list)
+    assert "/dev/dri/card0,mode=0666" in intel_cmd
+    assert unknown_cmd == intel_cmd
+    assert "/dev/nvidia0,mode=0666" in nvidia_cmd
+
+
+def test_plan_mode_records_commands_and_emits_script():
+    backend = OCIBackend(mock=False)
+    backend.plan = []
+    spec = {
+        "oci": {"image": "nginx", "tag": "alpine"},
+        "vmid": 1000,
+        "mounts": [{"source": "/tank/data", "target": "/data"}],
+    }
+
+    with patch.object(OCIBackend, "_template_index", return_value=set()), \
+         patch("subprocess.run") as mock_run:
+        assert backend.create_container(spec, storage="tank") == 1000
+        assert backend.start_container(1000) is True
+    mock_run.assert_not_called()
+
+    assert [argv[:2] for argv in backend.plan] == [
+        ["skopeo", "copy"], ["pct", "create"], ["pct", "set"], ["pct", "start"]
+    ]
+    script = backend.emit_script()
+    lines = script.splitlines()
+    assert lines[:2] == ["#!/usr/bin/env bash", "set -e"]
+    assert lines[3].startswith("skopeo copy") and lines[3].endswith(" &")
+    # pulls are awaited before the first pct command
+    assert lines.index(next(line for line in lines if line.startswith("for pid"))) < \
+        lines.index(next(line for line in lines if line.startswith("pct create")))
+    assert "pct start 1000" in lines
+
+
+def test_pull_images_runs_each_pull_and_keys_results():
+    backend = OCIBackend(mock=False)
+    requests = [("redis", "alpine", None), ("ghcr.io/immich-app/immich-server", "latest", None)]
+
+    with patch("subprocess.run") as mock_run:
+        mock_run.return_value = _completed()
+        results = backend.pull_images(requests)
+
+    assert results == {
+        "redis:alpine": "local:vztmpl/redis-alpine.tar",
+        "ghcr.io/immich-app/immich-server:latest": "local:vztmpl/immich-server-latest.tar",
+    }
+    sources = sorted(
+        call[0][0][2] for call in mock_run.call_args_list if call[0][0][1] == "copy"
+    )
+    assert sources == [
+        "docker://docker.io/redis:alpine",
+        "docker://ghcr.io/immich-app/immich-server:latest",
+    ]
+
+
+def test_pull_image_skips_copy_when_digest_unchanged(tmp_path):
+    backend = OCIBackend(mock=False)
+    backend.template_dir = tmp_path
+    (tmp_path / "nginx-alpine.tar").write_bytes(b"archive")
+    (tmp_path / "nginx-alpine.tar.digest").write_text("sha256:abc\n")
+    os.utime(tmp_path / "nginx-alpine.tar.digest", (0, 0))  # last verified long ago
+
+    with patch("subprocess.run") as mock_run:
+        mock_run.return_value = _completed(stdout="sha256:abc\n")
+        assert backend.pull_image("nginx", "alpine") == "local:vztmpl/nginx-alpine.tar"
+
+    cmds = [call[0][0] for call in mock_run.call_args_list]
+    assert [cmd[:2] for cmd in cmds] == [["skopeo", "inspect"]]
+
+
+def test_pull_image_refreshes_archive_when_digest_changed(tmp_path):
+    backend = OCIBackend(mock=False)
+    backend.template_dir = tmp_path
+    (tmp_path / "nginx-alpine.tar").write_bytes(b"archive")
+    (tmp_path / "nginx-alpine.tar.digest").write_text("sha256:old\n")
+    os.utime(tmp_path / "nginx-alpine.tar.digest", (0, 0))  # last verified long ago
+
+    with patch("subprocess.run") as mock_run:
+        mock_run.return_value = _completed(stdout="sha256:new\n")
+        assert backend.pull_image("nginx", "alpine") == "local:vztmpl/nginx-alpine.tar"
+
+    cmds = [call[0][0] for call in mock_run.call_args_list]
+    assert [cmd[:2] for cmd in cmds] == [["skopeo", "inspect"], ["skopeo", "copy"]]
+    assert (tmp_path / "nginx-alpine.tar.digest").read_text().strip() == "sha256:new"
+
+
+def test_recently_verified_archive_skips_registry(tmp_path):
+    backend = OCIBackend(mock=False)
+    backend.template_dir = tmp_path
+    (tmp_path / "nginx-alpine.tar").write_bytes(b"archive")
+    (tmp_path / "nginx-alpine.tar.digest").write_text("sha256:abc\n")
+
+    with patch("subprocess.run") as mock_run:
+        assert backend.pull_image("nginx", "alpine") == "local:vztmpl/nginx-alpine.tar"
+
+    mock_run.assert_not_called()
+
+
+def test_repeated_pull_in_session_does_not_fork_skopeo(tmp_path):
+    backend = OCIBackend(mock=False)
+    backend.template_dir = tmp_path
+
+    def fake_run(cmd, **kwargs):
+        (tmp_path / "nginx-alpine.tar").write_bytes(b"archive")
+        return _completed()
+
+    with patch("subprocess.run", side_effect=fake_run) as mock_run:
+        assert backend.pull_image("nginx", "alpine") == "local:vztmpl/nginx-alpine.tar"
+        assert backend.pull_image("nginx", "alpine") == "local:vztmpl/nginx-alpine.tar"
+
+    assert [call[0][0][1] for call in mock_run.call_args_list] == ["inspect", "copy"]
+
+
+def test_first_pull_records_digest_so_next_run_skips_copy(tmp_path):
+    def fake_run(cmd, **kwargs):
+        if cmd[1] == "copy":
+            (tmp_path / "nginx-alpine.tar").write_bytes(b"archive")
+        return _completed(stdout="sha256:abc\n")
+
+    with patch("subprocess.run", side_effect=fake_run) as mock_run:
+        for _ in range(2):
+            backend = OCIBackend(mock=False)  # a fresh run: no session state
+            backend.template_dir = tmp_path
+            assert backend.pull_image("nginx", "alpine") == "local:vztmpl/nginx-alpine.tar"
+            os.utime(tmp_path / "nginx-alpine.tar.digest", (0, 0))  # force a registry recheck
+
+    assert [call[0][0][1] for call in mock_run.call_args_list] == ["inspect", "copy", "inspect"]
+    assert (tmp_path / "nginx-alpine.tar.digest").read_text().strip() == "sha256:abc"
+
+
+def test_container_exists_checks_config_file_without_pct(tmp_path, monkeypatch):
+    monkeypatch.setattr("tengil.services.proxmox.lxc_config.LXC_CONFIG_DIR", tmp_path)
+    (tmp_path / "200.conf").write_text("hostname: app\n")
+    backend = OCIBackend(mock=False)
+
+    with patch("subprocess.run") as mock_run:
+        assert backend.container_exists(200)
+        assert not backend.container_exists(201)
+    mock_run.assert_not_called()
+
+
+def test_container_exists_strict_uses_pct_status():
+    backend = OCIBackend(mock=False)
+
+    with patch("subprocess.run", return_value=_completed()) as mock_run:
+        assert backend.container_exists(200, strict=True)
+    assert mock_run.call_args[0][0] == ["pct", "status", "200"]
+
+
+def test_container_exists_strict_reads_return_code():
+    backend = OCIBackend(mock=False)
+
+    with patch("subprocess.run", return_value=MagicMock(returncode=2)) as mock_run:
+        assert not backend.container_exists(201, strict=True)
+    assert mock_run.call_args[1]["check"] is False
+
+
+def test_template_index_lists_directory_once(tmp_path):
+    (tmp_path / "nginx-alpine.tar").write_bytes(b"archive")
+    backend = OCIBackend(mock=False)
+    backend.template_dir = tmp_path
+
+    with patch("os.listdir", wraps=os.listdir) as listdir:
+        assert "nginx-alpine.tar" in backend._template_index()
+        assert "redis-7.tar" not in backend._template_index()
+
+    assert listdir.call_count == 1
+
+
+def test_concurrent_pulls_of_same_image_share_one_skopeo_copy(tmp_path):
+    backend = OCIBackend(mock=False)
+    backend.template_dir = tmp_path
+    started = threading.Event()
+    release = threading.Event()
+
+    def fake_run(cmd, **kwargs):
+        started.set()
+        release.wait(5)
+        (tmp_path / "nginx-alpine.tar").write_bytes(b"archive")
+        return _completed()
+
+    with patch("subprocess.run", side_effect=fake_run) as mock_run:
+        first = threading.Thread(target=backend.pull_image, args=("nginx", "alpine"))
+        first.start()
+        started.wait(5)
+        waiter = threading.Thread(target=backend._pull_image, args=("nginx", "alpine", None))
+        waiter.start()
+        time.sleep(0.05)  # let the waiter block on the in-flight pull
+        release.set()
+        first.join(5)
+        waiter.join(5)
+
+    assert [call[0][0][1] for call in mock_run.call_args_list] == ["inspect", "copy"]
+    assert backend._inflight == {}
@@ -105,3 +105,74 @@ def test_parses_enhanced_container_config():
     datasets = state["zfs"]["datasets"]
     assert "tank" in datasets
     assert "tank/data" in datasets["tank"]
+
+
+def test_container_configs_and_pools_read_concurrently():
+    import threading
+
+    configs_read = threading.Barrier(3, timeout=5)
+    pools_listed = threading.Barrier(2, timeout=5)
+
+    class DummyProxmox:
+        mock = True
+
+        def list_containers(self):
+            return [{"vmid": vmid, "name": f"ct{vmid}"} for vmid in (103, 101, 102)]
+
+        def get_container_config(self, vmid: int):
+            configs_read.wait()
+            return {"hostname": f"ct{vmid}"}
+
+        def get_container_mounts(self, vmid: int):
+            return {}
+
+        def parse_storage_cfg(self):
+            return {}
+
+    class DummyZfs:
+        mock = True
+
+        def list_datasets(self, pool: str):
+            pools_listed.wait()
+            return {f"{pool}/data": {}}
+
+    collector = RealityStateCollector(proxmox_manager=DummyProxmox(), zfs_manager=DummyZfs())
+    state = collector.collect(pools=["tank", "rpool"])
+
+    assert [c["vmid"] for c in state["containers"]] == [101, 102, 103]
+    assert list(state["zfs"]["datasets"]) == ["tank", "rpool"]
+
+
+def test_device_config_parsing_trims_and_keeps_primary_volume():
+    parse = RealityStateCollector(mock=True)._parse_device_config
+
+    assert parse(" tank/x , mp = /y ,ro=1", "volume") == {"volume": "tank/x", "mp": "/y", "ro": "1"}
+    assert parse("name=eth0,hwaddr=BC:24:11:00:00:01,ip=dhcp", "name") == {
+        "name": "eth0", "hwaddr": "BC:24:11:00:00:01", "ip": "dhcp",
+    }
+    assert parse("opts=a=b,empty=", "volume") == {"opts": "a=b", "empty": ""}
+
+
+def test_storage_cfg_parsed_once_per_snapshot():
+    class DummyProxmox:
+        mock = True
+        storage_reads = 0
+
+        def list_containers(self):
+            return []
+
+        def parse_storage_cfg(self):
+            self.storage_reads += 1
+            return {"local-zfs": {"type": "zfspool", "pool": "rpool/data"}}
+
+    class DummyZfs:
+        mock = True
+
+        def list_datasets(self, pool: str):
+            return {f"{pool}/data": {}}
+
+    proxmox = DummyProxmox()
+    state = RealityStateCollector(proxmox_manager=proxmox, zfs_manager=DummyZfs()).collect()
+
+    assert list(state["zfs"]["datasets"]) == ["rpool"]
+    assert proxmox.storage_reads == 1
@@ -0,0 +1,46 @@
+"""Tests for /etc/pve/storage.cfg parsing."""
+from tengil.services.proxmox.storage import StorageManager
+
+STORAGE_CFG = """# managed by pve
+dir: local
+\tpath /var/lib/vz
+\tcontent iso,vztmpl,backup
+
+zfspool: local-zfs
+\tpool rpool/data
+\tsparse
+\tcontent images,rootdir
+
+dir:   tank-media
+        path /tank/media
+        content   images,rootdir
+"""
+
+
+def test_parse_storage_cfg_sections_and_properties(tmp_path):
+    cfg = tmp_path / "storage.cfg"
+    cfg.write_text(STORAGE_CFG)
+    manager = StorageManager(mock=False)
+    manager.storage_cfg_path = cfg
+
+    assert manager.parse_storage_cfg() == {
+        'local': {'type': 'dir', 'path': '/var/lib/vz', 'content': 'iso,vztmpl,backup'},
+        'local-zfs': {'type': 'zfspool', 'pool': 'rpool/data', 'content': 'images,rootdir'},
+        'tank-media': {'type': 'dir', 'path': '/tank/media', 'content': 'images,rootdir'},
+    }
+
+
+def test_parse_storage_cfg_missing_file(tmp_path):
+    manager = StorageManager(mock=False)
+    manager.storage_cfg_path = tmp_path / "missing.cfg"
+
+    assert manager.parse_storage_cfg() == {}
+
+
+def test_parse_storage_cfg_tolerates_non_utf8_bytes(tmp_path):
+    cfg = tmp_path / "storage.cfg"
+    cfg.write_bytes(b"# backup disk \xe5\xe4\xf6\ndir: backup\n\tpath /mnt/backup\n")
+    manager = StorageManager(mock=False)
+    manager.storage_cfg_path = cfg
+
+    assert manager.parse_storage_cfg() == {'backup': {'type': 'dir', 'path': '/mnt/backup'}}
@@ -1,4 +1,5 @@
 """Tests for Phase 2 Task 5: Template download automation."""
+import pytest
 
 
 class TestTemplateDiscovery:
@@ -103,3 +104,199 @@ class TestTemplateIntegration:
 
         # Should work without double extension
         assert vmid == 520
+
+    def test_ensure_templates_available_checks_each_once(self, tmp_path, monkeypatch):
+        """Test batch availability check dedupes and memoizes templates."""
+        from tengil.services.proxmox.containers.templates import TemplateManager
+
+        monkeypatch.setattr(
+            "tengil.services.proxmox.containers.templates.LOCAL_TEMPLATE_DIR", str(tmp_path)
+        )
+        manager = TemplateManager(mock=False)
+        checks = []
+
+        def fake_exists(template):
+            checks.append(template)
+            return template != 'missing'
+
+        monkeypatch.setattr(manager, "template_exists_locally", fake_exists)
+        monkeypatch.setattr(manager, "download_template", lambda template: False)
+
+        result = manager.ensure_templates_available(['debian', 'alpine', 'debian', 'missing'])
+
+        assert result == {'debian': True, 'alpine': True, 'missing': False}
+        assert sorted(checks) == ['alpine', 'debian', 'missing']
+        assert manager.ensure_template_available('debian')
+        assert len(checks) == 3
+
+    def test_local_templates_read_from_directory(self, tmp_path, monkeypatch):
+        """Test local template checks scan the template dir instead of forking pveam."""
+        import subprocess
+
+        from tengil.services.proxmox.containers.templates import TemplateManager
+
+        monkeypatch.setattr(
+            "tengil.services.proxmox.containers.templates.LOCAL_TEMPLATE_DIR", str(tmp_path)
+        )
+        monkeypatch.setattr(subprocess, "run", lambda *a, **kw: pytest.fail("unexpected pveam call"))
+        (tmp_path / "debian-12-standard_12.7-1_amd64.tar.zst").write_text("")
+
+        manager = TemplateManager(mock=False)
+
+        assert manager.template_exists_locally('debian-12-standard')
+        assert not manager.template_exists_locally('alpine-3.20')
+        assert manager.resolve_template_filename('debian-12') == 'debian-12-standard_12.7-1_amd64.tar.zst'
+        assert manager.resolve_template_filename('alpine-3.20') == 'alpine-3.20.tar.zst'
+
+        # Listing is reused within the TTL until dropped (as a download does)
+        (tmp_path / "alpine-3.20-default_20240911_amd64.tar.xz").write_text("")
+        assert not manager.template_exists_locally('alpine-3.20')
+        manager.invalidate()
+        assert manager.template_exists_locally('alpine-3.20')
+
+    def test_available_templates_parsed_from_pveam_rows(self, monkeypatch):
+        """Test `pveam available` rows are reduced to template names."""
+        import subprocess
+        from types import SimpleNamespace
+
+        from tengil.services.proxmox.containers.templates import TemplateManager
+
+        output = (
+            b"mail            proxmox-mail-gateway-8.1-standard_8.1-1_amd64.tar.zst\n"
+            b"system          almalinux-9-default_20240911_amd64.tar.xz\n"
+            b"system          debian-12-standard_12.7-1_amd64.tar.zst\n"
+            b"turnkeylinux    debian-12-turnkey-nextcloud_18.0-1_amd64.tar.gz\n"
+        )
+        monkeypatch.setattr(subprocess, "run", lambda *a, **kw: SimpleNamespace(stdout=output))
+
+        assert TemplateManager(mock=False).list_available_templates() == [
+            'proxmox-mail-gateway-8.1-standard_8.1-1_amd64',
+            'almalinux-9-default_20240911_amd64',
+            'debian-12-standard_12.7-1_amd64',
+            'debian-12-turnkey-nextcloud_18.0-1_amd64',
+        ]
+
+    def test_ensure_template_downloads_directly_without_template_dir(self, tmp_path, monkeypatch):
+        """Test an unreadable template dir skips 'pveam list local' for a full archive name."""
+        import subprocess
+
+        from tengil.services.proxmox.containers.templates import TemplateManager
+
+        monkeypatch.setattr(
+            "tengil.services.proxmox.containers.templates.LOCAL_TEMPLATE_DIR", str(tmp_path / "missing")
+        )
+        commands = []
+
+        def fake_run(cmd, **kwargs):
+            commands.append(cmd[:2])
+            raise subprocess.CalledProcessError(
+                255, cmd,
+                stderr="file local:vztmpl/debian-12-standard_12.7-1_amd64.tar.zst already exists",
+            )
+
+        monkeypatch.setattr(subprocess, "run", fake_run)
+
+        manager = TemplateManager(mock=False)
+        assert manager.ensure_template_available('debian-12-standard_12.7-1_amd64.tar.zst')
+        assert commands == [['pveam', 'download']]
+
+    def test_ensure_short_name_checks_pveam_without_template_dir(self, tmp_path, monkeypatch):
+        """Test a short name with an unreadable template dir is found via 'pveam list local'."""
+        import subprocess
+        from types import SimpleNamespace
+
+        from tengil.services.proxmox.containers.templates import TemplateManager
+
+        monkeypatch.setattr(
+            "tengil.services.proxmox.containers.templates.LOCAL_TEMPLATE_DIR", str(tmp_path / "missing")
+        )
+        commands = []
+        output = b"local:vztmpl/debian-12-standard_12.7-1_amd64.tar.zst   120.29MB\n"
+
+        def fake_run(cmd, **kwargs):
+            commands.append(cmd[:2])
+            if cmd[1] == 'download':
+                pytest.fail("short name passed to pveam download")
+            return SimpleNamespace(stdout=output)
+
+        monkeypatch.setattr(subprocess, "run", fake_run)
+
+        assert TemplateManager(mock=False).ensure_template_available('debian-12-standard')
+        assert commands == [['pveam', 'list']]
+
+    def test_template_index_updated_once_per_ttl(self, monkeypatch):
+        """Test repeated listings reuse a recent `pveam update`."""
+        import subprocess
+        from types import SimpleNamespace
+
+        from tengil.services.proxmox.containers.templates import TemplateManager
+
+        commands = []
+
+        def fake_run(cmd, **kwargs):
+            commands.append(cmd[1])
+            return SimpleNamespace(stdout=b"system          debian-12-standard_12.7-1_amd64.tar.zst\n")
+
+        monkeypatch.setattr(subprocess, "run", fake_run)
+        manager = TemplateManager(mock=False)
+
+        manager.list_available_templates()
+        manager.list_available_templates()
+        assert commands == ['update', 'available', 'available']
+
+        manager._last_update_ts -= 3600
+        manager.list_available_templates()
+        assert commands[-2:] == ['update', 'available']
+
+    def test_failed_template_index_update_is_retried(self, monkeypatch):
+        """Test a failed `pveam update` does not suppress the next attempt."""
+        import subprocess
+        from types import SimpleNamespace
+
+        from tengil.services.proxmox.containers.templates import TemplateManager
+
+        commands = []
+
+        def fake_run(cmd, **kwargs):
+            commands.append(cmd[1])
+            if cmd[1] == 'update' and commands.count('update') == 1:
+                raise subprocess.CalledProcessError(1, cmd)
+            return SimpleNamespace(stdout=b"")
+
+        monkeypatch.setattr(subprocess, "run", fake_run)
+        manager = TemplateManager(mock=False)
+
+        manager.list_available_templates()
+        manager.list_available_templates()
+        manager.list_available_templates()
+        assert commands == ['update', 'available', 'update', 'available', 'available']
+
+    def test_pveam_listing_cached_when_template_dir_unreadable(self, tmp_path, monkeypatch):
+        """Test `pveam list local` is run once and reused until invalidated."""
+        import subprocess
+        from types import SimpleNamespace
+
+        from tengil.services.proxmox.containers.templates import TemplateManager
+
+        monkeypatch.setattr(
+            "tengil.services.proxmox.containers.templates.LOCAL_TEMPLATE_DIR", str(tmp_path / "missing")
+        )
+        calls = []
+        output = (
+            b"NAME                                                    SIZE\n"
+            b"local:vztmpl/debian-12-standard_12.7-1_amd64.tar.zst   120.29MB\n"
+            b"local:vztmpl/alpine-3.20-default_20240908_amd64.tar.xz 3.04MB\n"
+        )
+        monkeypatch.setattr(subprocess, "run", lambda cmd, **kw: calls.append(cmd) or SimpleNamespace(stdout=output))
+
+        manager = TemplateManager(mock=False)
+
+        assert manager.template_exists_locally('debian-12-standard')
+        assert not manager.template_exists_locally('ubuntu-24.04')
+        assert manager.resolve_template_filename('debian-12-standard') == 'debian-12-standard_12.7-1_amd64.tar.zst'
+        assert manager.resolve_template_filename('alpine-3.20') == 'alpine-3.20-default_20240908_amd64.tar.xz'
+        assert calls == [['pveam', 'list', 'local']]
+
+        manager.invalidate()
+        assert manager.template_exists_locally('alpine-3.20')
+        assert len(calls) == 2